@@ -0,0 +1,438 @@
+import numpy as np
+from AlphaGo.go import GameState, IllegalMove, zobrist_keys, symmetry_tables, PASS_MOVE, PATTERN_NEIGHBORS, BLACK, WHITE, EMPTY
+
+def _popcount(bits):
+	"""number of set bits in a python int
+	"""
+	return bin(bits).count("1")
+
+def _iter_bits(bits):
+	"""yield the index of every set bit of a python int, lowest first
+	"""
+	while bits:
+		low = bits & -bits
+		yield low.bit_length() - 1
+		bits ^= low
+
+# per board size: (on-board mask, edge mask, zobrist keys indexed by [color][bit])
+_layout_cache = {}
+
+def _layout(size):
+	"""the on-board mask and the bit-indexed Zobrist keys for a board size, built once
+	"""
+	if size not in _layout_cache:
+		stride = size + 1
+		mask = 0
+		for x in range(size):
+			mask |= ((1 << size) - 1) << (x * stride)
+		# same keys as the numpy board so both backends hash positions identically
+		keys = zobrist_keys(size)
+		zobrist = {}
+		for color in [BLACK, WHITE]:
+			zobrist[color] = [0] * (size * stride)
+			for x in range(size):
+				for y in range(size):
+					zobrist[color][x * stride + y] = keys[color][x][y]
+		edge = 0
+		for x in range(size):
+			for y in range(size):
+				if x in (0, size - 1) or y in (0, size - 1):
+					edge |= 1 << (x * stride + y)
+		_layout_cache[size] = (mask, edge, zobrist)
+	return _layout_cache[size]
+
+class BitboardGameState(GameState):
+	"""GameState that stores the stones of each color as a bitset (a python int)
+
+	Point (x, y) is bit x * (size + 1) + y. The extra column at y = size is never set;
+	it keeps the one-bit shifts used for left/right neighbors from wrapping between
+	rows, so expanding a set of points to its neighbors is four shifts, three ORs and
+	an AND with the on-board mask. Flood fill, liberty counting and capture detection
+	are built from that expansion instead of visiting points one by one.
+
+	Construct it with GameState(size, backend="bitboard"). The public interface is the
+	one of GameState; board and liberty_counts are computed from the bitsets on access.
+	"""
+
+	__slots__ = ('_stride', '_on_board_mask', '_edge_mask', '_zobrist', '_stones', '_empty_bits')
+
+	def __init__(self, size=19, enforce_superko=True, backend="bitboard"):
+		self.size = size
+		self.turns_played = 0
+		self.current_player = BLACK
+		self.ko = None
+		self.passes = 0
+		self.enforce_superko = enforce_superko
+		self._stride = size + 1
+		(self._on_board_mask, self._edge_mask, self._zobrist) = _layout(size)
+		# the stones of each color, and the empty points
+		self._stones = {BLACK: 0, WHITE: 0}
+		self._empty_bits = self._on_board_mask
+		self.hash = 0
+		self.previous_hashes = set([self.hash])
+		self._history_shared = False
+		# undo journal: one frame of the replaced bitsets and scalars per move
+		self._journal = []
+
+	def _index(self, position):
+		(x, y) = position
+		# int() so that numpy integer coordinates can be shifted by
+		return int(x) * self._stride + int(y)
+
+	def _position(self, index):
+		return divmod(index, self._stride)
+
+	def _empty(self):
+		return self._empty_bits
+
+	def _expand(self, bits):
+		"""the on-board points 4-adjacent to any point of bits (may include points of bits)
+		"""
+		s = self._stride
+		return ((bits << 1) | (bits >> 1) | (bits << s) | (bits >> s)) & self._on_board_mask
+
+	def _chain(self, seed, color_bits):
+		"""flood fill from the seed bit(s) through color_bits
+		"""
+		chain = seed
+		while True:
+			grown = (chain | self._expand(chain)) & color_bits
+			if grown == chain:
+				return chain
+			chain = grown
+
+	def _color_bits(self, color):
+		if color == EMPTY:
+			return self._empty()
+		return self._stones[color]
+
+	def _color_at(self, position):
+		bit = 1 << self._index(position)
+		if self._stones[BLACK] & bit:
+			return BLACK
+		if self._stones[WHITE] & bit:
+			return WHITE
+		return EMPTY
+
+	def _captures(self, bit, color):
+		"""the opponent stones that playing color at bit would capture
+		"""
+		opponent_bits = self._stones[-color]
+		empty_after = self._empty() & ~bit
+		captured = 0
+		candidates = self._expand(bit) & opponent_bits
+		while candidates:
+			chain = self._chain(candidates & -candidates, opponent_bits)
+			if not (self._expand(chain) & empty_after):
+				captured |= chain
+			candidates &= ~chain
+		return captured
+
+	def _hash_of(self, bits, color):
+		h = 0
+		keys = self._zobrist[color]
+		for i in _iter_bits(bits):
+			h ^= keys[i]
+		return h
+
+	@property
+	def board(self):
+		board = np.zeros((self.size, self.size))
+		for color in [BLACK, WHITE]:
+			for i in _iter_bits(self._stones[color]):
+				(x, y) = self._position(i)
+				board[x][y] = color
+		return board
+
+	@property
+	def liberty_counts(self):
+		counts = -np.ones((self.size, self.size), dtype=int)
+		empty = self._empty()
+		for color in [BLACK, WHITE]:
+			remaining = self._stones[color]
+			while remaining:
+				chain = self._chain(remaining & -remaining, self._stones[color])
+				count = _popcount(self._expand(chain) & empty)
+				for i in _iter_bits(chain):
+					(x, y) = self._position(i)
+					counts[x][y] = count
+				remaining &= ~chain
+		return counts
+
+	def pattern_code(self, position):
+		# computed from the bitsets on demand rather than maintained by do_move
+		(x, y) = position
+		code = 0
+		for (k, (dx, dy)) in enumerate(PATTERN_NEIGHBORS):
+			neighbor = (x + dx, y + dy)
+			digit = self._color_at(neighbor) % 3 if self._on_board(neighbor) else 3
+			code += digit * 4 ** k
+		return code
+
+	@property
+	def pattern_codes(self):
+		codes = np.zeros((self.size, self.size), dtype=int)
+		for x in range(self.size):
+			for y in range(self.size):
+				codes[x][y] = self.pattern_code((x, y))
+		return codes
+
+	def liberty_pos(self, position):
+		(x, y) = position
+		empty = self._empty()
+		pos = []
+		for (nx, ny) in [(x+1, y), (x, y+1), (x-1, y), (x, y-1)]:
+			if self._on_board((nx, ny)) and empty & (1 << self._index((nx, ny))):
+				pos.append((nx, ny))
+		return pos
+
+	def get_neighbor(self, position):
+		(x, y) = position
+		same = self._color_bits(self._color_at(position))
+		neighbor_set = []
+		for (nx, ny) in [(x, y+1), (x+1, y), (x-1, y), (x, y-1)]:
+			if self._on_board((nx, ny)) and same & (1 << self._index((nx, ny))):
+				neighbor_set.append((nx, ny))
+		return neighbor_set
+
+	def visit_neighbor(self, position):
+		color = self._color_at(position)
+		if color == EMPTY:
+			return set()
+		chain = self._chain(1 << self._index(position), self._stones[color])
+		return set(self._position(i) for i in _iter_bits(chain))
+
+	def chain_liberties(self, position):
+		color = self._color_at(position)
+		if color == EMPTY:
+			return []
+		chain = self._chain(1 << self._index(position), self._stones[color])
+		return [self._position(i) for i in _iter_bits(self._expand(chain) & self._empty())]
+
+	def update_current_liberties(self):
+		return self.liberty_counts.astype(float)
+
+	def copy(self):
+		other = BitboardGameState(self.size, self.enforce_superko)
+		other.turns_played = self.turns_played
+		other.current_player = self.current_player
+		other.ko = self.ko
+		other.passes = self.passes
+		other._stones = dict(self._stones)
+		other._empty_bits = self._empty_bits
+		other.hash = self.hash
+		# shared copy-on-write, as in GameState.copy
+		other.previous_hashes = self.previous_hashes
+		other._history_shared = self._history_shared = True
+		return other
+
+	def is_suicide(self, action):
+		bit = 1 << self._index(action)
+		own = self._stones[self.current_player] | bit
+		empty_after = self._empty() & ~bit
+		# the chain the new stone would join still has a liberty
+		if self._expand(self._chain(bit, own)) & empty_after:
+			return False
+		# or the move captures something and so gains a liberty
+		return self._captures(bit, self.current_player) == 0
+
+	def is_positional_superko(self, action):
+		index = self._index(action)
+		captured = self._captures(1 << index, self.current_player)
+		future_hash = self.hash ^ self._zobrist[self.current_player][index] ^ \
+			self._hash_of(captured, -self.current_player)
+		return future_hash in self.previous_hashes
+
+	def _check_move(self, action):
+		"""Decide legality and find captures in a single pass, since the capture set is
+		what suicide, superko and do_move all need.
+
+		Return:
+		the bits of the opponent stones captured by action (possibly 0), or None if
+		action is not a legal move
+		"""
+		(x, y) = action
+		if x < 0 or y < 0 or x >= self.size or y >= self.size:
+			return None
+		s = self._stride
+		mask = self._on_board_mask
+		index = self._index(action)
+		bit = 1 << index
+		empty = self._empty_bits
+		if not empty & bit:
+			return None
+		if action == self.ko:
+			return None
+		color = self.current_player
+		opponent = self._stones[-color]
+		empty_after = empty ^ bit
+		around = ((bit << 1) | (bit >> 1) | (bit << s) | (bit >> s)) & mask
+		# an adjacent opponent chain is captured if flooding it finds no liberty; stop
+		# flooding as soon as one is found, which is usually on the first expansion
+		captured = 0
+		candidates = around & opponent
+		while candidates:
+			chain = candidates & -candidates
+			while True:
+				grown = ((chain << 1) | (chain >> 1) | (chain << s) | (chain >> s)) & mask
+				if grown & empty_after:
+					break
+				grown = (chain | grown) & opponent
+				if grown == chain:
+					captured |= chain
+					break
+				chain = grown
+			candidates &= ~chain
+		# suicide: no capture, no empty neighbor and the joined chain has no other liberty
+		if not captured and not (around & empty):
+			own = self._stones[color] | bit
+			chain = bit
+			while True:
+				grown = ((chain << 1) | (chain >> 1) | (chain << s) | (chain >> s)) & mask
+				if grown & empty_after:
+					break
+				grown = (chain | grown) & own
+				if grown == chain:
+					return None
+				chain = grown
+		if self.enforce_superko:
+			future_hash = self.hash ^ self._zobrist[color][index]
+			if captured:
+				future_hash ^= self._hash_of(captured, -color)
+			if future_hash in self.previous_hashes:
+				return None
+		return captured
+
+	def is_legal(self, action):
+		return action is PASS_MOVE or self._check_move(action) is not None
+
+	def do_move(self, action):
+		frame = (self._stones[BLACK], self._stones[WHITE], self._empty_bits, self.ko, self.hash, self.passes)
+		if action is PASS_MOVE:
+			self._journal.append(frame + (False,))
+			self.ko = None
+			self.passes += 1
+			self.current_player = -self.current_player
+			self.turns_played += 1
+			return
+		captured = self._check_move(action)
+		if captured is None:
+			raise IllegalMove(str(action))
+		self.passes = 0
+		color = self.current_player
+		index = self._index(action)
+		bit = 1 << index
+		self._stones[color] |= bit
+		self._stones[-color] &= ~captured
+		self._empty_bits = (self._empty_bits ^ bit) | captured
+		self.hash ^= self._zobrist[color][index]
+		if captured:
+			self.hash ^= self._hash_of(captured, -color)
+		self._own_history()
+		new_position = self.hash not in self.previous_hashes
+		self.previous_hashes.add(self.hash)
+		self._journal.append(frame + (new_position,))
+		# simple ko: a lone stone that captured one stone and whose only liberty is that point
+		self.ko = None
+		if captured and captured & (captured - 1) == 0:
+			around = self._expand(bit)
+			if not (around & self._stones[color]) and (around & self._empty_bits) == captured:
+				self.ko = self._position(captured.bit_length() - 1)
+		self.current_player = -color
+		self.turns_played += 1
+
+	def _to_mask(self, bits):
+		mask = np.zeros((self.size, self.size), dtype=bool)
+		for i in _iter_bits(bits):
+			mask[self._position(i)] = True
+		return mask
+
+	def legal_moves_mask(self):
+		"""as GameState.legal_moves_mask, with set operations on the bitsets: the empty
+		points next to an empty point, an own chain with two or more liberties or an
+		opponent chain in atari, less the ko point. With enforce_superko only the
+		resulting hashes are checked, and only capturing points need _check_move
+		"""
+		color = self.current_player
+		empty = self._empty_bits
+		breathing = empty
+		# points next to an opponent chain in atari: playing there captures it
+		capturing = 0
+		for (bits, own) in [(self._stones[color], True), (self._stones[-color], False)]:
+			while bits:
+				chain = self._chain(bits & -bits, bits)
+				liberties = self._expand(chain) & empty
+				two_or_more = liberties & (liberties - 1)
+				if own and two_or_more:
+					breathing |= chain
+				elif not own and not two_or_more:
+					breathing |= chain
+					capturing |= liberties
+				bits &= ~chain
+		legal = empty & self._expand(breathing)
+		if self.ko is not None:
+			legal &= ~(1 << self._index(self.ko))
+		if self.enforce_superko:
+			keys = self._zobrist[color]
+			for i in _iter_bits(legal):
+				if capturing & (1 << i):
+					repeats = self._check_move(self._position(i)) is None
+				else:
+					repeats = self.hash ^ keys[i] in self.previous_hashes
+				if repeats:
+					legal &= ~(1 << i)
+		return self._to_mask(legal)
+
+	def _own_eyes(self):
+		s = self._stride
+		mask = self._on_board_mask
+		opponent = self._stones[-self.current_player]
+		# empty points none of whose neighbors is empty or an opponent stone
+		eyeish = self._empty_bits & ~self._expand(self._empty_bits | opponent)
+		diagonals = [((opponent << (s + 1)) & mask), ((opponent >> (s + 1)) & mask),
+			((opponent << (s - 1)) & mask), ((opponent >> (s - 1)) & mask)]
+		at_least_one = diagonals[0] | diagonals[1] | diagonals[2] | diagonals[3]
+		at_least_two = 0
+		for a in range(4):
+			for b in range(a + 1, 4):
+				at_least_two |= diagonals[a] & diagonals[b]
+		return self._to_mask(eyeish & ~at_least_two & ~(self._edge_mask & at_least_one))
+
+	def undo(self):
+		if not self._journal:
+			raise IndexError("no move to undo")
+		(black, white, empty, ko, old_hash, passes, new_position) = self._journal.pop()
+		if new_position:
+			self._own_history()
+			self.previous_hashes.discard(self.hash)
+		self._stones = {BLACK: black, WHITE: white}
+		self._empty_bits = empty
+		self.ko = ko
+		self.passes = passes
+		self.hash = old_hash
+		self.current_player = -self.current_player
+		self.turns_played -= 1
+
+	def symmetries(self):
+		"""returns a list of 8 BitboardGameState objects: all reflections and rotations
+		of the current board, in the same order as GameState.symmetries()
+
+		The previous positions cannot be transformed from their hashes, so the copies
+		only know the current position for superko purposes.
+		"""
+		(forward, inverse) = symmetry_tables(self.size)
+		copies = []
+		for k in range(len(forward)):
+			other = self.copy()
+			for color in [BLACK, WHITE]:
+				other._stones[color] = 0
+				for i in _iter_bits(self._stones[color]):
+					(x, y) = self._position(i)
+					other._stones[color] |= 1 << self._index(divmod(int(inverse[k][x * self.size + y]), self.size))
+			other._empty_bits = self._on_board_mask & ~(other._stones[BLACK] | other._stones[WHITE])
+			if self.ko is not None:
+				other.ko = divmod(int(inverse[k][self.ko[0] * self.size + self.ko[1]]), self.size)
+			other.hash = other._hash_of(other._stones[BLACK], BLACK) ^ other._hash_of(other._stones[WHITE], WHITE)
+			other.previous_hashes = set([other.hash])
+			copies.append(other)
+		return copies
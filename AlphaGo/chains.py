@@ -0,0 +1,114 @@
+"""Whole-board chain analysis with connected-component labelling.
+
+These functions work on boards they have never seen (no GameState history is
+needed) and on whole batches of boards at once: every function accepts a single
+board of shape (size, size) or a batch of shape (N, size, size) holding BLACK,
+WHITE and EMPTY values, and only connects points within the same board.
+"""
+import numpy as np
+from scipy import ndimage
+from AlphaGo.go import BLACK, WHITE, EMPTY
+
+def _structure(ndim):
+	"""4-connectivity in the last two axes only, so boards in a batch never touch
+	"""
+	structure = np.zeros((3,) * ndim, dtype=bool)
+	center = (1,) * (ndim - 2)
+	structure[center + (1, slice(None))] = True
+	structure[center + (slice(None), 1)] = True
+	return structure
+
+def label_chains(board):
+	"""Label every chain of stones.
+
+	Return:
+	(labels, count) -- labels has the shape of board with 0 on empty points and the
+	same positive label on all stones of a chain; count is the number of chains
+	"""
+	board = np.asarray(board)
+	structure = _structure(board.ndim)
+	(black, n_black) = ndimage.label(board == BLACK, structure)
+	(white, n_white) = ndimage.label(board == WHITE, structure)
+	labels = black + np.where(white > 0, white + n_black, 0)
+	return (labels, n_black + n_white)
+
+def _shifted(array, axis, step, fill):
+	"""array shifted by one point along axis (the neighbor in direction step), with
+	fill where the neighbor would be off the board
+	"""
+	shifted = np.roll(array, -step, axis=axis)
+	edge = [slice(None)] * array.ndim
+	edge[axis] = -1 if step > 0 else 0
+	shifted[tuple(edge)] = fill
+	return shifted
+
+def chain_liberties(board):
+	"""Liberty count of each chain, computed with array operations: every empty point
+	adds one to each distinct chain among its neighbors, and the additions are
+	counted per chain with np.bincount.
+
+	Return:
+	(labels, libs) -- labels as in label_chains; libs[label] is the liberty count of
+	the chain with that label and libs[0] is -1
+	"""
+	board = np.asarray(board)
+	(labels, count) = label_chains(board)
+	empty = board == EMPTY
+	neighbors = [_shifted(labels, axis, step, 0) for axis in [board.ndim - 2, board.ndim - 1] for step in [1, -1]]
+	touched = []
+	for (i, neighbor) in enumerate(neighbors):
+		# a chain touching the point from several sides is counted once
+		first = empty & (neighbor > 0)
+		for other in neighbors[:i]:
+			first &= neighbor != other
+		touched.append(neighbor[first])
+	libs = np.bincount(np.concatenate(touched), minlength=count + 1)
+	libs[0] = -1
+	return (labels, libs)
+
+def liberty_counts(board):
+	"""The liberty count of the chain at each point, -1 for empty points, exactly as
+	GameState.liberty_counts
+	"""
+	(labels, libs) = chain_liberties(board)
+	return libs[labels]
+
+def one_hot_liberties(counts, planes=8):
+	"""Encode liberty counts as planes: plane k is 1 where the chain has k + 1
+	liberties, and the last plane collects everything with planes or more.
+
+	Return:
+	a boolean array of shape (planes,) + counts.shape for a single board and
+	(N, planes, size, size) for a batch
+	"""
+	counts = np.asarray(counts)
+	encoded = np.stack([counts == k + 1 for k in range(planes - 1)] + [counts >= planes])
+	if counts.ndim == 3:
+		encoded = encoded.swapaxes(0, 1)
+	return encoded
+
+def area_scores(board):
+	"""Tromp-Taylor area of each player: their stones plus the empty points whose
+	empty region reaches only their stones. Empty regions are labelled in one pass
+	like chains are, so nothing is flooded point by point.
+
+	Return:
+	(black, white) -- ints for a single board, (N,) int arrays for a batch
+	"""
+	board = np.asarray(board)
+	empty = board == EMPTY
+	(regions, count) = ndimage.label(empty, _structure(board.ndim))
+	reaches = {}
+	for color in [BLACK, WHITE]:
+		reaches[color] = np.zeros(count + 1, dtype=bool)
+		for axis in [board.ndim - 2, board.ndim - 1]:
+			for step in [1, -1]:
+				touching = empty & (_shifted(board, axis, step, EMPTY) == color)
+				reaches[color][regions[touching]] = True
+	areas = []
+	for color in [BLACK, WHITE]:
+		owned = reaches[color] & ~reaches[-color]
+		owned[0] = False
+		area = (board == color) | owned[regions]
+		areas.append(area.sum(axis=(-2, -1)))
+	return tuple(areas)
@@ -0,0 +1,700 @@
+"""On-disk training datasets of (state, action) samples.
+
+Samples are appended in chunks to one of two formats:
+
+hdf5 -- a single file with resizable, chunked and compressed 'states' and 'actions'
+	datasets (needs h5py)
+npy -- a folder of .npy shards, states_NNNNN.npy and actions_NNNNN.npy, which are
+	memory-mapped when read
+
+Both keep a small metadata header: a JSON dict in the file's 'metadata' attribute or in
+the folder's metadata.json, holding the sample count, shapes and dtypes, the format
+version and whatever the writer was given. Readers never load the whole corpus; they
+read the requested samples only.
+
+Boolean states can be stored packed, 8 points to a byte (see pack_states), which makes
+a (48, 19, 19) sample 2166 bytes instead of 17328.
+
+PositionIndex finds positions repeated across games, so that a corpus can keep each one
+once, labelled with the counts of the moves played from it.
+"""
+import itertools
+import json
+import os
+import sqlite3
+import numpy as np
+from AlphaGo.go import SYMMETRY_TRANSFORMS, transform_planes, transform_flat, transform_moves
+
+DATASET_VERSION = 1
+FORMATS = ["hdf5", "npy"]
+
+def _h5py():
+	try:
+		import h5py
+	except ImportError:
+		raise ImportError("h5py is needed for hdf5 datasets; use the 'npy' format instead")
+	return h5py
+
+def pack_states(states):
+	"""Pack boolean states of any shape, 8 values to a byte over all but the first axis.
+
+	Return:
+	an (N, ceil(values per state / 8)) uint8 array
+	"""
+	states = np.asarray(states)
+	if states.dtype != bool:
+		raise ValueError("only boolean states can be packed, not %s" % states.dtype)
+	return np.packbits(states.reshape(len(states), -1), axis=1)
+
+def unpack_states(packed, shape, out=None):
+	"""Expand a batch of packed states (see pack_states) to float32 with whole-array
+	operations.
+
+	Keyword arguments:
+	packed -- (N, bytes) uint8 array
+	shape -- the shape of one state, e.g. (48, 19, 19)
+	out -- optional (N,) + shape float32 array to unpack into
+
+	Return:
+	the (N,) + shape float32 array of 0s and 1s
+	"""
+	packed = np.asarray(packed, dtype=np.uint8)
+	size = int(np.prod(shape))
+	bits = np.unpackbits(packed, axis=1)[:, :size].reshape((len(packed),) + tuple(shape))
+	if out is None:
+		return bits.astype(np.float32)
+	out[...] = bits
+	return out
+
+def _shard_names(index):
+	return ("states_%05d.npy" % index, "actions_%05d.npy" % index)
+
+class DatasetWriter(object):
+	"""Appends samples to a dataset at path, creating it or, with mode 'a', continuing an
+	existing one. Samples are buffered and written chunk_size at a time: one chunk of the
+	HDF5 datasets, or one .npy shard. The shapes and dtypes of states and actions are
+	taken from the first sample. With packed, boolean states are stored bit-packed.
+
+	Use as a context manager, or call close() to write the last samples and the header.
+	"""
+
+	def __init__(self, path, format="hdf5", mode="w", metadata=None, chunk_size=1024, compression="lzf", packed=False):
+		if format not in FORMATS:
+			raise ValueError("Unrecognized dataset format %r" % format)
+		self.path = path
+		self.format = format
+		self.chunk_size = chunk_size
+		self.compression = compression
+		self.metadata = {}
+		self._states = []
+		self._actions = []
+		self._file = None
+		if mode == "a" and os.path.exists(path):
+			self.metadata = read_metadata(path)
+			if self.metadata["format"] != format:
+				raise ValueError("%s is a %s dataset" % (path, self.metadata["format"]))
+			if self.metadata.setdefault("packed", False) != packed:
+				raise ValueError("%s is %s" % (path, "packed" if self.metadata["packed"] else "not packed"))
+		elif mode not in ["w", "a"]:
+			raise ValueError("Unrecognized mode %r" % mode)
+		else:
+			self.metadata = {"version": DATASET_VERSION, "format": format, "count": 0, "shards": [], "packed": packed}
+		self.metadata.update(metadata or {})
+		if format == "hdf5":
+			self._file = _h5py().File(path, "a" if mode == "a" else "w")
+		elif not os.path.exists(path):
+			os.makedirs(path)
+
+	def __len__(self):
+		return self.metadata["count"] + len(self._states)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		self.close()
+
+	def append(self, state, action):
+		self._states.append(np.asarray(state))
+		self._actions.append(np.asarray(action))
+		if len(self._states) >= self.chunk_size:
+			self.flush()
+
+	def extend(self, samples):
+		"""append every (state, action) of samples
+		"""
+		for (state, action) in samples:
+			self.append(state, action)
+
+	def flush(self):
+		"""write the buffered samples and the header
+		"""
+		if self._states:
+			states = np.array(self._states)
+			actions = np.array(self._actions)
+			self._check_shapes(states, actions)
+			if self.metadata["packed"]:
+				states = pack_states(states)
+			if self.format == "hdf5":
+				self._write_hdf5(states, actions)
+			else:
+				self._write_shard(states, actions)
+			self.metadata["count"] += len(states)
+			self._states = []
+			self._actions = []
+		self._write_metadata()
+
+	def close(self):
+		self.flush()
+		if self._file is not None:
+			self._file.close()
+			self._file = None
+
+	def _check_shapes(self, states, actions):
+		for (name, values) in [("state", states), ("action", actions)]:
+			shape = list(values.shape[1:])
+			if name + "_shape" not in self.metadata:
+				self.metadata[name + "_shape"] = shape
+				self.metadata[name + "_dtype"] = values.dtype.str
+			elif self.metadata[name + "_shape"] != shape:
+				raise ValueError("%s shape %s does not match the dataset's %s" % (name, shape, self.metadata[name + "_shape"]))
+
+	def _write_hdf5(self, states, actions):
+		for (name, values) in [("states", states), ("actions", actions)]:
+			if name not in self._file:
+				self._file.create_dataset(name, shape=(0,) + values.shape[1:], maxshape=(None,) + values.shape[1:],
+					dtype=values.dtype, chunks=(min(self.chunk_size, 64),) + values.shape[1:],
+					compression=self.compression)
+			dataset = self._file[name]
+			# samples past the header's count were left by an interrupted run
+			start = self.metadata["count"]
+			dataset.resize((start + len(values),) + values.shape[1:])
+			dataset[start:] = values
+
+	def _write_shard(self, states, actions):
+		(states_name, actions_name) = _shard_names(len(self.metadata["shards"]))
+		np.save(os.path.join(self.path, states_name), states)
+		np.save(os.path.join(self.path, actions_name), actions)
+		self.metadata["shards"].append(len(states))
+
+	def _write_metadata(self):
+		header = json.dumps(self.metadata)
+		if self.format == "hdf5":
+			self._file.attrs["metadata"] = header
+			self._file.flush()
+		else:
+			with open(os.path.join(self.path, "metadata.json"), "w") as f:
+				f.write(header)
+
+def read_metadata(path):
+	"""Return:
+	the metadata header of the dataset at path
+	"""
+	if os.path.isdir(path):
+		with open(os.path.join(path, "metadata.json")) as f:
+			return json.load(f)
+	with _h5py().File(path, "r") as f:
+		return json.loads(f.attrs["metadata"])
+
+def _read_samples(shards, shard_ids, offsets):
+	"""Read samples given by shard and offset, each distinct one once, in shard and offset
+	order, with runs of consecutive offsets read as one slice.
+
+	Keyword arguments:
+	shards -- a list of (states, actions) arrays or array-likes (memory-mapped .npy
+		arrays, HDF5 datasets)
+	shard_ids, offsets -- integer arrays, one entry per sample
+
+	Return:
+	(states, actions) arrays in the order asked for
+	"""
+	order = np.lexsort((offsets, shard_ids))
+	(shard_ids, offsets) = (shard_ids[order], offsets[order])
+	distinct = np.ones(len(order), dtype=bool)
+	distinct[1:] = (shard_ids[1:] != shard_ids[:-1]) | (offsets[1:] != offsets[:-1])
+	# the row of every sorted sample among the distinct ones read
+	rows = np.empty(len(order), dtype=np.int64)
+	rows[order] = np.cumsum(distinct) - 1
+	(shard_ids, offsets) = (shard_ids[distinct], offsets[distinct])
+	breaks = np.flatnonzero((shard_ids[1:] != shard_ids[:-1]) | (offsets[1:] != offsets[:-1] + 1)) + 1
+	(states, actions) = ([], [])
+	for (start, end) in zip([0] + breaks.tolist(), breaks.tolist() + [len(offsets)]):
+		(shard, offset) = (shard_ids[start], offsets[start])
+		states.append(shards[shard][0][offset:offset + end - start])
+		actions.append(shards[shard][1][offset:offset + end - start])
+	return (np.concatenate(states)[rows], np.concatenate(actions)[rows])
+
+class Dataset(object):
+	"""Read access to a dataset written by DatasetWriter. Shards are memory-mapped and
+	HDF5 datasets read lazily, so only the samples asked for are loaded.
+
+	shards is the list of (states, actions) arrays of the dataset; an HDF5 dataset is one
+	shard. Opened with mode 'r+', the actions of written samples can be replaced with
+	write_actions().
+	"""
+
+	def __init__(self, path, mode="r"):
+		if mode not in ["r", "r+"]:
+			raise ValueError("Unrecognized mode %r" % mode)
+		self.path = path
+		self.metadata = read_metadata(path)
+		self.metadata.setdefault("packed", False)
+		self.format = self.metadata["format"]
+		self.shards = []
+		if self.format == "hdf5":
+			self._file = _h5py().File(path, mode)
+			if self.metadata["count"]:
+				self.shards.append((self._file["states"], self._file["actions"]))
+			self.shard_lengths = [self.metadata["count"]]
+		else:
+			self._file = None
+			for k in range(len(self.metadata["shards"])):
+				self.shards.append(tuple(np.load(os.path.join(path, name), mmap_mode=mode) for name in _shard_names(k)))
+			self.shard_lengths = self.metadata["shards"]
+		# the index of the first sample of each shard
+		self._offsets = np.cumsum([0] + self.shard_lengths)
+
+	def __len__(self):
+		return self.metadata["count"]
+
+	def close(self):
+		if self._file is not None:
+			self._file.close()
+			self._file = None
+		else:
+			for (states, actions) in self.shards:
+				if actions.flags.writeable:
+					actions.flush()
+
+	def write_actions(self, indices, actions):
+		"""Replace the actions of the samples at the given indices, one at a time in index
+		order; the dataset must be opened with mode 'r+'.
+		"""
+		indices = np.asarray(indices, dtype=np.int64)
+		shards = np.searchsorted(self._offsets, indices, side="right") - 1
+		for i in np.argsort(indices, kind="mergesort"):
+			self.shards[shards[i]][1][indices[i] - self._offsets[shards[i]]] = actions[i]
+
+	def empty(self, unpack=True):
+		"""Return:
+		(states, actions) arrays of no samples, shaped like read() would return them
+		"""
+		if self.metadata["packed"]:
+			states = np.zeros((0, (int(np.prod(self.metadata["state_shape"])) + 7) // 8), dtype=np.uint8)
+		else:
+			states = np.zeros([0] + self.metadata["state_shape"], dtype=self.metadata["state_dtype"])
+		return (self.unpack(states, unpack), np.zeros([0] + self.metadata["action_shape"], dtype=self.metadata["action_dtype"]))
+
+	def read(self, indices, unpack=True):
+		"""Return:
+		(states, actions) arrays of the samples at the given indices, in that order. The
+		states of a packed dataset are unpacked to float32 unless unpack is False.
+		"""
+		indices = np.asarray(indices, dtype=np.int64)
+		if len(indices) == 0:
+			return self.empty(unpack)
+		if np.any((indices < 0) | (indices >= len(self))):
+			raise IndexError("sample index out of range")
+		shards = np.searchsorted(self._offsets, indices, side="right") - 1
+		(states, actions) = _read_samples(self.shards, shards, indices - self._offsets[shards])
+		return (self.unpack(states, unpack), actions)
+
+	def unpack(self, states, unpack=True):
+		"""states as read from the shards, unpacked to float32 if the dataset is packed
+		and unpack is True
+		"""
+		if unpack and self.metadata["packed"]:
+			return unpack_states(states, self.metadata["state_shape"])
+		return states
+
+	def random_minibatch(self, batch_size, rng=np.random, unpack=True):
+		"""Return:
+		(states, actions) of batch_size samples drawn uniformly at random, with replacement
+		"""
+		return self.read(rng.randint(len(self), size=batch_size), unpack)
+
+# (shard, offset) of every sample of a SampleIndex, 12 bytes each; offsets are 64-bit,
+# as a single-file (hdf5) dataset is one shard of any number of samples
+INDEX_DTYPE = np.dtype([("shard", "<u4"), ("offset", "<u8")])
+
+def _index_field(values, field):
+	"""values for the field of INDEX_DTYPE records, raising ValueError rather than
+	wrapping around when one does not fit
+	"""
+	values = np.asarray(values)
+	if len(values) and (values.min() < 0 or values.max() > np.iinfo(INDEX_DTYPE[field]).max):
+		raise ValueError("%s %d does not fit in a sample index" % (field, values.max() if values.min() >= 0 else values.min()))
+	return values
+
+class SampleIndex(object):
+	"""Maps a global sample id to (shard, offset) over the shards of one or more datasets.
+
+	The index is a memory-mapped .npy file of INDEX_DTYPE records at index_path, next to
+	index_path + '.json' listing the datasets it covers; build() writes both. All
+	datasets of an index must hold states and actions of the same shapes and packing.
+	"""
+
+	def __init__(self, index_path):
+		with open(index_path + ".json") as f:
+			self.metadata = json.load(f)
+		self.datasets = [Dataset(path) for path in self.metadata["datasets"]]
+		self.shards = [shard for dataset in self.datasets for shard in dataset.shards]
+		self.records = np.load(index_path, mmap_mode="r")
+
+	@staticmethod
+	def build(dataset_paths, index_path, ranges=None):
+		"""Write the index of the samples of the datasets at dataset_paths, in order.
+
+		Keyword arguments:
+		dataset_paths -- paths of datasets written by DatasetWriter
+		index_path -- the .npy file to write
+		ranges -- optionally, for each dataset, a list of (start, count) ranges of
+			samples to index instead of all of them
+
+		Return:
+		the SampleIndex
+		"""
+		datasets = [Dataset(path) for path in dataset_paths]
+		for dataset in datasets[1:]:
+			for key in ["state_shape", "action_shape", "packed"]:
+				if dataset.metadata.get(key) != datasets[0].metadata.get(key):
+					raise ValueError("%s of %s does not match %s" % (key, dataset.path, datasets[0].path))
+		if ranges is None:
+			ranges = [[(0, len(dataset))] for dataset in datasets]
+		count = sum(n for dataset_ranges in ranges for (_, n) in dataset_ranges)
+		records = np.lib.format.open_memmap(index_path, mode="w+", dtype=INDEX_DTYPE, shape=(count,))
+		(start, first_shard) = (0, 0)
+		for (dataset, dataset_ranges) in zip(datasets, ranges):
+			for (first, n) in dataset_ranges:
+				if first < 0 or first + n > len(dataset):
+					raise IndexError("samples %d to %d are not in %s" % (first, first + n, dataset.path))
+				ids = np.arange(first, first + n)
+				shards = np.searchsorted(dataset._offsets, ids, side="right") - 1
+				records["shard"][start:start + n] = _index_field(first_shard + shards, "shard")
+				records["offset"][start:start + n] = _index_field(ids - dataset._offsets[shards], "offset")
+				start += n
+			first_shard += len(dataset.shards)
+			dataset.close()
+		records.flush()
+		del records
+		with open(index_path + ".json", "w") as f:
+			json.dump({"version": DATASET_VERSION, "count": count, "datasets": [os.path.abspath(path) for path in dataset_paths]}, f)
+		return SampleIndex(index_path)
+
+	def __len__(self):
+		return len(self.records)
+
+	def close(self):
+		for dataset in self.datasets:
+			dataset.close()
+
+	def read(self, ids, unpack=True):
+		"""Return:
+		(states, actions) arrays of the samples with the given global ids, in that order
+		"""
+		ids = np.asarray(ids, dtype=np.int64)
+		if len(ids) == 0:
+			return self.datasets[0].empty(unpack)
+		records = self.records[np.sort(ids)]
+		(states, actions) = _read_samples(self.shards, records["shard"].astype(np.int64), records["offset"].astype(np.int64))
+		# back from id order to the order asked for
+		rows = np.empty(len(ids), dtype=np.int64)
+		rows[np.argsort(ids, kind="mergesort")] = np.arange(len(ids))
+		return (self.datasets[0].unpack(states[rows], unpack), actions[rows])
+
+_UINT64 = np.uint64
+
+def _mix(x):
+	"""splitmix64 finalizer of a uint64 array, wrapping around
+	"""
+	x = (x ^ (x >> _UINT64(30))) * _UINT64(0xbf58476d1ce4e5b9)
+	x = (x ^ (x >> _UINT64(27))) * _UINT64(0x94d049bb133111eb)
+	return x ^ (x >> _UINT64(31))
+
+class RandomPermutation(object):
+	"""A pseudo-random permutation of range(n), computed on the fly: a 4-round Feistel
+	network over the smallest even number of bits covering n, with values past n walked
+	through the network again until they land inside. Memory does not depend on n.
+	"""
+
+	def __init__(self, n, key):
+		self.n = n
+		bits = max(2, int(n - 1).bit_length())
+		self._half = _UINT64((bits + 1) // 2)
+		self._mask = _UINT64((1 << ((bits + 1) // 2)) - 1)
+		with np.errstate(over="ignore"):
+			self._keys = [_mix(_UINT64(key) * _UINT64(4) + _UINT64(r)) for r in range(4)]
+
+	def _rounds(self, x):
+		(left, right) = (x >> self._half, x & self._mask)
+		for key in self._keys:
+			(left, right) = (right, left ^ (_mix(right ^ key) & self._mask))
+		return (left << self._half) | right
+
+	def __call__(self, positions):
+		"""Return:
+		the permuted values at the given positions of range(n)
+		"""
+		with np.errstate(over="ignore"):
+			x = self._rounds(np.asarray(positions, dtype=np.uint64))
+			outside = np.flatnonzero(x >= _UINT64(self.n))
+			while len(outside):
+				x[outside] = self._rounds(x[outside])
+				outside = outside[x[outside] >= _UINT64(self.n)]
+		return x.astype(np.int64)
+
+class MinibatchSampler(object):
+	"""Draws minibatches of samples uniformly at random from a SampleIndex.
+
+	Without replacement, every epoch visits each sample once in the order of a
+	RandomPermutation keyed on the seed and the epoch, so the sampler keeps only its
+	position. A minibatch crossing the end of an epoch is completed from the next one.
+	With replacement, ids are drawn independently.
+	"""
+
+	def __init__(self, index, batch_size, seed=0, replacement=False, unpack=True):
+		self.index = index
+		self.batch_size = batch_size
+		self.seed = seed
+		self.replacement = replacement
+		self.unpack = unpack
+		self._rng = np.random.RandomState(seed)
+		self.epoch = 0
+		self.position = 0
+		self._permutation = self._epoch_permutation()
+
+	def _epoch_permutation(self):
+		return RandomPermutation(len(self.index), self.seed * 1000003 + self.epoch)
+
+	def next_ids(self):
+		"""Return:
+		the global ids of the next minibatch
+		"""
+		n = len(self.index)
+		if self.replacement:
+			return self._rng.randint(n, size=self.batch_size)
+		ids = []
+		wanted = self.batch_size
+		while wanted:
+			take = min(wanted, n - self.position)
+			ids.append(self._permutation(np.arange(self.position, self.position + take)))
+			(self.position, wanted) = (self.position + take, wanted - take)
+			if self.position == n:
+				(self.epoch, self.position) = (self.epoch + 1, 0)
+				self._permutation = self._epoch_permutation()
+		return np.concatenate(ids)
+
+	def next_batch(self):
+		"""Return:
+		(states, actions) of the next minibatch
+		"""
+		return self.index.read(self.next_ids(), self.unpack)
+
+	def __iter__(self):
+		while True:
+			yield self.next_batch()
+
+def _signed(key):
+	"""a 64-bit hash as the signed integer SQLite stores
+	"""
+	return key - (1 << 64) if key >= 1 << 63 else key
+
+class PositionIndex(object):
+	"""Disk-backed map from canonical position hashes (see AlphaGo.go.canonical_hash) to
+	the sample that stands for the position, with the counts of the moves played from
+	it, for corpora too big to deduplicate in memory.
+
+	The index is an SQLite database at path: a table of positions, keyed by hash, with
+	their sample, the symmetry that turns that sample into the canonical orientation and
+	how often the position was seen; and a table of move counts per sample, with moves
+	in the orientation of the sample. Changes are kept in a transaction until commit().
+
+	Positions are added game by game (see start_game), and the games added since the
+	index was opened are journalled with what they changed, so that the games a run
+	committed to the index but did not get to record elsewhere (in the converter, its
+	manifest) can be rolled back when the index is opened again.
+
+	Keyword arguments:
+	path -- the database file, created if missing
+	size -- board size of the positions
+	count -- if given, the number of samples on disk: positions of samples past it were
+		left by an interrupted run and are forgotten
+	recorded -- if given, the (name, start) of the games known to be converted: the
+		journalled games not among them are rolled back, then the journal is cleared
+	"""
+
+	def __init__(self, path, size=19, count=None, recorded=None):
+		self.path = path
+		self.size = size
+		self._db = sqlite3.connect(path)
+		self._db.execute("CREATE TABLE IF NOT EXISTS positions (hash INTEGER PRIMARY KEY, sample INTEGER, symmetry INTEGER, seen INTEGER, written INTEGER)")
+		self._db.execute("CREATE TABLE IF NOT EXISTS moves (sample INTEGER, move INTEGER, count INTEGER, PRIMARY KEY (sample, move)) WITHOUT ROWID")
+		# the journal: games in the order they were added, and the positions each of
+		# them saw again
+		self._db.execute("CREATE TABLE IF NOT EXISTS games (game INTEGER PRIMARY KEY, name TEXT, start INTEGER)")
+		self._db.execute("CREATE TABLE IF NOT EXISTS repeats (game INTEGER, hash INTEGER, sample INTEGER, move INTEGER)")
+		self._game = None
+		if recorded is not None:
+			self._roll_back(recorded)
+		if count is not None:
+			self._forget_from(count)
+		self.commit()
+
+	def _forget_from(self, sample):
+		self._db.execute("DELETE FROM positions WHERE sample >= ?", (sample,))
+		self._db.execute("DELETE FROM moves WHERE sample >= ?", (sample,))
+
+	def _roll_back(self, recorded):
+		"""undo the journalled games whose (name, start) is not in recorded, and clear
+		the journal
+		"""
+		games = self._db.execute("SELECT game, name, start FROM games ORDER BY game").fetchall()
+		undone = [(game, start) for (game, name, start) in games if (name, start) not in recorded]
+		for (game, start) in undone:
+			for (key, sample, move) in self._db.execute("SELECT hash, sample, move FROM repeats WHERE game = ?", (game,)).fetchall():
+				self._db.execute("UPDATE positions SET seen = seen - 1 WHERE hash = ?", (key,))
+				self._db.execute("UPDATE moves SET count = count - 1 WHERE sample = ? AND move = ?", (sample, move))
+		if undone:
+			# samples are numbered in game order: the new positions of the games undone
+			# have the samples from the first of them on
+			self._forget_from(min(start for (game, start) in undone))
+			self._db.execute("DELETE FROM moves WHERE count <= 0")
+		self._db.execute("DELETE FROM repeats")
+		self._db.execute("DELETE FROM games")
+
+	def __len__(self):
+		return self._db.execute("SELECT COUNT(*) FROM positions").fetchone()[0]
+
+	def commit(self):
+		self._db.commit()
+
+	def close(self, commit=True):
+		"""close the database, dropping the changes since the last commit() unless commit
+		"""
+		if commit:
+			self.commit()
+		self._db.close()
+
+	def start_game(self, name, start):
+		"""journal the positions added from now on as those of the named game, whose
+		samples start at sample id start
+		"""
+		self._game = self._db.execute("INSERT INTO games (name, start) VALUES (?, ?)", (name, start)).lastrowid
+
+	def add(self, key, symmetry, move, sample):
+		"""Count one occurrence of a position and the move played from it, in the game
+		started last.
+
+		Keyword arguments:
+		key, symmetry -- the canonical hash of the position and its symmetry, as returned
+			by canonical_hash
+		move -- the flat index x * size + y of the move played
+		sample -- the id the position's sample gets if it is new
+
+		Return:
+		True if the position is new and sample now stands for it, False if it was seen
+		before and only its counts changed
+		"""
+		key = _signed(key)
+		row = self._db.execute("SELECT sample, symmetry FROM positions WHERE hash = ?", (key,)).fetchone()
+		if row is None:
+			self._db.execute("INSERT INTO positions VALUES (?, ?, ?, 1, 1)", (key, sample, symmetry))
+			self._db.execute("INSERT INTO moves VALUES (?, ?, 1)", (sample, move))
+			return True
+		(sample, first_symmetry) = row
+		# through the canonical orientation into the orientation of the first sample
+		canonical = transform_moves(move, symmetry, size=self.size)
+		move = int(transform_moves(canonical, first_symmetry, inverse=True, size=self.size))
+		self._db.execute("UPDATE positions SET seen = seen + 1 WHERE hash = ?", (key,))
+		self._db.execute("INSERT OR IGNORE INTO moves VALUES (?, ?, 0)", (sample, move))
+		self._db.execute("UPDATE moves SET count = count + 1 WHERE sample = ? AND move = ?", (sample, move))
+		if self._game is not None:
+			self._db.execute("INSERT INTO repeats VALUES (?, ?, ?, ?)", (self._game, key, sample, move))
+		return False
+
+	def changed_counts(self):
+		"""Iterate over the samples whose positions were seen again since the last
+		mark_written(), in sample order.
+
+		Return:
+		(sample, counts) pairs, counts a (size * size,) uint32 array of the times each
+		move was played from the position
+		"""
+		rows = self._db.execute("SELECT m.sample, m.move, m.count FROM positions p JOIN moves m ON m.sample = p.sample "
+			"WHERE p.seen != p.written ORDER BY m.sample")
+		for (sample, moves) in itertools.groupby(rows, lambda row: row[0]):
+			counts = np.zeros(self.size * self.size, dtype=np.uint32)
+			for (_, move, count) in moves:
+				counts[move] = count
+			yield (sample, counts)
+
+	def mark_written(self):
+		"""record that the counts of changed_counts() are stored with the samples
+		"""
+		self._db.execute("UPDATE positions SET written = seen WHERE seen != written")
+
+def random_symmetries(states, actions=None, rng=np.random):
+	"""Apply one of the 8 board symmetries, drawn independently for each sample, to a
+	minibatch, with one gather per symmetry (see AlphaGo.go.transform_flat).
+
+	Keyword arguments:
+	states -- (N, planes, size, size) features
+	actions -- labels that move with the board: one-hot boards (N, size, size), flat
+		one-hot vectors (N, size * size) or flat move indices (N,); None for labels that
+		do not, like game outcomes
+	rng -- the numpy RandomState to draw symmetries from
+
+	Return:
+	(states, actions, symmetries) -- transformed copies, actions None if not given, and
+	the symmetry index of each sample
+	"""
+	states = np.asarray(states)
+	size = states.shape[-1]
+	symmetries = rng.randint(len(SYMMETRY_TRANSFORMS), size=len(states))
+	states = transform_planes(states, symmetries)
+	if actions is not None:
+		actions = np.asarray(actions)
+		if actions.ndim == 1:
+			actions = transform_moves(actions, symmetries, size=size)
+		elif actions.ndim == 2:
+			actions = transform_flat(actions, symmetries)
+		else:
+			actions = transform_planes(actions, symmetries)
+	return (states, actions, symmetries)
+
+def move_distributions(actions):
+	"""float32 copies of a minibatch of move labels, each scaled to sum to 1: one-hot
+	moves are unchanged, and the move counts of a deduplicated dataset become the
+	frequencies of the moves played from the position
+	"""
+	actions = np.asarray(actions, dtype=np.float32)
+	totals = actions.reshape(len(actions), -1).sum(axis=1)
+	totals[totals == 0] = 1
+	return actions / totals.reshape((len(actions),) + (1,) * (actions.ndim - 1))
+
+def move_weights(actions):
+	"""float32 sample weights of a minibatch of move labels: the number of moves each
+	counts, 1 for one-hot moves and the times the position was played for the move
+	counts of a deduplicated dataset. Together with move_distributions these weigh
+	each position as often as the games played it, as in a dataset not deduplicated.
+	"""
+	actions = np.asarray(actions)
+	return actions.reshape(len(actions), -1).sum(axis=1, dtype=np.float32)
+
+def augmented(batches, rng=np.random, transform_actions=True):
+	"""Random symmetry augmentation for a stream of (states, actions) minibatches, such
+	as a MinibatchSampler; with transform_actions False the actions pass unchanged.
+	"""
+	for (states, actions) in batches:
+		(states, moved, symmetries) = random_symmetries(states, actions if transform_actions else None, rng)
+		yield (states, moved if transform_actions else actions)
+
+if __name__ == '__main__':
+	import argparse
+	parser = argparse.ArgumentParser(description='Build the sample index the trainers draw minibatches from.')
+	parser.add_argument("index", help="Path of the index file to write")
+	parser.add_argument("datasets", nargs="+", help="Converted datasets (samples.h5 files or npy shard folders)")
+	args = parser.parse_args()
+
+	index = SampleIndex.build(args.datasets, args.index)
+	print("%d samples in %d shards" % (len(index), len(index.shards)))
@@ -0,0 +1,242 @@
+"""The input planes of the networks, kept up to date as a game is played.
+
+Building every plane from scratch costs a full board scan per plane per position.
+FeatureEncoder follows one GameState instead and after each move rewrites only the
+points whose planes can have changed, so the training converter and a live player
+get the same features at the same low cost.
+
+The planes come in named groups (FEATURES), and each network takes a feature set, a
+list of groups (FEATURE_SETS). An encoder computes only the groups of its set, and
+builds the lookahead or reads ladders only when a group in it needs them.
+"""
+import numpy as np
+from AlphaGo.go import BLACK, WHITE, EMPTY
+from AlphaGo.lookahead import MoveOutcomes
+from AlphaGo.ladders import LadderReader
+
+# plane indices
+STONES = slice(0, 3)  # the player to move's stones, the opponent's, empty points
+ONES = 3
+TURNS_SINCE = slice(4, 12)  # never played, then played 1, 2, ..., 6 and 7 or more turns ago
+LIBERTIES = slice(12, 20)  # 1, 2, ..., 8 or more liberties
+CAPTURE_SIZE = slice(20, 28)  # 0, 1, ..., 7 or more stones captured by playing there
+SELF_ATARI_SIZE = slice(28, 36)  # 1, 2, ..., 8 or more own stones left in atari
+LIBERTIES_AFTER = slice(36, 44)  # 1, 2, ..., 8 or more liberties after playing there
+LADDER_CAPTURE = 44
+LADDER_ESCAPE = 45
+SENSIBLENESS = 46
+ZEROS = 47
+PLANES = 48
+# the value network's extra plane: set everywhere when black is to move
+COLOR = 48
+
+# bump when the planes an encoder produces change, so converted data is redone
+FEATURES_VERSION = 1
+
+# name -> (planes in the full tensor, what computing them needs besides the state):
+# 'outcomes' is the lookahead of a MoveOutcomes, 'ladders' the reads of a LadderReader
+FEATURES = {
+	'board': (STONES, []),
+	'ones': (slice(ONES, ONES + 1), []),
+	'turns_since': (TURNS_SINCE, []),
+	'liberties': (LIBERTIES, []),
+	'capture_size': (CAPTURE_SIZE, ['outcomes']),
+	'self_atari_size': (SELF_ATARI_SIZE, ['outcomes']),
+	'liberties_after': (LIBERTIES_AFTER, ['outcomes']),
+	'ladder_capture': (slice(LADDER_CAPTURE, LADDER_CAPTURE + 1), ['ladders']),
+	'ladder_escape': (slice(LADDER_ESCAPE, LADDER_ESCAPE + 1), ['ladders']),
+	'sensibleness': (slice(SENSIBLENESS, SENSIBLENESS + 1), []),
+	'zeros': (slice(ZEROS, ZEROS + 1), []),
+	'color': (slice(COLOR, COLOR + 1), [])}
+
+# the groups each target format of the converter is made of, in plane order
+DEEP_FEATURES = ['board', 'ones', 'turns_since', 'liberties', 'capture_size', 'self_atari_size',
+	'liberties_after', 'ladder_capture', 'ladder_escape', 'sensibleness', 'zeros']
+FEATURE_SETS = {
+	'deep': DEEP_FEATURES,
+	# the planes read off the board, without lookahead
+	'shallow': ['board', 'ones', 'turns_since', 'liberties'],
+	'value': DEEP_FEATURES + ['color']}
+
+def feature_planes(feature_set):
+	"""Return:
+	the indices into the full tensor of the planes of a feature set (a name in
+	FEATURE_SETS or a list of names in FEATURES), in order
+	"""
+	names = FEATURE_SETS[feature_set] if isinstance(feature_set, str) else feature_set
+	return [plane for name in names for plane in range(*FEATURES[name][0].indices(COLOR + 1))]
+
+def _one_hot(values, mask, planes=8):
+	"""(planes, len(values)) one-hot columns of non-negative values, the last plane
+	collecting everything from planes - 1 up, set only where mask is
+	"""
+	return (np.minimum(values, planes - 1) == np.arange(planes)[:, np.newaxis]) & mask
+
+class FeatureEncoder(object):
+	"""The (planes, size, size) feature tensor of a GameState for a feature set (a name in
+	FEATURE_SETS or a list of names in FEATURES, 'deep' by default), as seen by the
+	player to move. Groups outside the set are not computed.
+
+	update() follows the state: call it after every move played on it. Only the points
+	around the stones that changed are rewritten; the planes of the player to move and
+	the opponent are swapped in place, and the what-if planes (capture size, self-atari
+	size, liberties after move) are kept for both colors and copied in for the player to
+	move. The ladder planes come from a LadderReader, which reuses earlier reads, and
+	sensibleness from GameState.sensible_moves_mask.
+
+	features is a read-only view of the tensor, updated in place, when the planes of
+	the set are consecutive in the full tensor, as they are for every FEATURE_SETS
+	entry; otherwise it is a new array each time. Copy it to keep a position. If several
+	moves were played between updates, or moves were undone, the tensor is rebuilt, and
+	stones whose age is not known count as 7 or more turns old.
+	"""
+
+	def __init__(self, state, ladders=None, feature_set='deep'):
+		self.state = state
+		self.size = state.size
+		self.feature_set = feature_set
+		names = FEATURE_SETS[feature_set] if isinstance(feature_set, str) else feature_set
+		self._computed = set(names)
+		needs = set(need for name in names for need in FEATURES[name][1])
+		self.ladders = None
+		if 'ladders' in needs:
+			self.ladders = LadderReader() if ladders is None else ladders
+		self.outcomes = MoveOutcomes(state) if 'outcomes' in needs else None
+		# the full tensor, of which the set's planes are given out
+		self._planes = np.zeros((COLOR + 1, self.size, self.size), dtype=bool)
+		# flat views of the same memory, one row per plane
+		self._flat = self._planes.reshape(COLOR + 1, -1)
+		planes = feature_planes(names)
+		if planes == list(range(planes[0], planes[-1] + 1)):
+			self._index = slice(planes[0], planes[-1] + 1)
+			self._features = self._planes[self._index]
+			self._features.flags.writeable = False
+		else:
+			self._index = planes
+			self._features = None
+		# the what-if planes of each color, flat
+		self._what_if = {BLACK: np.zeros((24, self.size ** 2), dtype=bool), WHITE: np.zeros((24, self.size ** 2), dtype=bool)}
+		self.recompute()
+
+	@property
+	def features(self):
+		if self._features is None:
+			return self._planes[self._index]
+		return self._features
+
+	def recompute(self):
+		"""Rebuild every plane from the state.
+		"""
+		state = self.state
+		board = np.array(state.board).ravel()
+		self._board = board
+		self._player = state.current_player
+		self._turns = state.turns_played
+		self._flat[:] = False
+		if 'ones' in self._computed:
+			self._flat[ONES] = True
+		# the points of the last 7 moves, youngest first, with the turn they were played
+		self._recent = []
+		if 'turns_since' in self._computed:
+			self._flat[TURNS_SINCE.start] = board == EMPTY
+			self._flat[TURNS_SINCE.stop - 1] = board != EMPTY
+		if self.outcomes is not None:
+			self.outcomes.recompute()
+		self._update_points(np.arange(self.size ** 2), board)
+		self._update_position()
+
+	def update(self):
+		"""Bring the planes up to date with the state after one move.
+		"""
+		state = self.state
+		if state.turns_played == self._turns:
+			return
+		if state.turns_played != self._turns + 1:
+			self.recompute()
+			return
+		board = np.array(state.board).ravel()
+		changed = np.flatnonzero(board != self._board)
+		# the last move is the point that just got a stone of the player who moved
+		placed = changed[(board[changed] == self._player) & (self._board[changed] == EMPTY)]
+		self._board = board
+		self._player = state.current_player
+		self._turns = state.turns_played
+
+		flat = self._flat
+		flat[[0, 1]] = flat[[1, 0]]
+		if 'turns_since' in self._computed:
+			self._age(placed[0] if len(placed) == 1 else None)
+		if self.outcomes is not None:
+			self.outcomes.update()
+			self._update_points(np.array(self.outcomes.updated, dtype=int), board)
+		else:
+			# without the lookahead's list of points, rewrite the board-wide planes
+			self._update_points(np.arange(self.size ** 2), board)
+		self._update_position()
+
+	def _age(self, move):
+		"""move the last 7 moves one plane older and add move (None for a pass)
+		"""
+		flat = self._flat
+		ages = range(TURNS_SINCE.start, TURNS_SINCE.stop)
+		recent = []
+		for (p, turn) in self._recent:
+			# the age after this move
+			age = self._turns - turn
+			if age < 7:
+				recent.append((p, turn))
+			flat[ages[age - 1], p] = False
+			flat[ages[min(age, 7)], p] = True
+		if move is not None:
+			for k in ages:
+				flat[k, move] = False
+			flat[ages[1], move] = True
+			# a point played again only counts from its latest move
+			recent = [(p, turn) for (p, turn) in recent if p != move]
+			recent.insert(0, (move, self._turns - 1))
+		self._recent = recent
+
+	def _update_points(self, points, board):
+		"""rewrite the stone, liberty and what-if columns of the given flat points
+		"""
+		if len(points) == 0:
+			return
+		state = self.state
+		flat = self._flat
+		values = board[points]
+		flat[0, points] = values == state.current_player
+		flat[1, points] = values == -state.current_player
+		flat[2, points] = values == EMPTY
+		if 'liberties' in self._computed:
+			counts = state.liberty_counts.ravel()[points]
+			flat[LIBERTIES, points] = _one_hot(counts - 1, values != EMPTY)
+		outcomes = self.outcomes
+		if outcomes is None:
+			return
+		for color in [BLACK, WHITE]:
+			liberties = outcomes.liberties[color][points]
+			playable = (values == EMPTY) & (liberties > 0)
+			what_if = self._what_if[color]
+			what_if[0:8, points] = _one_hot(outcomes.captures[color][points], playable)
+			what_if[8:16, points] = _one_hot(outcomes.chain_sizes[color][points] - 1, playable & (liberties == 1))
+			what_if[16:24, points] = _one_hot(liberties - 1, playable)
+
+	def _update_position(self):
+		"""the planes that depend on the whole position: what-if planes of the player to
+		move with ko applied, ladders and sensibleness
+		"""
+		state = self.state
+		flat = self._flat
+		computed = self._computed
+		if self.outcomes is not None:
+			flat[CAPTURE_SIZE.start:LIBERTIES_AFTER.stop] = self._what_if[state.current_player]
+			if state.ko is not None:
+				self._planes[CAPTURE_SIZE.start:LIBERTIES_AFTER.stop, state.ko[0], state.ko[1]] = False
+		if 'ladder_capture' in computed:
+			self._planes[LADDER_CAPTURE] = self.ladders.ladder_captures(state)
+		if 'ladder_escape' in computed:
+			self._planes[LADDER_ESCAPE] = self.ladders.ladder_escapes(state)
+		if 'sensibleness' in computed:
+			self._planes[SENSIBLENESS] = state.sensible_moves_mask()
+		if 'color' in computed:
+			flat[COLOR] = state.current_player == BLACK
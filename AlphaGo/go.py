@@ -1,20 +1,352 @@
+import array
 import numpy as np
 
 WHITE = -1
 BLACK = +1
 EMPTY = 0
+# value of the sentinel points that surround the board in the padded layout
+BORDER = 2
+
+# the action of passing instead of placing a stone; two passes in a row end the game
+PASS_MOVE = None
+
+# the 8 points around a point, in the order of their digits in a 3x3 pattern code
+PATTERN_NEIGHBORS = [(1, 0), (0, 1), (-1, 0), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)]
+# number of distinct 3x3 pattern codes: each neighbor is one base-4 digit
+PATTERN_CODES = 4 ** len(PATTERN_NEIGHBORS)
+
+# board representations GameState can be constructed with
+BACKENDS = ("numpy", "bitboard")
+
+# fixed seed so that position hashes are reproducible across runs and processes
+ZOBRIST_SEED = 0x5eed
+_zobrist_cache = {}
+
+def zobrist_keys(size):
+	"""Return the table of 64-bit Zobrist keys for a board of the given size.
+
+	keys[color][x][y] is the key of a stone of that color (BLACK or WHITE) at (x, y);
+	the hash of a position is the XOR of the keys of all stones on the board, so the
+	empty board hashes to 0. Tables are generated once per size and cached.
+	"""
+	if size not in _zobrist_cache:
+		rng = np.random.RandomState(ZOBRIST_SEED)
+		# combine two 32-bit draws per key; plain python ints keep XOR cheap
+		words = rng.randint(0, 2**32, size=(2, size, size, 2))
+		keys = {}
+		for (i, color) in enumerate([BLACK, WHITE]):
+			keys[color] = [[(int(words[i][x][y][0]) << 32) | int(words[i][x][y][1])
+				for y in range(size)] for x in range(size)]
+		_zobrist_cache[size] = keys
+	return _zobrist_cache[size]
+
+# the 8 rotations and reflections of a board, in the order of GameState.symmetries()
+SYMMETRY_TRANSFORMS = [
+	# noop
+	lambda board: board,
+	# rotate CCW 90
+	lambda board: np.rot90(board, 1),
+	# rotate 180
+	lambda board: np.rot90(board, 2),
+	# rotate CCW 270
+	lambda board: np.rot90(board, 3),
+	# mirror left-right
+	lambda board: np.fliplr(board),
+	# mirror up-down
+	lambda board: np.flipud(board),
+	# mirror \ diagonal
+	lambda board: np.transpose(board),
+	# mirror / diagonal (equivalently: rotate 90 CCW then flip LR)
+	lambda board: np.fliplr(np.rot90(board, 1))]
+
+_symmetry_cache = {}
+
+def symmetry_tables(size=19):
+	"""Return the 8 symmetries of a board of the given size as index permutations.
+
+	Points are flat indices x * size + y. forward[k] lists, for each point of the
+	transformed board, the point of the original board it comes from, so
+	values[..., forward[k]] is SYMMETRY_TRANSFORMS[k] applied to flat values;
+	inverse[k] is the permutation that undoes it. Tables are computed once per
+	size, cached and read-only.
+
+	Return:
+	(forward, inverse) -- two int arrays of shape (8, size * size)
+	"""
+	if size not in _symmetry_cache:
+		points = np.arange(size * size).reshape(size, size)
+		forward = np.array([transform(points).ravel() for transform in SYMMETRY_TRANSFORMS])
+		inverse = np.argsort(forward, axis=1)
+		forward.flags.writeable = False
+		inverse.flags.writeable = False
+		_symmetry_cache[size] = (forward, inverse)
+	return _symmetry_cache[size]
+
+def transform_flat(values, k, inverse=False):
+	"""Apply symmetry k to values over flat board points, such as a batch of move
+	probability vectors, in one fancy-indexing call.
+
+	Keyword arguments:
+	values -- array of shape (..., size * size)
+	k -- index into SYMMETRY_TRANSFORMS, or an array of N indices to apply one
+	     symmetry per sample of a batch of shape (N, ..., size * size)
+	inverse -- apply the inverse of symmetry k instead, e.g. to map a policy
+	           computed on a transformed board back onto the original board
+
+	Return:
+	a transformed copy of values
+	"""
+	values = np.asarray(values)
+	area = values.shape[-1]
+	(forward, backward) = symmetry_tables(int(round(np.sqrt(area))))
+	table = backward if inverse else forward
+	if np.ndim(k) == 0:
+		return values[..., table[k]]
+	# a different permutation per sample: one gather for the samples of each symmetry,
+	# about twice as fast as indexing (sample, plane, point) all at once
+	k = np.asarray(k)
+	flat = values.reshape(len(k), -1, area)
+	result = np.empty_like(flat)
+	for symmetry in range(len(table)):
+		samples = np.flatnonzero(k == symmetry)
+		if len(samples):
+			result[samples] = flat[samples][:, :, table[symmetry]]
+	return result.reshape(values.shape)
+
+def transform_planes(planes, k, inverse=False):
+	"""Apply symmetry k to boards or feature planes of shape (..., size, size), for
+	example a batch of feature tensors (N, planes, size, size). k and inverse are as
+	in transform_flat.
+	"""
+	planes = np.asarray(planes)
+	shape = planes.shape
+	flat = planes.reshape(shape[:-2] + (shape[-2] * shape[-1],))
+	return transform_flat(flat, k, inverse).reshape(shape)
+
+def transform_moves(moves, k, inverse=False, size=19):
+	"""Map flat move indices x * size + y to where symmetry k moves them.
+
+	moves and k broadcast against each other, so one symmetry can be applied to many
+	moves or one symmetry per move of a batch.
+	"""
+	(forward, backward) = symmetry_tables(size)
+	# the point a move lands on is found through the opposite table
+	table = forward if inverse else backward
+	return table[k, moves]
+
+# mixed into canonical_hash when white is to move
+ZOBRIST_WHITE_TO_MOVE = 0x9e3779b97f4a7c15
+_canonical_cache = {}
+
+def _canonical_keys(size):
+	"""keys[color][k][p]: the Zobrist key that a stone of color at flat point p gets once
+	symmetry k is applied to the board
+	"""
+	if size not in _canonical_cache:
+		(forward, inverse) = symmetry_tables(size)
+		keys = zobrist_keys(size)
+		_canonical_cache[size] = dict((color, np.array(keys[color], dtype=np.uint64).ravel()[inverse])
+			for color in [BLACK, WHITE])
+	return _canonical_cache[size]
+
+def canonical_hash(board, player):
+	"""Hash a position so that its 8 rotations and reflections hash alike: the smallest
+	of the Zobrist hashes of the 8 transformed boards (see GameState.hash), with
+	ZOBRIST_WHITE_TO_MOVE mixed in when player is WHITE.
+
+	Return:
+	(hash, k) -- the hash, a python int, and the index into SYMMETRY_TRANSFORMS of the
+	symmetry that gives it; transform_moves(move, k) maps a move on board to the same
+	move in that canonical orientation
+	"""
+	flat = np.asarray(board).ravel()
+	keys = _canonical_keys(int(round(np.sqrt(len(flat)))))
+	hashes = np.zeros(len(SYMMETRY_TRANSFORMS), dtype=np.uint64)
+	for color in [BLACK, WHITE]:
+		points = np.flatnonzero(flat == color)
+		if len(points):
+			hashes ^= np.bitwise_xor.reduce(keys[color][:, points], axis=1)
+	if player == WHITE:
+		hashes ^= np.uint64(ZOBRIST_WHITE_TO_MOVE)
+	k = int(np.argmin(hashes))
+	return (int(hashes[k]), k)
+
+# pattern codes are stored in the int16 buffer as code + PATTERN_BIAS
+PATTERN_BIAS = -2 ** 15
+
+def _pattern_digit(color):
+	"""the base-4 digit of a point of color in a pattern code: EMPTY 0, BLACK 1, WHITE 2,
+	BORDER (off the board) 3
+	"""
+	return 3 if color == BORDER else color % 3
+
+class _Layout(object):
+	"""Tables shared by every GameState of one board size.
+
+	Points are indexed on a flat board padded with one ring of BORDER points, so
+	(x, y) is index (x + 1) * stride + (y + 1) with stride = size + 2. The edge never
+	needs a bounds check: the neighbors of an on-board point always exist.
+	"""
+
+	def __init__(self, size):
+		self.size = size
+		self.stride = size + 2
+		self.area = self.stride * self.stride
+		s = self.stride
+		self.points = [(x + 1) * s + (y + 1) for x in range(size) for y in range(size)]
+		# position_of[i] is the (x, y) of index i, None on the border
+		self.position_of = [None] * self.area
+		for x in range(size):
+			for y in range(size):
+				self.position_of[(x + 1) * s + (y + 1)] = (x, y)
+		# neighbors[i] in the order (x+1, y), (x, y+1), (x-1, y), (x, y-1)
+		self.neighbors = [(i + s, i + 1, i - s, i - 1) for i in range(self.area)]
+		# for whole-board array operations: the neighbors (same order) and diagonals as
+		# offsets into the flat board and as slices of the padded stride x stride board,
+		# lined up with the interior [1:-1, 1:-1]
+		self.neighbor_offsets = (s, 1, -s, -1)
+		self.points_array = np.array(self.points)
+		inner, plus, minus = slice(1, -1), slice(2, None), slice(0, -2)
+		self.neighbor_slices = [(plus, inner), (inner, plus), (minus, inner), (inner, minus)]
+		self.diagonal_slices = [(plus, plus), (plus, minus), (minus, plus), (minus, minus)]
+		keys = zobrist_keys(size)
+		self.zobrist = {}
+		self.zobrist_array = {}
+		for color in [BLACK, WHITE]:
+			self.zobrist[color] = [0] * self.area
+			for (x, y) in [p for p in self.position_of if p is not None]:
+				self.zobrist[color][(x + 1) * s + (y + 1)] = keys[color][x][y]
+			self.zobrist_array[color] = np.array(self.zobrist[color], dtype=np.uint64)
+		# 3x3 patterns: when the color of index i changes, pattern_updates[i] lists the
+		# buffer index of the pattern of each point around i and the weight of i's
+		# digit in it
+		n = self.area
+		offsets = [dx * s + dy for (dx, dy) in PATTERN_NEIGHBORS]
+		self.pattern_updates = [[] for i in range(n)]
+		for i in self.points:
+			self.pattern_updates[i] = [(4 * n + i - offset, 4 ** k) for (k, offset) in enumerate(offsets)]
+		# the buffer of an empty board (see GameState), copied by every new state
+		colors = [BORDER] * n
+		for i in self.points:
+			colors[i] = EMPTY
+		patterns = []
+		for i in range(n):
+			digits = [colors[i + offset] if 0 <= i + offset < n else BORDER for offset in offsets]
+			patterns.append(sum(_pattern_digit(c) * 4 ** k for (k, c) in enumerate(digits)) + PATTERN_BIAS)
+		self.empty_data = array.array('h', colors + list(range(n)) + list(range(n)) + [-1] * n + patterns)
+
+_layout_cache = {}
+
+def _layout(size):
+	if size not in _layout_cache:
+		_layout_cache[size] = _Layout(size)
+	return _layout_cache[size]
 
 class GameState(object):
 	"""State of a game of Go and some basic functions to interact with it
+
+	hash is a 64-bit Zobrist hash of the stones on the board (not of the player to move),
+	maintained incrementally by do_move. Transposition tables and caches can key on it,
+	combined with current_player where the side to move matters.
+
+	Everything that describes the board lives in one flat int16 buffer of four
+	segments, each indexed by padded point index (see _Layout):
+	- color: EMPTY, BLACK, WHITE or BORDER
+	- chain: the index of the root stone of the point's chain (the point itself when empty)
+	- next: the next stone of the same chain, as a circular list
+	- libs: at a chain's root, the chain's liberty count (-1 for empty points)
+	- pattern: the point's 3x3 pattern code (see pattern_code), offset by PATTERN_BIAS
+	so copy() is one memcpy of that buffer plus a few scalars. board and liberty_counts
+	are read-only numpy views/arrays derived from it.
+
+	GameState(backend="bitboard") constructs an AlphaGo.bitboard.BitboardGameState
+	instead, which keeps the same interface but stores each color as a bitset.
 	"""
 
-	def __init__(self, size=19):
-		self.board = np.zeros((size, size))
-		self.board.fill(EMPTY)
+	__slots__ = ('size', 'turns_played', 'current_player', 'ko', 'passes', 'enforce_superko', 'hash',
+		'previous_hashes', '_history_shared', '_layout', '_data', '_board_view', '_trail', '_journal')
+
+	def __new__(cls, size=19, enforce_superko=True, backend="numpy"):
+		if backend not in BACKENDS:
+			raise ValueError("Unrecognized backend: %s" % backend)
+		if cls is GameState and backend == "bitboard":
+			# imported here since bitboard builds on this module
+			from AlphaGo.bitboard import BitboardGameState
+			cls = BitboardGameState
+		return object.__new__(cls)
+
+	def __init__(self, size=19, enforce_superko=True, backend="numpy"):
 		self.size = size
 		self.turns_played = 0
 		self.current_player = BLACK
-	
+		# the point (if any) that may not be played right now because of simple ko
+		self.ko = None
+		# consecutive passes just played; two end the game
+		self.passes = 0
+		# Zobrist hashing of positions for constant-time positional superko checks
+		self.enforce_superko = enforce_superko
+		self.hash = 0
+		self.previous_hashes = set([self.hash])
+		# copies share previous_hashes until one of them plays a move
+		self._history_shared = False
+		self._layout = _layout(size)
+		self._data = self._layout.empty_data[:]
+		self._board_view = None
+		# undo journal: _trail holds (index, old value) pairs of every buffer write made
+		# by do_move, _journal one frame per move (see do_move)
+		self._trail = []
+		self._journal = []
+
+	def _on_board(self, position):
+		"""simply return True iff position is within the bounds of [0, self.size)
+		"""
+		(x, y) = position
+		return x >= 0 and y >= 0 and x < self.size and y < self.size
+
+	def _index(self, position):
+		(x, y) = position
+		return (x + 1) * self._layout.stride + (y + 1)
+
+	@property
+	def board(self):
+		"""read-only size x size view of the colors, indexed board[x][y]
+		"""
+		if self._board_view is None:
+			s = self._layout.stride
+			view = np.frombuffer(self._data, dtype=np.int16, count=s * s).reshape(s, s)[1:-1, 1:-1]
+			view.flags.writeable = False
+			self._board_view = view
+		return self._board_view
+
+	@property
+	def liberty_counts(self):
+		"""size x size array of the liberty count of the chain at each point, -1 for empty points
+		"""
+		n = self._layout.area
+		s = self._layout.stride
+		data = np.frombuffer(self._data, dtype=np.int16).reshape(5, n)
+		# empty and border points are their own chain with -1 liberties
+		return data[3][data[1]].reshape(s, s)[1:-1, 1:-1].astype(int)
+
+	def pattern_code(self, position):
+		"""The 3x3 pattern around a position, as the colors of the 8 points around it
+		(in the order of PATTERN_NEIGHBORS) written as base-4 digits: EMPTY 0, BLACK 1,
+		WHITE 2, off the board 3. Kept up to date by do_move and undo.
+
+		Return:
+		an int in [0, PATTERN_CODES)
+		"""
+		return self._data[4 * self._layout.area + self._index(position)] - PATTERN_BIAS
+
+	@property
+	def pattern_codes(self):
+		"""size x size array of the pattern_code of every point
+		"""
+		n = self._layout.area
+		s = self._layout.stride
+		codes = np.frombuffer(self._data, dtype=np.int16)[4 * n:].reshape(s, s)[1:-1, 1:-1]
+		return codes.astype(int) - PATTERN_BIAS
+
 	def liberty_count(self, position):
 		"""Count liberty of a single position (maxium = 4).
 
@@ -29,7 +361,7 @@ class GameState(object):
 		return len(self.liberty_pos(position))
 
 	def liberty_pos(self, position):
-		"""Record the liberty position of a single position. 
+		"""Record the liberty position of a single position.
 
 		Keyword arguments:
 		position -- a tuple of (x, y)
@@ -39,20 +371,12 @@ class GameState(object):
 		Return:
 		pos -- Return a list of tuples consist of (x, y)s which are the liberty positions on the input single position. len(pos) <= 4
 		"""
-		(x, y) = position
-		pos=[]
-		if x+1 < self.size and self.board[x+1][y] == EMPTY:
-			pos.append((x+1, y))
-		if y+1 < self.size and self.board[x][y+1] == EMPTY:
-			pos.append((x, y+1))
-		if x - 1 >= 0 and self.board[x-1][y] == EMPTY:
-			pos.append((x-1, y))
-		if y - 1 >= 0 and self.board[x][y-1] == EMPTY:
-			pos.append((x, y-1))
-		return pos
+		d = self._data
+		position_of = self._layout.position_of
+		return [position_of[n] for n in self._layout.neighbors[self._index(position)] if d[n] == EMPTY]
 
 	def get_neighbor(self, position):
-		"""An auxiliary function for curr_liberties. This function looks around locally in 4 directions. That is, we just pick one position and look to see if there are same-color neighbors around it. 
+		"""An auxiliary function for curr_liberties. This function looks around locally in 4 directions. That is, we just pick one position and look to see if there are same-color neighbors around it.
 
 		Keyword arguments:
 		position -- a tuple of (x, y)
@@ -62,17 +386,10 @@ class GameState(object):
 		Return:
 		neighbor -- Return a list of tuples consist of (x, y)s which are the same-color neighbors of the input single position. len(neighbor_set) <= 4
 		"""
-		(x, y) = position
-		neighbor_set=[]
-		if y+1 < self.size and self.board[x][y] == self.board[x][y+1]:
-			neighbor_set.append((x,y+1))
-		if x+1 < self.size and self.board[x][y] == self.board[x+1][y]:
-			neighbor_set.append((x+1,y))
-		if x-1 >= 0 and self.board[x][y] == self.board[x-1][y]:
-			neighbor_set.append((x-1,y))	
-		if y-1 >= 0 and self.board[x][y] == self.board[x][y-1]:
-			neighbor_set.append((x,y-1))	
-		return neighbor_set	
+		d = self._data
+		i = self._index(position)
+		s = self._layout.stride
+		return [self._layout.position_of[n] for n in (i + 1, i + s, i - s, i - 1) if d[n] == d[i]]
 
 	def visit_neighbor(self, position):
 		"""An auxiliary function for curr_liberties. This function perform the visiting process to identify a connected group of the same color
@@ -83,33 +400,52 @@ class GameState(object):
 		y being the row index of the starting position of the search
 
 		Return:
-		neighbor_set -- Return a set of tuples consist of (x, y)s which are the same-color cluster which contains the input single position. len(neighbor_set) is size of the cluster, can be large. 
+		neighbor_set -- Return a set of tuples consist of (x, y)s which are the same-color cluster which contains the input single position. len(neighbor_set) is size of the cluster, can be large.
 		"""
-		(x, y) = position
-		# handle case where there is no piece at (x,y)
-		if self.board[x][y] == EMPTY:
+		i = self._index(position)
+		if self._data[i] == EMPTY:
 			return set()
-		# A list for record the places we visited in the process
-		# default to the starting position to handle the case where there are no neighbors (group size is 1)
-		visited=[(x,y)] 
-		# A list for the the places we still want to visit
-		to_visit=self.get_neighbor((x,y))
-		while len(to_visit)!=0:
-			for n in to_visit:
-				# append serve as the actual visit
-				visited.append(n)
-				# take off the places already visited from the wish list
-				to_visit.remove(n)
-			# With the cluster we have now, we look around even further
-			for v in visited:
-				# we try to look for same-color neighbors for each one which we already visited
-				for n in self.get_neighbor(v):
-					# we don't need to consider the places we already visited when we're looking
-					if n not in visited:
-						to_visit.append(n)
-
-		neighbor_set=set(visited)
-		return neighbor_set
+		position_of = self._layout.position_of
+		return set(position_of[j] for j in self._chain_stones(i))
+
+	def chain_liberties(self, position):
+		"""The liberties of the chain at a position.
+
+		Keyword arguments:
+		position -- a tuple of (x, y)
+
+		Return:
+		a list of the (x, y) empty points next to the chain; empty if position is empty
+		"""
+		i = self._index(position)
+		if self._data[i] == EMPTY:
+			return []
+		position_of = self._layout.position_of
+		return [position_of[j] for j in self._chain_liberties(i)]
+
+	def _chain_stones(self, i):
+		"""the indices of the stones of the chain through index i, by walking its circular list
+		"""
+		d = self._data
+		nxt = 2 * self._layout.area
+		stones = [i]
+		j = d[nxt + i]
+		while j != i:
+			stones.append(j)
+			j = d[nxt + j]
+		return stones
+
+	def _chain_liberties(self, i):
+		"""the set of liberty indices of the chain through index i
+		"""
+		d = self._data
+		neighbors = self._layout.neighbors
+		libs = set()
+		for j in self._chain_stones(i):
+			for n in neighbors[j]:
+				if d[n] == EMPTY:
+					libs.add(n)
+		return libs
 
 	def update_current_liberties(self):
 		"""Calculate the liberty values of the whole board
@@ -120,25 +456,10 @@ class GameState(object):
 		Return:
 		A matrix self.size * self.size, with entries of the liberty number of each position on the board.
 		Empty spaces have liberty 0. Instead of the single stone liberty, we consider the liberty of the
-		group/cluster of the same color the position is in. 
+		group/cluster of the same color the position is in.
 		"""
-
-		curr_liberties = np.ones((self.size, self.size)) * (-1)
-
-		for x in range(0, self.size):
-			for y in range(0, self.size):
-
-				if self.board[x][y] == EMPTY:
-					continue
-
-				# get the members in the cluster and then calculate their liberty positions
-				lib_set = set()
-				neighbors = self.visit_neighbor((x,y))
-				for n in neighbors:
-					lib_set |= set(self.liberty_pos(n))
-				
-				curr_liberties[x][y] = len(lib_set)
-		return curr_liberties
+		# liberty counts are kept up to date by do_move
+		return self.liberty_counts.astype(float)
 
 	def update_future_liberties(self, action):
 		"""Calculate the liberty values of the whole board after we make a new move
@@ -149,69 +470,431 @@ class GameState(object):
 		y being the row index of the position of the future move
 
 		Return:
-		A matrix self.size * self.size, with entries of the liberty number of each position on the board, after the future move. 
-		""" 
-		future = self.copy()
-		future.do_move(action)
-		future_liberties = future.update_current_liberties()
+		A matrix self.size * self.size, with entries of the liberty number of each position on the board, after the future move.
+		"""
+		# play and take back in place rather than copying the state
+		self.do_move(action)
+		future_liberties = self.update_current_liberties()
+		self.undo()
 
 		return future_liberties
 
 	def copy(self):
 		"""get a copy of this Game state
 		"""
-		other = GameState(self.size)
-		other.board = self.board.copy()
+		other = object.__new__(GameState)
+		other.size = self.size
 		other.turns_played = self.turns_played
 		other.current_player = self.current_player
+		other.ko = self.ko
+		other.passes = self.passes
+		other.enforce_superko = self.enforce_superko
+		other.hash = self.hash
+		# shared copy-on-write; whichever state plays next makes its own copy
+		other.previous_hashes = self.previous_hashes
+		other._history_shared = self._history_shared = True
+		other._layout = self._layout
+		other._data = self._data[:]
+		other._board_view = None
+		# a copy starts a fresh undo history
+		other._trail = []
+		other._journal = []
 		return other
 
+	def is_suicide(self, action):
+		"""return True iff playing action would leave the new stone's chain without liberties
+
+		A move is not suicide if it has an empty neighbor, connects to a friendly
+		chain with another liberty, or captures an opponent chain in atari.
+		"""
+		d = self._data
+		n = self._layout.area
+		color = self.current_player
+		for j in self._layout.neighbors[self._index(action)]:
+			c = d[j]
+			if c == EMPTY:
+				return False
+			elif c == color:
+				if d[3 * n + d[n + j]] > 1:
+					return False
+			elif c == -color and d[3 * n + d[n + j]] == 1:
+				return False
+		return True
+
+	def is_positional_superko(self, action):
+		"""return True iff playing action would recreate a previous position
+
+		The hash of the resulting position is derived from the current hash, the new
+		stone and any captured chains, so no board is built and the check costs
+		O(captured stones) plus one set lookup.
+		"""
+		i = self._index(action)
+		future_hash = self.hash ^ self._layout.zobrist[self.current_player][i] ^ self._captured_hash(i)
+		return future_hash in self.previous_hashes
+
+	def _captured_hash(self, i):
+		"""XOR of the keys of the opponent stones that playing at index i would capture
+		"""
+		d = self._data
+		n = self._layout.area
+		opponent = -self.current_player
+		keys = self._layout.zobrist[opponent]
+		h = 0
+		captured = []
+		for j in self._layout.neighbors[i]:
+			root = d[n + j]
+			# the same chain may touch i from two sides
+			if d[j] == opponent and d[3 * n + root] == 1 and root not in captured:
+				captured.append(root)
+				for k in self._chain_stones(root):
+					h ^= keys[k]
+		return h
+
+	def _arrays(self):
+		"""(color, chain, chain_libs): flat numpy arrays over all padded indices, where
+		chain_libs is the liberty count of the chain at each point (-1 if none)
+		"""
+		data = np.frombuffer(self._data, dtype=np.int16).reshape(5, self._layout.area)
+		return (data[0], data[1], data[3][data[1]])
+
+	def legal_moves_mask(self):
+		"""size x size boolean array, True where is_legal would be True for current_player
+
+		Computed for all points at once with array operations on the chain/liberty
+		data: a point is legal if it is empty, is not the ko point and has an empty
+		neighbor, a friendly neighbor chain with more than one liberty or an opponent
+		neighbor chain in atari. With enforce_superko, the hashes of all resulting
+		positions are derived in one pass and looked up in previous_hashes.
+		"""
+		L = self._layout
+		(color, chain, chain_libs) = self._arrays()
+		me = self.current_player
+		shape = (L.stride, L.stride)
+		empty = color == EMPTY
+		# points that would give a stone played next to them a liberty
+		breathing = empty | ((color == me) & (chain_libs > 1)) | ((color == -me) & (chain_libs == 1))
+		breathing = breathing.reshape(shape)
+		legal = empty.reshape(shape)[1:-1, 1:-1] & (breathing[L.neighbor_slices[0]] |
+			breathing[L.neighbor_slices[1]] | breathing[L.neighbor_slices[2]] | breathing[L.neighbor_slices[3]])
+		if self.ko is not None:
+			legal[self.ko] = False
+		if self.enforce_superko:
+			legal = legal.ravel()
+			legal[legal] = ~self._repeats_position(self._future_hashes(L.points_array[legal]))
+			legal = legal.reshape(self.size, self.size)
+		return legal
+
+	def _future_hashes(self, indices):
+		"""the position hash after current_player plays each of indices (uint64 array)
+		"""
+		L = self._layout
+		(color, chain, chain_libs) = self._arrays()
+		me = self.current_player
+		future = np.uint64(self.hash) ^ L.zobrist_array[me][indices]
+		# only the few points next to an opponent chain in atari capture anything
+		captures = np.zeros(len(indices), dtype=bool)
+		for offset in L.neighbor_offsets:
+			captures |= (color[indices + offset] == -me) & (chain_libs[indices + offset] == 1)
+		for k in np.nonzero(captures)[0]:
+			future[k] ^= np.uint64(self._captured_hash(indices[k]))
+		return future
+
+	def _repeats_position(self, hashes):
+		"""boolean array, True where hashes (uint64 array) is in previous_hashes
+		"""
+		history = np.sort(np.fromiter(self.previous_hashes, dtype=np.uint64, count=len(self.previous_hashes)))
+		found = np.minimum(np.searchsorted(history, hashes), len(history) - 1)
+		return history[found] == hashes
+
+	def _own_eyes(self):
+		"""size x size boolean array, True at empty points that are eyes of current_player:
+		every neighbor is a friendly stone or the edge, and at most one diagonal is an
+		opponent stone (none for points on the edge)
+		"""
+		L = self._layout
+		color = self._arrays()[0].reshape(L.stride, L.stride)
+		me = self.current_player
+		friendly = (color == me) | (color == BORDER)
+		eyeish = color[1:-1, 1:-1] == EMPTY
+		for sl in L.neighbor_slices:
+			eyeish &= friendly[sl]
+		opponent = (color == -me).astype(np.int8)
+		border = color == BORDER
+		opponent_diagonals = sum(opponent[sl] for sl in L.diagonal_slices)
+		on_edge = border[L.diagonal_slices[0]] | border[L.diagonal_slices[3]]
+		return eyeish & (opponent_diagonals < np.where(on_edge, 1, 2))
+
+	def sensible_moves_mask(self):
+		"""size x size boolean array, True where a move is legal and does not fill one of
+		current_player's own eyes
+		"""
+		return self.legal_moves_mask() & ~self._own_eyes()
+
 	def is_legal(self, action):
 		"""determine if the given action (x,y tuple) is a legal move
+
+		A legal move is on the board, on an empty point, not suicide, not a retaking
+		of a simple ko and (if enforce_superko) does not repeat a previous position.
 		"""
-		(x,y) = action
-		empty = self.board[x][y] == EMPTY
-		on_board = x >= 0 and y >= 0 and x < self.size and y < self.size
-		suicide = False # todo
-		ko = False # todo
-		return on_board and (not suicide) and (not ko) #and empty 
+		if action is PASS_MOVE:
+			return True
+		if not self._on_board(action):
+			return False
+		if self._data[self._index(action)] != EMPTY:
+			return False
+		if action == self.ko:
+			return False
+		if self.is_suicide(action):
+			return False
+		if self.enforce_superko and self.is_positional_superko(action):
+			return False
+		return True
 
 	def do_move(self, action):
-		"""Play current_player's color at (x,y)
+		"""Play current_player's color at (x,y), or pass if action is PASS_MOVE
 
 		If it is a legal move, current_player switches to the other player
 		If not, an IllegalMove exception is raised
+
+		The move can be taken back with undo()
 		"""
-		(x,y) = action
-		if self.is_legal((x,y)):
-			self.board[x][y] = self.current_player
+		if not self.is_legal(action):
+			raise IllegalMove(str(action))
+		# the journal frame: where this move's writes start in the trail, and the
+		# scalars that are overwritten below
+		frame = (len(self._trail), self.ko, self.hash, self.passes)
+		if action is PASS_MOVE:
+			self._journal.append(frame + (False,))
+			self.ko = None
+			self.passes += 1
 			self.current_player = -self.current_player
 			self.turns_played += 1
+			return
+		self.passes = 0
+		color = self.current_player
+		i = self._index(action)
+		opponent_roots = self._place_stone(i, color)
+		# opponent chains left without liberties are captured
+		captured = []
+		libs = 3 * self._layout.area
+		for root in opponent_roots:
+			if self._data[libs + root] == 0:
+				captured.extend(self._remove_chain(root))
+		self._own_history()
+		# without superko a position may repeat; only forget it on undo if it is new
+		new_position = self.hash not in self.previous_hashes
+		self.previous_hashes.add(self.hash)
+		self._journal.append(frame + (new_position,))
+		# simple ko: a lone stone that captured a single stone and is left with
+		# that point as its only liberty may not be recaptured immediately
+		self.ko = None
+		if len(captured) == 1 and self._data[2 * self._layout.area + i] == i and self._data[libs + i] == 1:
+			self.ko = self._layout.position_of[captured[0]]
+		self.current_player = -color
+		self.turns_played += 1
+
+	def undo(self):
+		"""Take back the last move played by do_move on this state (not past a copy()),
+		restoring the board, chains, liberties, ko point, hash and position history.
+
+		Together with do_move this lets lookahead play and take back moves in place
+		instead of copying the state.
+		"""
+		if not self._journal:
+			raise IndexError("no move to undo")
+		(start, ko, old_hash, passes, new_position) = self._journal.pop()
+		d = self._data
+		trail = self._trail
+		# restore the buffer writes of the move in reverse order
+		for k in range(len(trail) - 2, start - 2, -2):
+			d[trail[k]] = trail[k + 1]
+		del trail[start:]
+		if new_position:
+			self._own_history()
+			self.previous_hashes.discard(self.hash)
+		self.hash = old_hash
+		self.ko = ko
+		self.passes = passes
+		self.current_player = -self.current_player
+		self.turns_played -= 1
+
+	def place_stones(self, actions, color):
+		"""Put setup stones of color at the (x,y) actions, e.g. handicap stones or the
+		AB/AW properties of a game record
+
+		They are not moves: current_player, turns_played and passes are left as they
+		are, there is no ko afterwards, and undo() cannot take them (or any move played
+		before them) back. An IllegalMove exception is raised as by do_move.
+		"""
+		(player, turns_played, passes) = (self.current_player, self.turns_played, self.passes)
+		for action in actions:
+			self.current_player = color
+			self.do_move(action)
+		(self.current_player, self.turns_played, self.passes) = (player, turns_played, passes)
+		self.ko = None
+		self._trail = []
+		self._journal = []
+
+	@property
+	def is_end_of_game(self):
+		"""True once both players have passed in a row
+		"""
+		return self.passes >= 2
+
+	def score(self, komi=0.0):
+		"""Tromp-Taylor area score: each player's stones plus the empty points that
+		reach only that player's stones, computed with array operations over the board
+		(see AlphaGo.chains.area_scores)
+
+		Return:
+		black's area minus white's area minus komi
+		"""
+		# imported here since chains builds on this module
+		from AlphaGo.chains import area_scores
+		(black, white) = area_scores(self.board)
+		return float(black - white) - komi
+
+	def get_winner(self, komi=0.0):
+		"""the winner by score(komi): BLACK, WHITE, or EMPTY for a tie
+		"""
+		score = self.score(komi)
+		if score > 0:
+			return BLACK
+		if score < 0:
+			return WHITE
+		return EMPTY
+
+	def _own_history(self):
+		"""make previous_hashes private to this state before changing it (see copy)
+		"""
+		if self._history_shared:
+			self.previous_hashes = set(self.previous_hashes)
+			self._history_shared = False
+
+	def _write(self, k, value):
+		"""set buffer entry k to value, recording the old value on the undo trail
+		"""
+		self._trail.append(k)
+		self._trail.append(self._data[k])
+		self._data[k] = value
+
+	def _set_color(self, i, color):
+		"""set the color of index i, updating the pattern codes of the points around it
+		"""
+		d = self._data
+		delta = _pattern_digit(color) - _pattern_digit(d[i])
+		self._write(i, color)
+		for (k, weight) in self._layout.pattern_updates[i]:
+			self._write(k, d[k] + delta * weight)
+
+	def _place_stone(self, i, color):
+		"""Put a stone of color on the empty index i: merge it with the friendly chains
+		around it, count the liberties of the result and take i away from the liberties
+		of the opponent chains around it. Captures are left to the caller.
+
+		Only the chains adjacent to i are touched, so the cost is proportional to the
+		size of those chains rather than to the whole board.
+
+		Return:
+		opponent_roots -- the distinct roots of the adjacent opponent chains
+		"""
+		d = self._data
+		write = self._write
+		n = self._layout.area
+		chain, nxt, libs = n, 2 * n, 3 * n
+		neighbors = self._layout.neighbors
+		self._set_color(i, color)
+		self.hash ^= self._layout.zobrist[color][i]
+		friendly_roots = []
+		opponent_roots = []
+		for j in neighbors[i]:
+			if d[j] == color:
+				if d[chain + j] not in friendly_roots:
+					friendly_roots.append(d[chain + j])
+			elif d[j] == -color:
+				if d[chain + j] not in opponent_roots:
+					opponent_roots.append(d[chain + j])
+		if not friendly_roots:
+			# a new chain of one stone
+			write(libs + i, len([j for j in neighbors[i] if d[j] == EMPTY]))
 		else:
-			raise IllegalMove(str((x,y)))
+			root = friendly_roots[0]
+			# splice i into the root's circular list
+			write(chain + i, root)
+			write(nxt + i, d[nxt + root])
+			write(nxt + root, i)
+			if len(friendly_roots) == 1:
+				# the chain loses i and gains the empty neighbors of i it did not already touch
+				count = d[libs + root] - 1
+				for j in neighbors[i]:
+					if d[j] == EMPTY and all(d[chain + k] != root for k in neighbors[j] if k != i):
+						count += 1
+				write(libs + root, count)
+			else:
+				for other in friendly_roots[1:]:
+					for k in self._chain_stones(other):
+						write(chain + k, root)
+					# joining two circular lists is a swap of their successors
+					(root_next, other_next) = (d[nxt + root], d[nxt + other])
+					write(nxt + root, other_next)
+					write(nxt + other, root_next)
+					write(libs + other, -1)
+				write(libs + root, len(self._chain_liberties(root)))
+		# i was a liberty of each adjacent opponent chain
+		for root in opponent_roots:
+			write(libs + root, d[libs + root] - 1)
+		return opponent_roots
+
+	def _remove_chain(self, root):
+		"""Take the stones of the chain at root off the board and give their points back
+		as liberties to the chains around them
+
+		Return:
+		the indices of the removed stones
+		"""
+		d = self._data
+		write = self._write
+		n = self._layout.area
+		chain, nxt, libs = n, 2 * n, 3 * n
+		keys = self._layout.zobrist[d[root]]
+		stones = self._chain_stones(root)
+		for k in stones:
+			self.hash ^= keys[k]
+			self._set_color(k, EMPTY)
+			write(chain + k, k)
+			write(nxt + k, k)
+			write(libs + k, -1)
+		# each freed point is one new liberty for every distinct chain next to it
+		for k in stones:
+			roots = set(d[chain + j] for j in self._layout.neighbors[k] if d[j] == BLACK or d[j] == WHITE)
+			for r in roots:
+				write(libs + r, d[libs + r] + 1)
+		return stones
 
 	def symmetries(self):
 		"""returns a list of 8 GameState objects:
 		all reflections and rotations of the current board
 
-		does not check for duplicates
-		"""
-		copies = [self.copy() for i in range(8)]
-		# copies[0] is the original.
-		# rotate CCW 90
-		copies[1].board = np.rot90(self.board,1)
-		# rotate 180
-		copies[2].board = np.rot90(self.board,2)
-		# rotate CCW 270
-		copies[3].board = np.rot90(self.board,3)
-		# mirror left-right
-		copies[4].board = np.fliplr(self.board)
-		# mirror up-down
-		copies[5].board = np.flipud(self.board)
-		# mirror \ diagonal
-		copies[6].board = np.transpose(self.board)
-		# mirror / diagonal (equivalently: rotate 90 CCW then flip LR)
-		copies[7].board = np.fliplr(copies[1].board)
+		does not check for duplicates. The previous positions cannot be transformed
+		from their hashes, so the copies only know the current position for superko.
+		"""
+		copies = []
+		boards = transform_planes(np.array([self.board] * len(SYMMETRY_TRANSFORMS)), np.arange(len(SYMMETRY_TRANSFORMS)))
+		for (k, board) in enumerate(boards):
+			other = GameState(self.size, self.enforce_superko)
+			for (x, y) in zip(*np.nonzero(board)):
+				other._place_stone(other._index((x, y)), int(board[x][y]))
+			other.turns_played = self.turns_played
+			other.current_player = self.current_player
+			other.passes = self.passes
+			other.previous_hashes = set([other.hash])
+			# placing the stones is not a move that can be undone
+			other._trail = []
+			if self.ko is not None:
+				# the ko point moves with the board
+				ko = transform_moves(self.ko[0] * self.size + self.ko[1], k, size=self.size)
+				other.ko = divmod(int(ko), self.size)
+			copies.append(other)
 		return copies
 
 	def from_sgf(self, sgf_string):
@@ -221,5 +904,167 @@ class GameState(object):
 		raise NotImplementedError()
 
 
+class GameStateBatch(object):
+	"""N games on boards of one size, stepped in lockstep with array operations.
+
+	boards is one (N, size, size) int8 array of BLACK, WHITE and EMPTY. Moves are
+	flat indices x * size + y, and PASS (-1) passes. Chains are not tracked stone by
+	stone: the chains of all boards are labelled at once (see AlphaGo.chains) the
+	first time a position needs them, and captures and legality are read from those
+	labels. Only simple ko is enforced, since positional superko would need every
+	game's history. Change the boards only through step(), which keeps the cached
+	labels in sync.
+	"""
+
+	PASS = -1
+
+	def __init__(self, n, size=19):
+		self.size = size
+		self.boards = np.zeros((n, size, size), dtype=np.int8)
+		self.current_player = np.full(n, BLACK, dtype=np.int8)
+		self.turns_played = np.zeros(n, dtype=int)
+		# flat index of the point each board may not play because of simple ko, or -1
+		self.ko = np.full(n, -1, dtype=int)
+		# consecutive passes just played on each board; two end that game
+		self.passes = np.zeros(n, dtype=int)
+		# (labels, libs) of the current positions and their legal moves, computed
+		# when first needed
+		self._chains = None
+		self._legal = None
+
+	def __len__(self):
+		return len(self.boards)
+
+	def copy(self):
+		"""An independent copy of all N games
+		"""
+		other = GameStateBatch(len(self), self.size)
+		other.boards[:] = self.boards
+		other.current_player[:] = self.current_player
+		other.turns_played[:] = self.turns_played
+		other.ko[:] = self.ko
+		other.passes[:] = self.passes
+		return other
+
+	def _padded(self, values, fill):
+		"""values of shape (N, size, size) surrounded by one ring of fill
+		"""
+		return np.pad(values, ((0, 0), (1, 1), (1, 1)), 'constant', constant_values=fill)
+
+	def _chain_liberties(self):
+		"""(labels, libs) of all boards as returned by AlphaGo.chains.chain_liberties;
+		labels are unique across the whole batch
+		"""
+		if self._chains is None:
+			# imported here since chains builds on this module
+			from AlphaGo.chains import chain_liberties
+			self._chains = chain_liberties(self.boards)
+		return self._chains
+
+	def liberty_counts(self):
+		"""(N, size, size) liberty count of the chain at each point, -1 on empty points
+		"""
+		(labels, libs) = self._chain_liberties()
+		return libs[labels]
+
+	def legal_moves_mask(self):
+		"""(N, size, size) boolean array, True where the player to move on that board
+		may play: an empty point that is not the ko point and is not suicide. A move
+		is not suicide if it touches an empty point, one of the player's chains with
+		more than one liberty, or an opponent chain it captures.
+
+		The mask is computed once per position and kept for step(); a new array is
+		returned each time.
+		"""
+		if self._legal is None:
+			player = self.current_player[:, np.newaxis, np.newaxis]
+			board = self._padded(self.boards, BORDER)
+			libs = self._padded(self.liberty_counts(), 0)
+			breathes = np.zeros(self.boards.shape, dtype=bool)
+			for (dx, dy) in [(1, 0), (0, 1), (-1, 0), (0, -1)]:
+				neighbor = board[:, 1 + dx:board.shape[1] - 1 + dx, 1 + dy:board.shape[2] - 1 + dy]
+				neighbor_libs = libs[:, 1 + dx:libs.shape[1] - 1 + dx, 1 + dy:libs.shape[2] - 1 + dy]
+				breathes |= neighbor == EMPTY
+				breathes |= (neighbor == player) & (neighbor_libs > 1)
+				breathes |= (neighbor == -player) & (neighbor_libs == 1)
+			legal = (self.boards == EMPTY) & breathes
+			has_ko = np.nonzero(self.ko >= 0)[0]
+			legal.reshape(len(self), -1)[has_ko, self.ko[has_ko]] = False
+			self._legal = legal
+		return self._legal.copy()
+
+	def step(self, actions):
+		"""Play one move on every board: actions[i] is the flat index of the move of
+		board i, or PASS. If any move is illegal or off the board an IllegalMove
+		exception is raised and no board is changed.
+
+		Return:
+		an (N,) int array with the number of stones each move captured
+		"""
+		actions = np.asarray(actions, dtype=int)
+		n = len(self)
+		plays = np.nonzero(actions != GameStateBatch.PASS)[0]
+		if np.any((actions[plays] < 0) | (actions[plays] >= self.size * self.size)):
+			raise IllegalMove(str(actions))
+		(x, y) = (actions[plays] // self.size, actions[plays] % self.size)
+		self.legal_moves_mask()
+		if np.any(~self._legal[plays, x, y]):
+			raise IllegalMove(str(actions))
+
+		# a move captures the opponent chains next to it that had one liberty left
+		(labels, libs) = self._chain_liberties()
+		board = self._padded(self.boards, BORDER)
+		labels = self._padded(labels, 0)
+		player = self.current_player[plays]
+		captured_labels = np.zeros(len(libs), dtype=bool)
+		for (dx, dy) in [(1, 0), (0, 1), (-1, 0), (0, -1)]:
+			neighbor = labels[plays, x + 1 + dx, y + 1 + dy]
+			in_atari = (board[plays, x + 1 + dx, y + 1 + dy] == -player) & (libs[neighbor] == 1)
+			captured_labels[neighbor[in_atari]] = True
+		captured = captured_labels[labels[:, 1:-1, 1:-1]]
+		self.boards[captured] = EMPTY
+		self.boards[plays, x, y] = player
+		captures = captured.reshape(n, -1).sum(axis=1)
+
+		# simple ko: a single stone captured one stone and is left with one liberty
+		self.ko[:] = -1
+		single = np.nonzero(captures[plays] == 1)[0]
+		if len(single):
+			board = self._padded(self.boards, BORDER)
+			friends = np.zeros(len(single), dtype=bool)
+			liberties = np.zeros(len(single), dtype=int)
+			for (dx, dy) in [(1, 0), (0, 1), (-1, 0), (0, -1)]:
+				neighbor = board[plays[single], x[single] + 1 + dx, y[single] + 1 + dy]
+				friends |= neighbor == player[single]
+				liberties += neighbor == EMPTY
+			ko = plays[single[~friends & (liberties == 1)]]
+			self.ko[ko] = np.argmax(captured.reshape(n, -1)[ko], axis=1)
+
+		self.passes[plays] = 0
+		self.passes[actions == GameStateBatch.PASS] += 1
+		self.current_player *= -1
+		self.turns_played += 1
+		self._chains = None
+		self._legal = None
+		return captures
+
+	@property
+	def is_end_of_game(self):
+		"""(N,) boolean array, True for the games in which both players passed in a row
+		"""
+		return self.passes >= 2
+
+	def scores(self, komi=0.0):
+		"""Tromp-Taylor area scores of all boards at once (see GameState.score)
+
+		Return:
+		an (N,) float array of black's area minus white's area minus komi
+		"""
+		# imported here since chains builds on this module
+		from AlphaGo.chains import area_scores
+		(black, white) = area_scores(self.boards)
+		return (black - white).astype(float) - komi
+
+
 class IllegalMove(Exception):
-	pass
\ No newline at end of file
+	pass
@@ -0,0 +1,202 @@
+"""Ladder reading for the ladder capture and ladder escape feature planes.
+
+A ladder is read by playing it out on the GameState itself with do_move and undo.
+Every read is bounded by a depth and a node budget, and positions already read are
+remembered, so the two ladder planes cost a bounded amount of work per position.
+"""
+import time
+from collections import OrderedDict
+import numpy as np
+from AlphaGo.go import EMPTY
+
+class _Cutoff(Exception):
+	"""a read ran out of depth or nodes"""
+	pass
+
+class LadderReader(object):
+	"""Reads ladders for the player to move.
+
+	A chain in atari is caught in a ladder if every move of its owner (extending on the
+	last liberty, or capturing a neighboring chain in atari) leaves it with at most two
+	liberties and the attacker can put it back in atari, until it is captured. A read
+	that needs more than max_depth moves, or more than max_nodes moves in total, is
+	given up and counts as not caught; only completed results are cached.
+
+	Results are cached by position hash, player to move, ko point and the target chain
+	(its lowest stone), in a cache of at most cache_size entries that drops the oldest
+	entries first.
+
+	Counters, since construction or reset_counters():
+	reads -- ladder reads started
+	cache_hits -- positions answered from the cache
+	nodes -- moves played while reading
+	cutoffs -- reads given up for depth or nodes
+	seconds -- time spent in the plane functions
+	"""
+
+	def __init__(self, max_depth=100, max_nodes=2000, cache_size=100000):
+		self.max_depth = max_depth
+		self.max_nodes = max_nodes
+		self.cache_size = cache_size
+		self._cache = OrderedDict()
+		self._budget = 0
+		self.reset_counters()
+
+	def reset_counters(self):
+		self.reads = 0
+		self.cache_hits = 0
+		self.nodes = 0
+		self.cutoffs = 0
+		self.seconds = 0.0
+
+	def _key(self, state, prey):
+		return (state.hash, state.current_player, state.ko, min(state.visit_neighbor(prey)))
+
+	def _remember(self, key, result):
+		if len(self._cache) >= self.cache_size:
+			self._cache.popitem(last=False)
+		self._cache[key] = result
+
+	def _play(self, state, move):
+		if self._budget <= 0:
+			raise _Cutoff()
+		self._budget -= 1
+		self.nodes += 1
+		state.do_move(move)
+
+	def _neighbors(self, state, position):
+		(x, y) = position
+		return [(nx, ny) for (nx, ny) in [(x + 1, y), (x, y + 1), (x - 1, y), (x, y - 1)]
+			if 0 <= nx < state.size and 0 <= ny < state.size]
+
+	def _escape_moves(self, state, prey):
+		"""the moves that could get the chain at prey out of atari: its last liberty and
+		the liberties of the neighboring opponent chains that are in atari
+		"""
+		board = state.board
+		color = board[prey]
+		moves = set(state.chain_liberties(prey))
+		for stone in state.visit_neighbor(prey):
+			for n in self._neighbors(state, stone):
+				if board[n] == -color:
+					libs = state.chain_liberties(n)
+					if len(libs) == 1:
+						moves.update(libs)
+		return sorted(moves)
+
+	def _caught(self, state, prey, depth):
+		"""the chain at prey is in atari and its owner is to move: True if no escape works
+		"""
+		key = self._key(state, prey)
+		if key in self._cache:
+			self.cache_hits += 1
+			return self._cache[key]
+		if depth >= self.max_depth:
+			raise _Cutoff()
+		result = True
+		for move in self._escape_moves(state, prey):
+			if not state.is_legal(move):
+				continue
+			self._play(state, move)
+			try:
+				libs = len(state.chain_liberties(prey))
+				escaped = libs >= 3 or (libs == 2 and not self._attacks(state, prey, depth + 1))
+			finally:
+				state.undo()
+			if escaped:
+				result = False
+				break
+		self._remember(key, result)
+		return result
+
+	def _attacks(self, state, prey, depth):
+		"""the chain at prey has two liberties and the attacker is to move: True if an
+		atari on one of them catches it
+		"""
+		key = self._key(state, prey)
+		if key in self._cache:
+			self.cache_hits += 1
+			return self._cache[key]
+		if depth >= self.max_depth:
+			raise _Cutoff()
+		result = False
+		for move in sorted(state.chain_liberties(prey)):
+			if not state.is_legal(move):
+				continue
+			self._play(state, move)
+			try:
+				result = len(state.chain_liberties(prey)) == 1 and self._caught(state, prey, depth + 1)
+			finally:
+				state.undo()
+			if result:
+				break
+		self._remember(key, result)
+		return result
+
+	def _read(self, read, state, prey):
+		"""run one bounded read; a cut off read counts as False
+		"""
+		self.reads += 1
+		self._budget = self.max_nodes
+		try:
+			return read(state, prey, 0)
+		except _Cutoff:
+			self.cutoffs += 1
+			return False
+
+	def _chains_with_liberties(self, state, color, count):
+		"""one stone of each chain of color with exactly count liberties
+		"""
+		board = state.board
+		libs = state.liberty_counts
+		seen = set()
+		chains = []
+		for (x, y) in zip(*np.nonzero((board == color) & (libs == count))):
+			if (x, y) in seen:
+				continue
+			stones = state.visit_neighbor((x, y))
+			seen.update(stones)
+			chains.append(min(stones))
+		return chains
+
+	def ladder_captures(self, state):
+		"""Return:
+		a (size, size) boolean array, True where the player to move would put an
+		opponent chain in atari that is then caught in a ladder
+		"""
+		start = time.time()
+		captures = np.zeros((state.size, state.size), dtype=bool)
+		for prey in self._chains_with_liberties(state, -state.current_player, 2):
+			for move in state.chain_liberties(prey):
+				if captures[move] or not state.is_legal(move):
+					continue
+				self.nodes += 1
+				state.do_move(move)
+				try:
+					if len(state.chain_liberties(prey)) == 1:
+						captures[move] = self._read(self._caught, state, prey)
+				finally:
+					state.undo()
+		self.seconds += time.time() - start
+		return captures
+
+	def ladder_escapes(self, state):
+		"""Return:
+		a (size, size) boolean array, True where the player to move would save one of
+		its chains in atari from being caught in a ladder
+		"""
+		start = time.time()
+		escapes = np.zeros((state.size, state.size), dtype=bool)
+		for prey in self._chains_with_liberties(state, state.current_player, 1):
+			for move in self._escape_moves(state, prey):
+				if escapes[move] or not state.is_legal(move):
+					continue
+				self.nodes += 1
+				state.do_move(move)
+				try:
+					libs = len(state.chain_liberties(prey))
+					escapes[move] = libs >= 3 or (libs == 2 and not self._read(self._attacks, state, prey))
+				finally:
+					state.undo()
+		self.seconds += time.time() - start
+		return escapes
@@ -0,0 +1,187 @@
+"""The outcome of playing each empty point, kept up to date as a game is played.
+
+The capture size, self-atari size and liberties-after-move feature planes all ask
+"what if the player to move played here". Simulating every point after every move
+costs one do_move and undo per point, so these tables are instead updated
+incrementally from the chains GameState maintains.
+"""
+import numpy as np
+from AlphaGo.go import BLACK, WHITE, EMPTY
+
+class MoveOutcomes(object):
+	"""For every empty point and both colors, what playing there would do: how many
+	opponent stones it would capture, and the size and liberty count of the chain the
+	new stone would be part of. A liberty count of 0 means the move is suicide.
+
+	Tables are flat arrays indexed by x * size + y, per color. update() follows the
+	GameState the tables were made for: the outcome of a point depends only on the
+	chains around it, so only the empty points next to the points that changed since
+	the last update, or next to a chain touching those points, are recomputed. Ko is
+	applied when the planes are read; positional superko is not considered.
+	"""
+
+	def __init__(self, state):
+		self.state = state
+		self.size = size = state.size
+		self._neighbors = []
+		for x in range(size):
+			for y in range(size):
+				self._neighbors.append([nx * size + ny for (nx, ny) in [(x + 1, y), (x, y + 1), (x - 1, y), (x, y - 1)]
+					if 0 <= nx < size and 0 <= ny < size])
+		self.captures = {}
+		self.chain_sizes = {}
+		self.liberties = {}
+		for color in [BLACK, WHITE]:
+			self.captures[color] = np.zeros(size * size, dtype=int)
+			self.chain_sizes[color] = np.zeros(size * size, dtype=int)
+			self.liberties[color] = np.zeros(size * size, dtype=int)
+		# the flat board the tables were last computed for
+		self._board = None
+		# the points recomputed by the last update, for callers that keep their own
+		# copies of the tables
+		self.updated = []
+		self.update()
+
+	def recompute(self):
+		"""Recompute the tables for every point of the board.
+
+		Return:
+		the number of points recomputed
+		"""
+		self._board = None
+		return self.update()
+
+	def update(self):
+		"""Bring the tables up to date with the state's current board.
+
+		Return:
+		the number of points recomputed
+		"""
+		size = self.size
+		state = self.state
+		flat = np.array(state.board).ravel()
+		if self._board is None:
+			changed = range(size * size)
+		else:
+			changed = np.flatnonzero(flat != self._board).tolist()
+		self._board = flat
+		if not changed:
+			self.updated = []
+			return 0
+		board = flat.tolist()
+		counts = state.liberty_counts.ravel().tolist()
+		neighbors = self._neighbors
+		# the stones of a chain, as one shared list per chain, from GameState
+		chains = {}
+
+		def chain(p):
+			if p not in chains:
+				stones = [x * size + y for (x, y) in state.visit_neighbor(divmod(p, size))]
+				for s in stones:
+					chains[s] = stones
+			return chains[p]
+
+		dirty = set()
+		for p in changed:
+			dirty.add(p)
+			for q in neighbors[p]:
+				dirty.add(q)
+				if board[q] != EMPTY:
+					for s in chain(q):
+						dirty.update(neighbors[s])
+			if board[p] != EMPTY:
+				for s in chain(p):
+					dirty.update(neighbors[s])
+
+		liberty_sets = {}
+		for p in dirty:
+			for color in [BLACK, WHITE]:
+				if board[p] == EMPTY:
+					outcome = self._outcome(p, color, board, counts, chain, liberty_sets)
+				else:
+					outcome = (0, 0, 0)
+				(self.captures[color][p], self.chain_sizes[color][p], self.liberties[color][p]) = outcome
+		self.updated = list(dirty)
+		return len(dirty)
+
+	def _outcome(self, p, color, board, counts, chain, liberty_sets):
+		"""(captured stones, chain size, chain liberties) if color played on empty point p
+		"""
+		neighbors = self._neighbors
+		seen = set()
+		own = []
+		captured = []
+		liberties = set()
+		for q in neighbors[p]:
+			if board[q] == EMPTY:
+				liberties.add(q)
+				continue
+			stones = chain(q)
+			if id(stones) in seen:
+				continue
+			seen.add(id(stones))
+			if board[q] == color:
+				own.append(stones)
+				if id(stones) not in liberty_sets:
+					liberty_sets[id(stones)] = set(n for s in stones for n in neighbors[s] if board[n] == EMPTY)
+				liberties |= liberty_sets[id(stones)]
+			elif counts[q] == 1:
+				# its last liberty is p
+				captured.append(stones)
+		liberties.discard(p)
+		if captured:
+			# captured stones next to the new chain become its liberties
+			merged = set([p])
+			for stones in own:
+				merged.update(stones)
+			for stones in captured:
+				for s in stones:
+					if any(n in merged for n in neighbors[s]):
+						liberties.add(s)
+		return (sum(len(stones) for stones in captured), 1 + sum(len(stones) for stones in own), len(liberties))
+
+	def _playable(self, color):
+		"""(size, size) boolean array of the points color may play, simple ko aside
+		"""
+		playable = (self._board == EMPTY) & (self.liberties[color] > 0)
+		playable = playable.reshape(self.size, self.size)
+		if self.state.ko is not None:
+			playable[self.state.ko] = False
+		return playable
+
+	def _one_hot(self, values, mask, planes):
+		"""planes one-hot planes of non-negative values, the last one collecting
+		everything from planes - 1 up, set only where mask is
+		"""
+		clipped = np.minimum(values.reshape(self.size, self.size), planes - 1)
+		return (clipped == np.arange(planes)[:, np.newaxis, np.newaxis]) & mask
+
+	def capture_size_planes(self, planes=8):
+		"""Return:
+		a (planes, size, size) boolean array; plane k is set where the player to move
+		would capture k opponent stones (the last plane: that many or more)
+		"""
+		self.update()
+		color = self.state.current_player
+		return self._one_hot(self.captures[color], self._playable(color), planes)
+
+	def self_atari_planes(self, planes=8):
+		"""Return:
+		a (planes, size, size) boolean array; plane k is set where the player to move
+		would be left with a chain of k + 1 stones in atari (the last plane: that many
+		or more)
+		"""
+		self.update()
+		color = self.state.current_player
+		in_atari = self._playable(color) & (self.liberties[color] == 1).reshape(self.size, self.size)
+		return self._one_hot(self.chain_sizes[color] - 1, in_atari, planes)
+
+	def liberty_planes(self, planes=8):
+		"""Return:
+		a (planes, size, size) boolean array; plane k is set where the chain of the
+		player to move would have k + 1 liberties after playing there (the last plane:
+		that many or more)
+		"""
+		self.update()
+		color = self.state.current_player
+		return self._one_hot(self.liberties[color] - 1, self._playable(color), planes)
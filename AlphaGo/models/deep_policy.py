@@ -2,11 +2,14 @@ from keras.models import Sequential
 from keras.layers import convolutional
 from keras.layers.core import Activation, Reshape
 from SGD_exponential_decay import SGD_exponential_decay as SGD
+from AlphaGo.dataset import SampleIndex, MinibatchSampler, augmented, move_distributions, move_weights
+import numpy as np
 
 ### Parameters obtained from paper ###
 K = 152                       # depth of convolutional layers
 LEARNING_RATE = .003          # initial learning rate
 DECAY = 8.664339379294006e-08 # rate of exponential learning_rate decay
+BATCH_SIZE = 16               # samples per minibatch
 
 class deep_policy_trainer:
     def __init__(self):
@@ -24,9 +27,19 @@ class deep_policy_trainer:
         sgd = SGD(lr=LEARNING_RATE, decay=DECAY)
         self.model.compile(loss='binary_crossentropy', optimizer=sgd)
 
-    def get_samples(self):
-        # TODO non-terminating loop that yields training samples drawn uniformly at random
-        pass
+    # non-terminating loop that yields minibatches of training samples drawn uniformly
+    # at random from the datasets of a SampleIndex (see AlphaGo.dataset), each sample
+    # once per epoch and, unless augment is False, in a random one of its 8 symmetries.
+    # Minibatches are (states, labels, sample weights), as taken by fit_generator.
+    # Labels are move distributions: the one-hot move, or for deduplicated datasets the
+    # frequencies of the moves played from the position, which is then weighted by the
+    # number of times it was played (see AlphaGo.dataset.move_weights)
+    def get_samples(self,index_path,batch_size=BATCH_SIZE,seed=0,augment=True):
+        batches = iter(MinibatchSampler(SampleIndex(index_path),batch_size,seed))
+        if augment:
+            batches = augmented(batches,np.random.RandomState(seed))
+        for (states,actions) in batches:
+            yield (states.astype('float32',copy=False),move_distributions(actions),move_weights(actions))
 
     def train(self):
         # TODO use self.model.fit_generator to train from data source
@@ -1 +1,249 @@
-# TODO
+import numpy as np
+from AlphaGo.go import BLACK, WHITE, EMPTY, PASS_MOVE, PATTERN_NEIGHBORS, PATTERN_CODES
+
+# the points around the last move that get a response weight: everything within
+# manhattan distance 2, the last move itself excluded
+RESPONSE_OFFSETS = [(dx, dy) for dx in range(-2, 3) for dy in range(-2, 3) if 0 < abs(dx) + abs(dy) <= 2]
+
+def swap_colors(codes):
+    """the pattern codes seen with BLACK and WHITE swapped, so that a table indexed by
+    patterns from black's point of view can be read for white
+    """
+    codes = np.asarray(codes)
+    swapped = np.zeros_like(codes)
+    for k in range(len(PATTERN_NEIGHBORS)):
+        digit = (codes // 4 ** k) % 4
+        digit = np.where(digit == 1, 2, np.where(digit == 2, 1, digit))
+        swapped += digit * 4 ** k
+    return swapped
+
+def own_eye_codes():
+    """boolean table over pattern codes from black's point of view: True where the
+    point is an eye of black, with every neighbor black or off the board and at most
+    one white diagonal (none on the edge), the same rule as GameState.sensible_moves_mask
+    """
+    codes = np.arange(PATTERN_CODES)
+    digits = [(codes // 4 ** k) % 4 for k in range(len(PATTERN_NEIGHBORS))]
+    # the first four neighbors are orthogonal, the last four diagonal
+    surrounded = np.all([(d == 1) | (d == 3) for d in digits[:4]], axis=0)
+    opponent_diagonals = np.sum([d == 2 for d in digits[4:]], axis=0)
+    on_edge = np.any([d == 3 for d in digits[4:]], axis=0)
+    return surrounded & (opponent_diagonals <= np.where(on_edge, 0, 1))
+
+def default_weights():
+    """hand-set weights until trained ones are available: no pattern preferences,
+    a mild preference for answering near the last move, and strong ones for
+    capturing, saving a chain in atari and putting a chain in atari
+    """
+    return {
+        'pattern': np.zeros(PATTERN_CODES),
+        'response': np.ones(len(RESPONSE_OFFSETS)) * 0.5,
+        'capture': 3.0,
+        'save': 2.0,
+        'atari': 1.0}
+
+class rollout_policy:
+    """Fast rollout policy: a linear softmax over the legal moves that do not fill the
+    player's own eyes. The features of a move are its 3x3 pattern (from GameState's
+    incrementally kept pattern codes, seen from the player to move), its position
+    relative to the last move, and whether it captures, saves a chain in atari or puts
+    an opponent chain in atari.
+
+    Scores are kept per point by move_scores and updated only near the last move.
+    """
+
+    def __init__(self, weights=None):
+        self.set_weights(default_weights() if weights is None else weights)
+
+    def set_weights(self, weights):
+        """Use new weights (a dict like default_weights()) and rebuild the exp tables.
+        """
+        self.weights = weights
+        pattern = np.exp(np.asarray(weights['pattern'], dtype=float))
+        # own eyes are never played
+        pattern[own_eye_codes()] = 0
+        # per color to move, indexed by the absolute pattern code
+        self.pattern_factors = {BLACK: pattern.tolist(), WHITE: pattern[swap_colors(np.arange(PATTERN_CODES))].tolist()}
+        self.response_factors = np.exp(np.asarray(weights['response'], dtype=float)).tolist()
+        self.capture_factor = np.exp(weights['capture'])
+        self.save_factor = np.exp(weights['save'])
+        self.atari_factor = np.exp(weights['atari'])
+
+    def save_weights(self, file_name):
+        np.savez(file_name, **self.weights)
+
+    def load_weights(self, file_name):
+        data = np.load(file_name)
+        weights = dict((key, data[key]) for key in data.files)
+        for key in ['capture', 'save', 'atari']:
+            weights[key] = float(weights[key])
+        self.set_weights(weights)
+
+    def move_scores(self, state):
+        """Return a move_scores following state
+        """
+        return move_scores(self, state)
+
+    def rollout(self, state, rng=np.random, max_moves=1000):
+        """Play state out with the policy until both players pass or max_moves have been
+        played. The state is changed in place; score it with state.score(komi).
+
+        Return:
+        the number of moves played
+        """
+        scores = self.move_scores(state)
+        moves = 0
+        while not state.is_end_of_game and moves < max_moves:
+            state.do_move(scores.choose(rng))
+            scores.update()
+            moves += 1
+        return moves
+
+# per board size: (positions, 4-neighbors, pattern neighbors, response points) of each
+# flat point x * size + y
+_geometry_cache = {}
+
+def _geometry(size):
+    if size not in _geometry_cache:
+        positions = [(x, y) for x in range(size) for y in range(size)]
+
+        def around(offsets):
+            return [[nx * size + ny for (nx, ny) in [(x + dx, y + dy) for (dx, dy) in offsets]
+                if 0 <= nx < size and 0 <= ny < size] for (x, y) in positions]
+
+        responses = []
+        for (x, y) in positions:
+            responses.append(dict(((x + dx) * size + y + dy, k) for (k, (dx, dy)) in enumerate(RESPONSE_OFFSETS)
+                if 0 <= x + dx < size and 0 <= y + dy < size))
+        _geometry_cache[size] = (positions, around(PATTERN_NEIGHBORS[:4]), around(PATTERN_NEIGHBORS), responses)
+    return _geometry_cache[size]
+
+class move_scores:
+    """The unnormalized softmax score of every point for both colors, following one
+    GameState. update() compares the board with the last one it saw and re-scores only
+    the points whose features can have changed: the points around changed points, the
+    liberties of the chains touching them, and the points near the last two moves.
+    """
+
+    def __init__(self, policy, state):
+        self.policy = policy
+        self.state = state
+        self.size = state.size
+        (self._positions, self._neighbors, self._around, self._responses) = _geometry(state.size)
+        self.scores = {BLACK: np.zeros(state.size ** 2), WHITE: np.zeros(state.size ** 2)}
+        self._board = None
+        self._last_move = None
+        self.update()
+
+    def update(self):
+        """Bring the scores up to date with the state.
+
+        Return:
+        the number of points re-scored
+        """
+        state = self.state
+        board = np.array(state.board, dtype=int).ravel()
+        if self._board is None:
+            changed = []
+            dirty = set(range(len(board)))
+        else:
+            changed = np.flatnonzero(board != self._board).tolist()
+            dirty = set(changed)
+        # the last move is the point that just got a stone of the player who moved
+        mover = -state.current_player
+        placed = [p for p in changed if board[p] == mover and self._board[p] == EMPTY]
+        last_move = placed[0] if len(placed) == 1 else None
+        self._board = board
+        board = board.tolist()
+        if changed:
+            for p in changed:
+                dirty.update(self._around[p])
+                for q in [p] + self._neighbors[p]:
+                    if board[q] != EMPTY:
+                        dirty.update(x * self.size + y for (x, y) in state.chain_liberties(self._positions[q]))
+        for move in [self._last_move, last_move]:
+            if move is not None:
+                dirty.update(self._responses[move])
+        self._last_move = last_move
+        self._rescore(dirty, board)
+        return len(dirty)
+
+    def recompute(self):
+        """Re-score every point from scratch, keeping the last move seen by update()
+        """
+        self._board = np.array(self.state.board, dtype=int).ravel()
+        self._rescore(range(len(self._board)), self._board.tolist())
+
+    def _rescore(self, points, board):
+        libs = self.state.liberty_counts.ravel().tolist()
+        for p in points:
+            for color in [BLACK, WHITE]:
+                self.scores[color][p] = self._score(p, color, board, libs)
+
+    def _score(self, p, color, board, libs):
+        """exp of the policy's linear function at point p for color, 0 where color may
+        not play or would fill its own eye
+        """
+        if board[p] != EMPTY:
+            return 0.0
+        policy = self.policy
+        score = policy.pattern_factors[color][self.state.pattern_code(self._positions[p])]
+        if score == 0:
+            return 0.0
+        breathes = capture = save = atari = False
+        for q in self._neighbors[p]:
+            if board[q] == EMPTY:
+                breathes = True
+            elif board[q] == color:
+                if libs[q] > 1:
+                    breathes = True
+                else:
+                    save = True
+            elif libs[q] == 1:
+                breathes = capture = True
+            elif libs[q] == 2:
+                atari = True
+        if not breathes:
+            # suicide
+            return 0.0
+        if capture:
+            score *= policy.capture_factor
+        if save:
+            score *= policy.save_factor
+        if atari:
+            score *= policy.atari_factor
+        if self._last_move is not None and p in self._responses[self._last_move]:
+            score *= policy.response_factors[self._responses[self._last_move][p]]
+        return score
+
+    def probabilities(self):
+        """Return:
+        a size x size array of the policy's move probabilities for the player to move,
+        before moves ruled out by ko or superko are removed
+        """
+        scores = self.scores[self.state.current_player]
+        total = scores.sum()
+        return (scores / total if total > 0 else scores).reshape(self.size, self.size)
+
+    def choose(self, rng=np.random):
+        """Sample a move for the player to move from the softmax, skipping moves that
+        turn out to be illegal.
+
+        Return:
+        an (x, y) move, or PASS_MOVE if nothing is left to play
+        """
+        scores = self.scores[self.state.current_player]
+        rejected = False
+        while True:
+            cumulative = np.cumsum(scores)
+            if cumulative[-1] <= 0:
+                return PASS_MOVE
+            p = int(np.searchsorted(cumulative, rng.random_sample() * cumulative[-1], side='right'))
+            move = self._positions[min(p, len(scores) - 1)]
+            if self.state.is_legal(move):
+                return move
+            # ko or superko; leave the kept scores alone
+            if not rejected:
+                scores = scores.copy()
+                rejected = True
+            scores[p] = 0
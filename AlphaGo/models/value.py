@@ -2,11 +2,14 @@ from keras.models import Sequential
 from keras.layers import convolutional
 from keras.layers.core import Dense, Flatten
 from SGD_exponential_decay import SGD_exponential_decay as SGD
+from AlphaGo.dataset import SampleIndex, MinibatchSampler, augmented
+import numpy as np
 
 ### Parameters obtained from paper ###
 K = 152                       # depth of convolutional layers
 LEARNING_RATE = .003          # initial learning rate
 DECAY = 8.664339379294006e-08 # rate of exponential learning_rate decay
+BATCH_SIZE = 32               # samples per minibatch
 
 class value_trainer:
     def __init__(self):
@@ -26,9 +29,17 @@ class value_trainer:
         sgd = SGD(lr=LEARNING_RATE, decay=DECAY)
         self.model.compile(loss='mean_squared_error', optimizer=sgd)
 
-    def get_samples(self):
-        # TODO non-terminating loop that draws training samples uniformly at random
-        pass
+    # non-terminating loop that yields minibatches of training samples drawn uniformly
+    # at random from the datasets of a SampleIndex (see AlphaGo.dataset), each sample
+    # once per epoch and, unless augment is False, in a random one of its 8 symmetries.
+    # The datasets are converted with the 'value' target format, whose (N, 1) labels
+    # are the game outcomes z, which no symmetry changes
+    def get_samples(self,index_path,batch_size=BATCH_SIZE,seed=0,augment=True):
+        batches = iter(MinibatchSampler(SampleIndex(index_path),batch_size,seed))
+        if augment:
+            batches = augmented(batches,np.random.RandomState(seed),transform_actions=False)
+        for (states,actions) in batches:
+            yield (states.astype('float32',copy=False),actions.astype('float32',copy=False))
 
     def train(self):
         # TODO use self.model.fit_generator to train from data source
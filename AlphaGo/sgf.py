@@ -0,0 +1,143 @@
+"""A fast reader for the main line of SGF game records.
+
+sgflib builds a tree of Node and Property objects for every game, with all
+variations and every property, which is much more than converting a game record
+into training data needs. mainline_games() scans the text once with one regular
+expression and keeps only the moves of the main line (the first variation at every
+branch) and a few root properties:
+
+SZ -- board size, an int (19 if missing)
+KM -- komi, a float (None if missing or malformed)
+HA -- handicap, an int (0 if missing or malformed)
+AB, AW -- black and white setup stones, lists of (x, y)
+PL -- the player to move first, BLACK or WHITE (None if missing or malformed)
+RE -- result, the text as given (None if missing)
+
+Moves are (color, (x, y)) with color BLACK or WHITE, and (color, PASS_MOVE) for a
+pass. Points are SGF letter pairs, x from the first letter and y from the second.
+"""
+import re
+from AlphaGo.go import BLACK, WHITE, PASS_MOVE
+
+# a node or game tree delimiter, or a property with all its values; anything else
+# between tokens (whitespace, text outside game trees) is skipped
+_token = re.compile(r'[;()]|([A-Za-z]+)\s*((?:\[(?:[^\]\\]|\\.)*\]\s*)+)', re.S)
+_value = re.compile(r'\[((?:[^\]\\]|\\.)*)\]', re.S)
+_lower = re.compile(r'[a-z]+')
+
+_colors = {'B': BLACK, 'W': WHITE}
+# SGF letters: a-z for 0-25, A-Z for 26-51
+_coordinates = dict((c, k) for (k, c) in enumerate('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'))
+
+def parse_point(value, size=19):
+	"""Return:
+	the (x, y) of an SGF point, or PASS_MOVE for an empty value or 'tt' on boards up to
+	19x19
+	"""
+	if value == '' or (value == 'tt' and size <= 19):
+		return PASS_MOVE
+	try:
+		point = (_coordinates[value[0]], _coordinates[value[1]])
+	except (KeyError, IndexError):
+		raise ValueError("bad SGF point %r" % value)
+	if len(value) != 2 or point[0] >= size or point[1] >= size:
+		raise ValueError("bad SGF point %r" % value)
+	return point
+
+def parse_points(values, size=19):
+	"""Return:
+	the (x, y) points of a list of SGF point values, with rectangles written 'aa:cc'
+	expanded
+	"""
+	points = []
+	for value in values:
+		if ':' in value:
+			(corner, other) = [parse_point(v, size) for v in value.split(':', 1)]
+			points.extend((x, y) for x in range(min(corner[0], other[0]), max(corner[0], other[0]) + 1)
+				for y in range(min(corner[1], other[1]), max(corner[1], other[1]) + 1))
+		else:
+			points.append(parse_point(value, size))
+	return points
+
+def winner(result):
+	"""Return:
+	BLACK or WHITE for an SGF result such as 'B+R' or 'W+3.5', or None for a draw, a
+	void or unknown result, or no result
+	"""
+	if result and len(result) > 1 and result[1] == '+':
+		return _colors.get(result[0].upper())
+	return None
+
+def _number(value, kind, default):
+	try:
+		return kind(value.strip())
+	except ValueError:
+		return default
+
+def _header():
+	return {'SZ': 19, 'KM': None, 'HA': 0, 'AB': [], 'AW': [], 'PL': None, 'RE': None}
+
+def mainline_games(data):
+	"""Scan SGF data once, game after game.
+
+	Return:
+	an iterator over (header, moves) of each game tree at the top level of data (see
+	the module docstring). A game left open at the end of data is given as far as it
+	goes.
+	"""
+	depth = 0
+	# the main line ends at the first ')' of a game: everything after is variations
+	ended = True
+	(header, moves) = (None, None)
+	for match in _token.finditer(data):
+		name = match.group(1)
+		if name is None:
+			token = match.group()
+			if token == '(':
+				depth += 1
+				if depth == 1:
+					(header, moves) = (_header(), [])
+					ended = False
+			elif token == ')' and depth > 0:
+				depth -= 1
+				ended = True
+				if depth == 0:
+					yield (header, moves)
+			continue
+		if ended:
+			continue
+		if not name.isupper():
+			# old SGF versions allow lowercase letters in names, e.g. AddBlack for AB
+			name = _lower.sub('', name)
+		color = _colors.get(name)
+		if color is not None:
+			moves.append((color, parse_point(_value.match(match.group(2)).group(1), header['SZ'])))
+		elif name in header:
+			values = _value.findall(match.group(2))
+			if name == 'SZ':
+				# SZ[cols:rows] is only used for rectangular boards
+				header['SZ'] = int(values[0].split(':')[0])
+			elif name == 'KM':
+				header['KM'] = _number(values[0], float, None)
+			elif name == 'HA':
+				header['HA'] = _number(values[0], int, 0)
+			elif name == 'RE':
+				header['RE'] = values[0].strip()
+			elif name == 'PL':
+				# only the player to move at the start of the game is kept
+				if not moves:
+					header['PL'] = _colors.get(values[0].strip().upper())
+			elif moves:
+				raise ValueError("setup stones after the first move")
+			else:
+				header[name].extend(parse_points(values, header['SZ']))
+	if depth > 0:
+		yield (header, moves)
+
+def mainline(data):
+	"""Return:
+	(header, moves) of the first game in SGF data (see mainline_games)
+	"""
+	for game in mainline_games(data):
+		return game
+	raise ValueError("no game in SGF data")
@@ -0,0 +1,54 @@
+"""Moves per second of N random games stepped as one GameStateBatch vs N GameStates.
+
+Both sides pick uniformly among the points of their legal move masks, so the cost of
+the masks (which a batched network evaluation needs anyway) is included.
+
+Run from the repository root:
+	python -m benchmarks.batch [--games 256] [--moves 100]
+"""
+import argparse
+import time
+import numpy as np
+from AlphaGo.go import GameState, GameStateBatch
+
+def random_actions(masks, rng):
+	"""one uniformly chosen legal flat index per (size, size) mask, PASS where there is none
+	"""
+	flat = masks.reshape(len(masks), -1)
+	# pick the legal point with the largest random key
+	keys = np.where(flat, rng.rand(*flat.shape), -1)
+	actions = np.argmax(keys, axis=1)
+	actions[~flat.any(axis=1)] = GameStateBatch.PASS
+	return actions
+
+def time_batch(games, moves, size, seed=0):
+	rng = np.random.RandomState(seed)
+	batch = GameStateBatch(games, size)
+	start = time.time()
+	for _ in range(moves):
+		batch.step(random_actions(batch.legal_moves_mask(), rng))
+	return time.time() - start
+
+def time_states(games, moves, size, seed=0):
+	rng = np.random.RandomState(seed)
+	states = [GameState(size, enforce_superko=False) for _ in range(games)]
+	start = time.time()
+	for _ in range(moves):
+		masks = np.array([st.legal_moves_mask() for st in states])
+		for (st, action) in zip(states, random_actions(masks, rng)):
+			if action == GameStateBatch.PASS:
+				# GameState has no pass move; stop playing that game
+				continue
+			st.do_move(divmod(int(action), size))
+	return time.time() - start
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Benchmark lockstep batched games against independent GameStates.')
+	parser.add_argument("--games", type=int, default=256, help="Games played in parallel. Defaults to 256")
+	parser.add_argument("--moves", type=int, default=100, help="Moves per game. Defaults to 100")
+	parser.add_argument("--size", type=int, default=19, help="Board size. Defaults to 19")
+	args = parser.parse_args()
+
+	total = args.games * args.moves
+	print("%-15s %10.0f moves/s" % ("GameState", total / time_states(args.games, args.moves, args.size)))
+	print("%-15s %10.0f moves/s" % ("GameStateBatch", total / time_batch(args.games, args.moves, args.size)))
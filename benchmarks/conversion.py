@@ -0,0 +1,63 @@
+"""Games and samples per second converted by game_converter.batch_convert, on a folder
+of random games, for 1, 2, ... worker processes.
+
+Run from the repository root, with the converter's folder on the path:
+	PYTHONPATH=.:data/utils python -m benchmarks.conversion [--games 40] [--moves 150] [--workers 4]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+from AlphaGo.go import GameState
+from game_converter import game_converter
+
+SGF_LETTERS = "abcdefghijklmnopqrs"
+
+def write_random_games(folder, games, moves, seed=0):
+	"""write games random games of up to moves moves as SGF files in folder
+	"""
+	rng = np.random.RandomState(seed)
+	for g in range(games):
+		st = GameState(enforce_superko=False)
+		nodes = []
+		for _ in range(moves):
+			legal = np.argwhere(st.sensible_moves_mask())
+			if len(legal) == 0:
+				break
+			(x, y) = legal[rng.randint(len(legal))]
+			nodes.append(";%s[%s%s]" % ("B" if st.current_player == 1 else "W", SGF_LETTERS[x], SGF_LETTERS[y]))
+			st.do_move((x, y))
+		with open(os.path.join(folder, "game%05d.sgf" % g), "w") as f:
+			f.write("(;GM[1]SZ[19]KM[6.5]%s)" % "".join(nodes))
+
+def benchmark(folder, workers, ordered):
+	"""Return:
+	(games per second, samples per second)
+	"""
+	converter = game_converter()
+	converter.report_every = 10 ** 9
+	start = time.time()
+	samples = sum(1 for _ in converter.batch_convert(folder, workers, ordered))
+	elapsed = time.time() - start
+	return converter.games_converted / elapsed, samples / elapsed
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Benchmark parallel SGF conversion.')
+	parser.add_argument("--games", type=int, default=40, help="Random games to convert. Defaults to 40")
+	parser.add_argument("--moves", type=int, default=150, help="Moves per game. Defaults to 150")
+	parser.add_argument("--workers", type=int, default=4, help="Most worker processes to try. Defaults to 4")
+	args = parser.parse_args()
+
+	folder = tempfile.mkdtemp()
+	try:
+		write_random_games(folder, args.games, args.moves)
+		results = []
+		for workers in sorted(set([1, 2, args.workers])):
+			for ordered in ([False] if workers == 1 else [False, True]):
+				results.append((workers, ordered) + benchmark(folder, workers, ordered))
+		for (workers, ordered, games_per_sec, samples_per_sec) in results:
+			print("%2d workers %-9s %8.2f games/s %10.1f samples/s" % (workers, "ordered" if ordered else "", games_per_sec, samples_per_sec))
+	finally:
+		shutil.rmtree(folder)
@@ -0,0 +1,42 @@
+"""Per-move cost of the feature planes of each feature set: FeatureEncoder.update()
+after each move vs rebuilding every plane with FeatureEncoder.recompute().
+
+Run from the repository root:
+	python -m benchmarks.features [--moves 200] [--games 3] [--sets deep shallow value]
+"""
+import argparse
+import time
+import numpy as np
+from AlphaGo.go import GameState
+from AlphaGo.features import FeatureEncoder, FEATURE_SETS
+from benchmarks.lookahead import random_game
+
+def time_replay(games, method, feature_set="deep"):
+	"""seconds spent in method(encoder) after each move of every game, and the number of moves
+	"""
+	elapsed = 0.0
+	moves = 0
+	for actions in games:
+		st = GameState(enforce_superko=False)
+		encoder = FeatureEncoder(st, feature_set=feature_set)
+		for action in actions:
+			st.do_move(action)
+			start = time.time()
+			method(encoder)
+			elapsed += time.time() - start
+			moves += 1
+	return (elapsed, moves)
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Benchmark the incremental feature encoder.')
+	parser.add_argument("--moves", type=int, default=200, help="Moves per game. Defaults to 200")
+	parser.add_argument("--games", type=int, default=3, help="Random games to replay. Defaults to 3")
+	parser.add_argument("--sets", nargs="+", default=sorted(FEATURE_SETS), help="Feature sets to time. Defaults to all")
+	args = parser.parse_args()
+
+	rng = np.random.RandomState(0)
+	games = [random_game(args.moves, rng) for _ in range(args.games)]
+	for feature_set in args.sets:
+		for (name, method) in [("update", FeatureEncoder.update), ("recompute", FeatureEncoder.recompute)]:
+			(elapsed, moves) = time_replay(games, method, feature_set)
+			print("%-8s %-12s %10.1f us/move" % (feature_set, name, 1e6 * elapsed / moves))
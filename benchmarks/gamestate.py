@@ -0,0 +1,83 @@
+"""Copies per second and bytes per state of GameState on a mid-game position.
+
+Run from the repository root:
+	python -m benchmarks.gamestate [--size 19] [--moves 150]
+"""
+import argparse
+import random
+import sys
+import time
+import numpy as np
+from AlphaGo.go import GameState, BACKENDS, zobrist_keys
+
+def deep_sizeof(obj, seen):
+	"""Bytes used by obj and everything it references, counting shared objects once.
+	Objects whose id is already in seen are not counted (pre-seed it to exclude
+	tables shared by all states).
+	"""
+	if id(obj) in seen:
+		return 0
+	seen.add(id(obj))
+	size = sys.getsizeof(obj)
+	if isinstance(obj, np.ndarray):
+		# views report only their header; count the memory they look at through the base
+		if obj.base is not None:
+			size += deep_sizeof(obj.base, seen)
+	elif isinstance(obj, dict):
+		for (k, v) in obj.items():
+			size += deep_sizeof(k, seen) + deep_sizeof(v, seen)
+	elif isinstance(obj, (list, tuple, set, frozenset)):
+		for item in obj:
+			size += deep_sizeof(item, seen)
+	else:
+		if hasattr(obj, '__dict__'):
+			size += deep_sizeof(obj.__dict__, seen)
+		for cls in type(obj).__mro__:
+			for slot in getattr(cls, '__slots__', ()):
+				if hasattr(obj, slot):
+					size += deep_sizeof(getattr(obj, slot), seen)
+	return size
+
+def mid_game(backend, size, moves, seed=0):
+	"""a position reached by playing random legal moves from the empty board
+	"""
+	rng = random.Random(seed)
+	state = GameState(size, backend=backend)
+	points = [(x, y) for x in range(size) for y in range(size)]
+	for _ in range(moves):
+		legal = [p for p in points if state.is_legal(p)]
+		if not legal:
+			break
+		state.do_move(rng.choice(legal))
+	return state
+
+def copies_per_second(state, seconds=1.0):
+	count = 0
+	start = time.time()
+	while time.time() - start < seconds:
+		for _ in range(100):
+			state.copy()
+		count += 100
+	return count / (time.time() - start)
+
+def bytes_per_state(state):
+	"""Bytes of one state, excluding the Zobrist keys and lookup tables that all states
+	of a size share. The position history is counted in full even when copies share it.
+	"""
+	seen = set()
+	deep_sizeof(zobrist_keys(state.size), seen)
+	for shared in ['_layout', '_zobrist', '_on_board_mask']:
+		if hasattr(state, shared):
+			deep_sizeof(getattr(state, shared), seen)
+	return deep_sizeof(state, seen)
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Benchmark GameState copies per second and memory per state.')
+	parser.add_argument("--size", type=int, default=19, help="Board size. Defaults to 19")
+	parser.add_argument("--moves", type=int, default=150, help="Random moves played before measuring. Defaults to 150")
+	args = parser.parse_args()
+
+	for backend in BACKENDS:
+		state = mid_game(backend, args.size, args.moves)
+		# tree nodes are copies, which do not carry the undo journal of the game so far
+		print("%-10s %10.0f copies/s %8d bytes/state" % (backend, copies_per_second(state), bytes_per_state(state.copy())))
@@ -0,0 +1,40 @@
+"""Per-position cost of the ladder capture and ladder escape planes on random games:
+reads, moves played, cache hits and time, on average and at worst.
+
+Run from the repository root:
+	python -m benchmarks.ladders [--moves 200] [--games 3] [--max_nodes 2000]
+"""
+import argparse
+import numpy as np
+from AlphaGo.go import GameState
+from AlphaGo.ladders import LadderReader
+
+def measure(games, moves, reader, seed=0):
+	"""Return:
+	a list of (reads, nodes, cache hits, seconds) per position
+	"""
+	rng = np.random.RandomState(seed)
+	costs = []
+	for _ in range(games):
+		st = GameState(enforce_superko=False)
+		for _ in range(moves):
+			legal = np.transpose(np.nonzero(st.legal_moves_mask()))
+			if len(legal) == 0:
+				break
+			st.do_move(tuple(legal[rng.randint(len(legal))]))
+			reader.reset_counters()
+			reader.ladder_captures(st)
+			reader.ladder_escapes(st)
+			costs.append((reader.reads, reader.nodes, reader.cache_hits, reader.seconds))
+	return costs
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Benchmark the ladder planes per position.')
+	parser.add_argument("--moves", type=int, default=200, help="Moves per game. Defaults to 200")
+	parser.add_argument("--games", type=int, default=3, help="Random games to measure on. Defaults to 3")
+	parser.add_argument("--max_nodes", type=int, default=2000, help="Node budget per read. Defaults to 2000")
+	args = parser.parse_args()
+
+	costs = np.array(measure(args.games, args.moves, LadderReader(max_nodes=args.max_nodes)))
+	for (name, column, scale) in [("reads", 0, 1), ("nodes", 1, 1), ("cache hits", 2, 1), ("us", 3, 1e6)]:
+		print("%-12s mean %10.1f   max %10.1f per position" % (name, scale * costs[:, column].mean(), scale * costs[:, column].max()))
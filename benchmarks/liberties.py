@@ -0,0 +1,67 @@
+"""Whole-board liberty counts: connected-component labelling vs GameState.
+
+The labelling path needs only a board, as when converting positions that were never
+played through a GameState; GameState keeps liberties up to date as moves are played,
+so its cost is the replay of the game plus one lookup per position.
+
+Run from the repository root:
+	python -m benchmarks.liberties [--moves 200] [--games 5]
+"""
+import argparse
+import time
+import numpy as np
+from AlphaGo import chains
+from AlphaGo.go import GameState
+
+def record_games(games, moves, seed=0):
+	"""random games as move lists, with the board after every move
+	"""
+	rng = np.random.RandomState(seed)
+	records = []
+	for _ in range(games):
+		st = GameState(enforce_superko=False)
+		actions = []
+		boards = []
+		for turn in range(moves):
+			legal = np.transpose(np.nonzero(st.legal_moves_mask()))
+			if len(legal) == 0:
+				break
+			action = tuple(legal[rng.randint(len(legal))])
+			st.do_move(action)
+			actions.append(action)
+			boards.append(np.array(st.board))
+		records.append((actions, boards))
+	return records
+
+def time_gamestate(records):
+	"""seconds spent replaying every game and reading the liberties after each move
+	"""
+	start = time.time()
+	for (actions, boards) in records:
+		st = GameState(enforce_superko=False)
+		for action in actions:
+			st.do_move(action)
+			chains.one_hot_liberties(st.liberty_counts)
+	return time.time() - start
+
+def time_labelling(records, batch):
+	"""seconds spent labelling every board, in batches of the given size
+	"""
+	boards = np.array([board for (actions, game) in records for board in game])
+	start = time.time()
+	for i in range(0, len(boards), batch):
+		chains.one_hot_liberties(chains.liberty_counts(boards[i:i + batch]))
+	return time.time() - start
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Benchmark whole-board liberty planes.')
+	parser.add_argument("--moves", type=int, default=200, help="Moves per game. Defaults to 200")
+	parser.add_argument("--games", type=int, default=5, help="Random games to measure on. Defaults to 5")
+	args = parser.parse_args()
+
+	records = record_games(args.games, args.moves)
+	positions = sum(len(actions) for (actions, boards) in records)
+	print("%-20s %10.1f us/position" % ("gamestate replay", 1e6 * time_gamestate(records) / positions))
+	for batch in [1, 64]:
+		name = "labelling batch=%d" % batch
+		print("%-20s %10.1f us/position" % (name, 1e6 * time_labelling(records, batch) / positions))
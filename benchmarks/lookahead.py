@@ -0,0 +1,68 @@
+"""Per-move cost of keeping the what-if tables (capture size, self-atari, liberties
+after move) up to date: incremental MoveOutcomes.update() vs recomputing every point
+vs simulating every legal move with do_move and undo.
+
+Run from the repository root:
+	python -m benchmarks.lookahead [--moves 200] [--games 3]
+"""
+import argparse
+import time
+import numpy as np
+from AlphaGo.go import GameState
+from AlphaGo.lookahead import MoveOutcomes
+
+def random_game(moves, rng):
+	"""a list of legal moves of a random game
+	"""
+	st = GameState(enforce_superko=False)
+	actions = []
+	for _ in range(moves):
+		legal = np.transpose(np.nonzero(st.legal_moves_mask()))
+		if len(legal) == 0:
+			break
+		actions.append(tuple(legal[rng.randint(len(legal))]))
+		st.do_move(actions[-1])
+	return actions
+
+def simulate(state):
+	"""play and take back every legal move, reading what the what-if tables hold
+	"""
+	before = np.count_nonzero(state.board == -state.current_player)
+	for (x, y) in zip(*np.nonzero(state.legal_moves_mask())):
+		state.do_move((x, y))
+		captured = before - np.count_nonzero(state.board == state.current_player)
+		size = len(state.visit_neighbor((x, y)))
+		libs = state.liberty_counts[x][y]
+		state.undo()
+
+def time_replay(games, method):
+	"""seconds spent in method(state, outcomes) after each move of every game, and the number of moves
+	"""
+	elapsed = 0.0
+	moves = 0
+	for actions in games:
+		st = GameState(enforce_superko=False)
+		outcomes = MoveOutcomes(st)
+		for action in actions:
+			st.do_move(action)
+			start = time.time()
+			method(st, outcomes)
+			elapsed += time.time() - start
+			moves += 1
+	return (elapsed, moves)
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Benchmark incremental what-if feature tables.')
+	parser.add_argument("--moves", type=int, default=200, help="Moves per game. Defaults to 200")
+	parser.add_argument("--games", type=int, default=3, help="Random games to replay. Defaults to 3")
+	args = parser.parse_args()
+
+	rng = np.random.RandomState(0)
+	games = [random_game(args.moves, rng) for _ in range(args.games)]
+	methods = [
+		("incremental", lambda st, outcomes: outcomes.update()),
+		("recompute", lambda st, outcomes: outcomes.recompute()),
+		("simulate", lambda st, outcomes: simulate(st))]
+	for (name, method) in methods:
+		(elapsed, moves) = time_replay(games, method)
+		print("%-12s %10.1f us/move" % (name, 1e6 * elapsed / moves))
@@ -0,0 +1,58 @@
+"""Random playouts per second for each GameState backend.
+
+Run from the repository root:
+	python -m benchmarks.playouts [--size 19] [--playouts 20]
+"""
+import argparse
+import random
+import time
+from AlphaGo.go import GameState, BACKENDS, PASS_MOVE
+
+def random_playout(state, rng, max_moves):
+	"""Play uniformly chosen legal moves, passing when there is none, until both players
+	pass or max_moves have been played. Points are scanned from a random offset and the
+	first legal one is played.
+
+	Return:
+	the number of moves played
+	"""
+	points = [(x, y) for x in range(state.size) for y in range(state.size)]
+	n = len(points)
+	for played in range(max_moves):
+		if state.is_end_of_game:
+			return played
+		start = rng.randrange(n)
+		for i in range(n):
+			move = points[(start + i) % n]
+			if state.is_legal(move):
+				break
+		else:
+			move = PASS_MOVE
+		state.do_move(move)
+	return max_moves
+
+def benchmark(backend, size, playouts, max_moves, seed=0):
+	"""Time playouts from the empty board with the given backend.
+
+	Return:
+	(playouts per second, moves per second)
+	"""
+	rng = random.Random(seed)
+	moves = 0
+	start = time.time()
+	for _ in range(playouts):
+		moves += random_playout(GameState(size, backend=backend), rng, max_moves)
+	elapsed = time.time() - start
+	return playouts / elapsed, moves / elapsed
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Benchmark random playouts on each board backend.')
+	parser.add_argument("--size", type=int, default=19, help="Board size. Defaults to 19")
+	parser.add_argument("--playouts", type=int, default=20, help="Playouts per backend. Defaults to 20")
+	parser.add_argument("--max_moves", type=int, default=None, help="Move cap per playout. Defaults to size*size")
+	args = parser.parse_args()
+
+	max_moves = args.max_moves or args.size * args.size
+	for backend in BACKENDS:
+		(playouts_per_sec, moves_per_sec) = benchmark(backend, args.size, args.playouts, max_moves)
+		print("%-10s %10.2f playouts/s %10.0f moves/s" % (backend, playouts_per_sec, moves_per_sec))
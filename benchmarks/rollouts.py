@@ -0,0 +1,41 @@
+"""Rollouts per second on one core: games played from the empty board to the two-pass
+end with the fast rollout policy, and with all of its weights at zero (uniformly random
+moves that do not fill the player's own eyes).
+
+Run from the repository root:
+	python -m benchmarks.rollouts [--size 19] [--rollouts 10]
+"""
+import argparse
+import time
+import numpy as np
+from AlphaGo.go import GameState
+from AlphaGo.models.shallow_policy import rollout_policy, default_weights
+
+def uniform_weights():
+	weights = default_weights()
+	weights['response'][:] = 0
+	for key in ['capture', 'save', 'atari']:
+		weights[key] = 0.0
+	return weights
+
+def benchmark(policy, size, rollouts, seed=0):
+	"""Return:
+	(rollouts per second, moves per second, mean moves per rollout)
+	"""
+	rng = np.random.RandomState(seed)
+	moves = 0
+	start = time.time()
+	for _ in range(rollouts):
+		moves += policy.rollout(GameState(size, enforce_superko=False), rng, max_moves=3 * size * size)
+	elapsed = time.time() - start
+	return rollouts / elapsed, moves / elapsed, float(moves) / rollouts
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Benchmark rollouts to the end of the game.')
+	parser.add_argument("--size", type=int, default=19, help="Board size. Defaults to 19")
+	parser.add_argument("--rollouts", type=int, default=10, help="Rollouts per policy. Defaults to 10")
+	args = parser.parse_args()
+
+	for (name, weights) in [("policy", default_weights()), ("uniform", uniform_weights())]:
+		(rollouts_per_sec, moves_per_sec, length) = benchmark(rollout_policy(weights), args.size, args.rollouts)
+		print("%-10s %10.2f rollouts/s %10.0f moves/s %8.1f moves/rollout" % (name, rollouts_per_sec, moves_per_sec, length))
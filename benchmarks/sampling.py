@@ -0,0 +1,48 @@
+"""Minibatches per second drawn by MinibatchSampler from a packed npy dataset of random
+(48, 19, 19) samples, against reading the same number of random ids one at a time.
+
+Run from the repository root:
+	python -m benchmarks.sampling [--samples 20000] [--batch_size 128] [--batches 200]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+from AlphaGo.dataset import DatasetWriter, SampleIndex, MinibatchSampler
+
+def write_dataset(path, samples, seed=0):
+	rng = np.random.RandomState(seed)
+	with DatasetWriter(path, "npy", chunk_size=4096, packed=True) as writer:
+		for _ in range(samples):
+			action = np.zeros((19, 19), dtype=bool)
+			action.flat[rng.randint(361)] = True
+			writer.append(rng.rand(48, 19, 19) < 0.1, action)
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Benchmark uniform minibatch sampling.')
+	parser.add_argument("--samples", type=int, default=20000, help="Samples in the dataset. Defaults to 20000")
+	parser.add_argument("--batch_size", type=int, default=128, help="Samples per minibatch. Defaults to 128")
+	parser.add_argument("--batches", type=int, default=200, help="Minibatches to draw. Defaults to 200")
+	args = parser.parse_args()
+
+	folder = tempfile.mkdtemp()
+	try:
+		write_dataset(os.path.join(folder, "samples"), args.samples)
+		index = SampleIndex.build([os.path.join(folder, "samples")], os.path.join(folder, "index.npy"))
+		sampler = MinibatchSampler(index, args.batch_size)
+		start = time.time()
+		for _ in range(args.batches):
+			sampler.next_batch()
+		elapsed = time.time() - start
+		print("sampler      %8.1f batches/s %10.0f samples/s" % (args.batches / elapsed, args.batches * args.batch_size / elapsed))
+		start = time.time()
+		for _ in range(args.batches):
+			ids = sampler.next_ids()
+			[index.read([i]) for i in ids]
+		elapsed = time.time() - start
+		print("one by one   %8.1f batches/s %10.0f samples/s" % (args.batches / elapsed, args.batches * args.batch_size / elapsed))
+		index.close()
+	finally:
+		shutil.rmtree(folder)
@@ -0,0 +1,83 @@
+"""Games per second read by AlphaGo.sgf.mainline, against sgflib's SGFParser building the
+game tree and a Cursor walking its main line, as game_converter used to. Both readers
+must agree on the moves of every game.
+
+The corpus is a folder of .sgf files, or generated records with the header, comments
+and variations of typical server games.
+
+Run from the repository root, with the converter's folder on the path (sgflib needs
+python 2):
+	PYTHONPATH=.:data/utils python -m benchmarks.sgf [--folder games/] [--games 300] [--moves 250]
+"""
+import argparse
+import os
+import time
+import numpy as np
+from sgflib.sgflib import SGFParser, GameTreeEndError
+from AlphaGo.go import BLACK, WHITE
+from AlphaGo.sgf import mainline, parse_point
+
+SGF_LETTERS = "abcdefghijklmnopqrs"
+
+def generated_games(games, moves, seed=0):
+	"""SGF text of games records of random points, with a comment every 10 moves and a
+	variation near the end
+	"""
+	rng = np.random.RandomState(seed)
+	records = []
+	for g in range(games):
+		nodes = []
+		for k in range(moves):
+			point = SGF_LETTERS[rng.randint(19)] + SGF_LETTERS[rng.randint(19)]
+			node = ";%s[%s]" % ("BW"[k % 2], point)
+			if k % 10 == 0:
+				node += "C[move %d: (a [tesuji\\]) here]" % k
+			nodes.append(node)
+		variation = "(;%s[aa];%s[bb])" % ("BW"[moves % 2], "BW"[(moves + 1) % 2])
+		records.append("(;GM[1]FF[4]CA[UTF-8]SZ[19]KM[6.5]HA[0]RU[Japanese]PB[black]PW[white]BR[3d]WR[4d]"
+			"DT[2016-01-01]RE[B+R]\n%s(%s)%s)\n" % ("\n".join(nodes[:-2]), "".join(nodes[-2:]), variation))
+	return records
+
+def sgflib_moves(data):
+	"""the main line moves of the first game, walked with a Cursor
+	"""
+	cursor = SGFParser(data).parse().cursor()
+	moves = []
+	while True:
+		try:
+			node = cursor.next()
+		except GameTreeEndError:
+			return moves
+		for (name, color) in [("B", BLACK), ("W", WHITE)]:
+			if node.has_key(name):
+				moves.append((color, parse_point(node[name][0])))
+
+def benchmark(records, reader):
+	"""Return:
+	(games per second, the moves read from each record)
+	"""
+	start = time.time()
+	moves = [reader(data) for data in records]
+	return (len(records) / (time.time() - start), moves)
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Benchmark the SGF main line reader against sgflib.')
+	parser.add_argument("--folder", help="Folder of .sgf files to read. Defaults to generated games")
+	parser.add_argument("--games", type=int, default=300, help="Generated games. Defaults to 300")
+	parser.add_argument("--moves", type=int, default=250, help="Moves per generated game. Defaults to 250")
+	args = parser.parse_args()
+
+	if args.folder:
+		records = []
+		for name in sorted(os.listdir(args.folder)):
+			if name.lower().endswith(".sgf"):
+				with open(os.path.join(args.folder, name)) as f:
+					records.append(f.read())
+	else:
+		records = generated_games(args.games, args.moves)
+	(fast, fast_moves) = benchmark(records, lambda data: mainline(data)[1])
+	(full, full_moves) = benchmark(records, sgflib_moves)
+	print("%d games, %d moves" % (len(records), sum(len(moves) for moves in fast_moves)))
+	print("%-10s %10.1f games/s" % ("sgflib", full))
+	print("%-10s %10.1f games/s" % ("mainline", fast))
+	print("speedup    %10.1fx, moves %s" % (fast / full, "agree" if fast_moves == full_moves else "DIFFER"))
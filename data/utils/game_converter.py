@@ -1,24 +1,32 @@
-import os, argparse
+"""Convert SGF game records into datasets of training samples (see convert_corpus).
+
+Run as a script, with python 2 (as sgflib), from any folder:
+	python data/utils/game_converter.py games/ out/ [-t deep] [-f hdf5] [-w 4] [--dedup]
+"""
+import os, sys, argparse, time, multiprocessing, json, hashlib, itertools, tarfile, zipfile
+# the AlphaGo package is in the repository root; sgflib is next to this file, whose
+# folder is on the path of a script
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 import numpy as np
-import game_logic as gl
-from sgflib.sgflib import SGFParser, GameTreeEndError
+from sgflib.sgflib import SGFStreamParser
+from AlphaGo.go import GameState, BLACK, WHITE, PASS_MOVE, canonical_hash
+from AlphaGo.sgf import mainline, winner
+from AlphaGo.features import FeatureEncoder, FEATURES_VERSION, FEATURE_SETS
+from AlphaGo.ladders import LadderReader
+from AlphaGo.dataset import DatasetWriter, Dataset, SampleIndex, PositionIndex, read_metadata
+
+# bump when a change to the converter changes the samples it produces
+CONVERTER_VERSION = 5
 
 class game_converter:
     def __init__(self,target_format="deep"):
-        self.index_at = {'a':0,'b':1,'c':2,'d':3,
-                         'e':4,'f':5,'g':6,'h':7,
-                         'i':8,'j':9,'k':10,'l':11,
-                         'm':12,'n':13,'o':14,'p':15,
-                         'q':16,'r':17,'s':18}
-        self.target_format = target_format # todo: implement this
-
-    # convert move into board indices
-    def parse_raw_move(self,raw_move):
-        pos = list(str(raw_move)[3:5])
-        col = self.index_at[pos[0]]
-        row = self.index_at[pos[1]]
-        move = {'col':col,'row':row}
-        return move
+        # the feature set of the samples (see AlphaGo.features.FEATURE_SETS)
+        self.target_format = target_format
+        # one reader for all games, so its counters cover the whole conversion
+        self.ladders = LadderReader()
+        # print conversion statistics after this many games
+        self.report_every = 1000
+        self.reset_counters()
 
     # convert indices into 19x19 training label
     def encode_label(self,move):
@@ -27,81 +35,485 @@ class game_converter:
         one_hot[move['col']][move['row']] = 1
         return one_hot
 
-    # prepare training sample
-    def append_state(self,states,move):
-        if len(states) is not 0:
-            # copy last board state
-            state = np.copy(states[-1])
-            states.append(state)
-            # relativise it to current player
-            state[0:2] = state[0:2][::-1]
-        else: # create board from scratch
-            state = np.zeros((48,19,19),dtype=bool)
-            # convert 3rd slice to ones because all board positions are empty
-            # convert 4th slice to ones because it's a constant plane of ones
-            # convert 5th slice to ones because no moves have been played yet
-            state[2:5] = ~state[2:5]
-            # add two states: 1 empty board and 1 in which we place 1st move
-            states.append(state)
-            state = np.copy(state)
-            states.append(state)
-
-        # perform move
-        state[0][move['col']][move['row']] = 1
-        state[2][move['col']][move['row']] = 0
-
-        # compute feature slices based on game logic
-        gl.check_for_capture(state[0:2])
-        gl.update_move_ages(state[4:12],move)
-        gl.update_current_liberties(state[0:2],state[12:20])
-        gl.update_capture_sizes(state[0:2],state[20:29])
-        gl.update_self_atari_sizes(state[0:2],state[29:37])
-        gl.update_future_liberties(state[0:2],state[37:44])
-        gl.update_ladder_captures(state[0:2],state[44])
-        gl.update_ladder_escapes(state[0:2],state[45])
-        gl.update_sensibleness(state[0:2],state[46])
-
-    # convert full game into training samples
-    def convert_game(self,file_name):
+    # value training label: the outcome z of the game for the player to move, 1 for a
+    # win and -1 for a loss
+    def encode_outcome(self,player,game_winner):
+        return np.array([1 if player == game_winner else -1],dtype=np.int8)
+
+    # prepare training sample: the features of the position before the next move,
+    # as kept by the encoder following the game
+    def append_state(self,states,encoder):
+        states.append(np.copy(encoder.features))
+
+    # convert full game into training samples; keyed adds the canonical hash and
+    # symmetry of each position (see AlphaGo.go.canonical_hash) as a third element
+    def convert_game(self,file_name,keyed=False):
         with open(file_name,'r') as file_object:
-            sgf_object = SGFParser(file_object.read())
-        c = sgf_object.parse().cursor()
+            return self.convert_sgf(file_object.read(),keyed)
+
+    # convert the main line of the first game of SGF data into training samples, as
+    # convert_game; passes are played but make no sample. Samples of the 'value' target
+    # format are labelled with the game's outcome (see encode_outcome), so games
+    # without a winner cannot be converted to it
+    def convert_sgf(self,data,keyed=False):
+        (header,moves) = mainline(data)
+        if header['SZ'] != 19:
+            raise ValueError("board size %d" % header['SZ'])
+        game_winner = None
+        if self.target_format == 'value':
+            game_winner = winner(header['RE'])
+            if game_winner is None:
+                raise ValueError("no winner in result %r" % header['RE'])
+        # game records follow rules with simple ko only
+        game_state = GameState(enforce_superko=False)
+        # setup (e.g. handicap) stones come before the moves. The first player is
+        # given by PL, or else by the first move, as after setup stones either may play
+        game_state.place_stones(header['AB'],BLACK)
+        game_state.place_stones(header['AW'],WHITE)
+        if header['PL'] is not None:
+            game_state.current_player = header['PL']
+        elif moves:
+            game_state.current_player = moves[0][0]
+        encoder = FeatureEncoder(game_state,self.ladders,self.target_format)
         states = []
         actions = []
-        while True:
-            try:
-                move = self.parse_raw_move(c.next())
-                actions.append(self.encode_label(move))
-                self.append_state(states,move)
-            except GameTreeEndError:
-                # remove last board state since it has no label
-                states = states[0:-1]
-                break
+        positions = []
+        for (color,move) in moves:
+            if color != game_state.current_player:
+                raise ValueError("move %d is not by the player to move" % (game_state.turns_played + 1))
+            if move is not PASS_MOVE:
+                if game_winner is None:
+                    actions.append(self.encode_label({'col':move[0],'row':move[1]}))
+                else:
+                    actions.append(self.encode_outcome(game_state.current_player,game_winner))
+                self.append_state(states,encoder)
+                if keyed:
+                    positions.append(canonical_hash(game_state.board,game_state.current_player))
+            game_state.do_move(move)
+            encoder.update()
+        if keyed:
+            return zip(states, actions, positions)
         return zip(states, actions)
 
-    # lazily convert folder of games into training samples
-    def batch_convert(self,folder_path):
-        file_names = os.listdir(folder_path)
-        for file_name in file_names:
-            print file_name
-            training_samples = self.convert_game(os.path.join(folder_path,file_name))
-            for sample in training_samples:
+    # conversion statistics, since construction or the start of the last batch_convert
+    def reset_counters(self):
+        self.games_converted = 0
+        self.games_failed = 0
+        self.samples_converted = 0
+        self.start_time = time.time()
+
+    def report(self):
+        elapsed = max(time.time() - self.start_time, 1e-9)
+        return "%d games (%d failed), %d samples in %.1fs: %.1f games/s, %.1f samples/s" % (
+            self.games_converted, self.games_failed, self.samples_converted, elapsed,
+            self.games_converted / elapsed, self.samples_converted / elapsed)
+
+    # count a converted game, or report the error it failed with
+    def _collect(self,file_name,samples,error):
+        if error is not None:
+            print("skipping %s: %s" % (file_name,error))
+            self.games_failed += 1
+            return []
+        self.games_converted += 1
+        self.samples_converted += len(samples)
+        if self.games_converted % self.report_every == 0:
+            print(self.report())
+        return samples
+
+    # lazily convert (name, SGF data) pairs into (name, samples, error) per game
+    # games are taken from the iterable only as they are needed. With workers > 1
+    # games are converted in that many processes, and at most max_pending games
+    # (default 4 per worker) are being converted or wait in memory for the consumer;
+    # ordered keeps the order of the games, otherwise they come out as they finish;
+    # keyed is passed on to convert_sgf
+    def convert_games(self,games,workers=1,ordered=False,max_pending=None,keyed=False):
+        self.reset_counters()
+        if workers > 1:
+            converted = self._parallel_convert(games,workers,ordered,max_pending or 4 * workers,keyed)
+        else:
+            converted = self._sequential_convert(games,keyed)
+        for (name,samples,error) in converted:
+            yield (name,self._collect(name,samples,error),error)
+        print(self.report())
+
+    # lazily convert files into (file name, samples, error) per game (see convert_games)
+    def convert_files(self,file_names,workers=1,ordered=False,max_pending=None,keyed=False):
+        games = ((file_name,read_file(file_name)) for file_name in file_names)
+        return self.convert_games(games,workers,ordered,max_pending,keyed)
+
+    # lazily convert the games in a folder, an archive or a collection file into
+    # training samples (see sgf_games and convert_games)
+    def batch_convert(self,path,workers=1,ordered=False,max_pending=None):
+        for (name,samples,error) in self.convert_games(sgf_games(path),workers,ordered,max_pending):
+            for sample in samples:
                 yield sample
 
+    def _sequential_convert(self,games,keyed=False):
+        for (name,data) in games:
+            try:
+                yield (name,list(self.convert_sgf(data,keyed)),None)
+            except Exception as e:
+                yield (name,None,repr(e))
+
+    def _parallel_convert(self,games,workers,ordered,max_pending,keyed=False):
+        tasks = multiprocessing.Queue()
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=convert_worker,args=(self.target_format,tasks,results,keyed))
+                     for _ in range(workers)]
+        for process in processes:
+            process.daemon = True
+            process.start()
+        games = iter(games)
+        exhausted = False
+        queued = 0
+        done = 0
+        # games that finished before the ones ahead of them, in ordered mode
+        waiting = {}
+        try:
+            while True:
+                # games queued but not handed on are bounded by max_pending
+                while not exhausted and queued - done < max_pending:
+                    try:
+                        (name,data) = next(games)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    tasks.put((queued,name,data))
+                    queued += 1
+                if exhausted and done == queued:
+                    break
+                (index,name,samples,error) = results.get()
+                if not ordered:
+                    done += 1
+                    yield (name,samples,error)
+                    continue
+                waiting[index] = (name,samples,error)
+                while done in waiting:
+                    game = waiting.pop(done)
+                    done += 1
+                    yield game
+            for process in processes:
+                tasks.put(None)
+            for process in processes:
+                process.join()
+        finally:
+            # the consumer may stop early
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+
+def read_file(file_name):
+    with open(file_name,'r') as file_object:
+        return file_object.read()
+
+# archives read member by member, without extracting them
+ARCHIVE_SUFFIXES = ('.tar','.tar.gz','.tgz','.tar.bz2','.tbz2','.zip')
+
+# the SGF files under path -- a folder (searched recursively, in name order), the .sgf
+# members of a tar or zip archive (in archive order), or a single file -- as
+# (name, size, mtime, open):
+# the name relative to path (an archive's members under the archive's name), and a
+# function returning the file opened for reading. Archives are streamed: a file opened
+# is valid only until the next file is produced
+def sgf_files(path,name=''):
+    if os.path.isdir(path):
+        for entry in sorted(os.listdir(path)):
+            for sgf_file in sgf_files(os.path.join(path,entry),name + entry + ('/' if os.path.isdir(os.path.join(path,entry)) else '')):
+                yield sgf_file
+    elif path.lower().endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if info.filename.lower().endswith('.sgf'):
+                    yield (name + '/' + info.filename if name else info.filename,info.file_size,
+                           time.mktime(info.date_time + (0,0,-1)),lambda info=info: archive.open(info))
+    elif path.lower().endswith(ARCHIVE_SUFFIXES):
+        # 'r|*' reads the (compressed) archive as a stream, one member after the other
+        archive = tarfile.open(path,'r|*')
+        try:
+            for member in archive:
+                if member.isfile() and member.name.lower().endswith('.sgf'):
+                    yield (name + '/' + member.name if name else member.name,member.size,member.mtime,
+                           lambda member=member: archive.extractfile(member))
+        finally:
+            archive.close()
+    else:
+        stat = os.stat(path)
+        yield (name or os.path.basename(path),stat.st_size,stat.st_mtime,lambda: open(path,'r'))
+
+# (name, SGF data) of every game under path (see sgf_files); the games of a file
+# holding more than one are named file#0, file#1, ... Files are read in chunks, one game
+# at a time, so that a collection of any size takes the memory of one game; a file with
+# no game is given out as one empty game, for converting it to report the error (its
+# text is not kept, as it may be of any size). With a manifest,
+# games it holds up to date are left out, and details[name] is set to the (size, mtime,
+# sha1, games in the file) of each game given out, the number of games being known (and
+# not None) only for the last game of a file. Once a file has been read, the manifest
+# entries of the games it no longer holds under their names are retired, and those of
+# its games left out are brought up to date with the file (see conversion_manifest)
+def sgf_games(path,manifest=None,details=None):
+    for (name,size,mtime,open_file) in sgf_files(path):
+        if manifest is not None and manifest.file_up_to_date(name,size,mtime):
+            continue
+        file_object = open_file()
+        try:
+            games = SGFStreamParser(file_object).gameData()
+            game_names = []
+            # a game is named once the next one is found, or the file has ended
+            (k,game) = (0,next(games,''))
+            while game is not None:
+                following = next(games,None)
+                game_name = name if k == 0 and following is None else '%s#%d' % (name,k)
+                game_names.append(game_name)
+                in_file = None if following is not None else k + 1
+                digest = hashlib.sha1(game).hexdigest() if manifest is not None else None
+                if digest is None or not manifest.game_up_to_date(game_name,digest):
+                    if digest is not None:
+                        details[game_name] = (size,mtime,digest,in_file)
+                    yield (game_name,game)
+                else:
+                    manifest.touch(game_name,size,mtime,in_file)
+                (k,game) = (k + 1,following)
+            if manifest is not None:
+                manifest.retire(name,size,mtime,game_names)
+        finally:
+            file_object.close()
+
+class conversion_manifest:
+    """Record of the games converted into an output folder, one JSON line per game in
+    manifest.jsonl: the game's name (see sgf_games), the size and mtime of its file, the
+    sha1 of its data, the number of games in its file (given with its last game), the
+    converter and feature-set versions, and the dataset and range of samples it was
+    written to (or the error it failed with). The last line of a file wins. The games a
+    file no longer holds under a name are given entries without samples or sha1 (see
+    retire).
+
+    A game is recorded only once its samples are on disk, so after an interrupted run
+    the games that were not recorded are converted again; their earlier partial samples
+    stay in the dataset but are left out of live_ranges(), and so out of the index.
+    """
+
+    def __init__(self,path):
+        self.path = path
+        self.entries = {}
+        line = '\n'
+        if os.path.exists(path):
+            with open(path) as file_object:
+                for line in file_object:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # a line cut short by an interrupted run
+                        continue
+                    self.entries[entry['file']] = entry
+        self._file = open(path,'a')
+        # start on a fresh line after one cut short
+        if not line.endswith('\n'):
+            self._file.write('\n')
+
+    def close(self):
+        self._file.close()
+
+    def _current(self,name):
+        entry = self.entries.get(name)
+        if entry is None or entry['converter_version'] != CONVERTER_VERSION or entry['features_version'] != FEATURES_VERSION:
+            return None
+        return entry
+
+    # whether every game of the named file was converted by this converter version
+    # from a file of this size and mtime, so that the file need not be read: the games
+    # file#0, file#1, ... are followed up to the one that gives the number of games
+    def file_up_to_date(self,name,size,mtime):
+        entry = self._current(name)
+        if entry is not None and entry.get('games',1) == 1:
+            return entry['size'] == size and entry['mtime'] == mtime
+        for k in itertools.count():
+            entry = self._current('%s#%d' % (name,k))
+            if entry is None or entry['size'] != size or entry['mtime'] != mtime:
+                return False
+            if entry['games'] is not None and entry['games'] <= k + 1:
+                return entry['games'] == k + 1
+
+    # whether the named game was converted, unchanged, by this converter version
+    def game_up_to_date(self,name,digest):
+        entry = self._current(name)
+        return entry is not None and entry['sha1'] == digest
+
+    # a manifest entry for the named game, the size and mtime of its file, the sha1 of
+    # its data and the number of games in its file (None but for its last game)
+    def entry(self,name,size,mtime,digest,games,dataset,start,count,error=None):
+        return {'file':name,'size':size,'mtime':mtime,'sha1':digest,'games':games,
+                'converter_version':CONVERTER_VERSION,'features_version':FEATURES_VERSION,
+                'dataset':dataset,'start':start,'count':count,'error':error}
+
+    def record(self,entry):
+        self.entries[entry['file']] = entry
+        self._file.write(json.dumps(entry) + '\n')
+        self._file.flush()
+
+    # bring the entry of a game left out as up to date in line with the size and mtime
+    # of its file and the number of games in it, so that the file need not be read again
+    def touch(self,name,size,mtime,games):
+        entry = self.entries[name]
+        if (entry['size'],entry['mtime'],entry['games']) != (size,mtime,games):
+            self.record(dict(entry,size=size,mtime=mtime,games=games))
+
+    # supersede the entries of the named file's games -- under the file's name or
+    # file#0, file#1, ... -- not among game_names, the games the file holds now, by
+    # entries without samples (and no sha1), so that a game is not indexed under an
+    # old name as well as its new one, nor a game the file dropped
+    def retire(self,name,size,mtime,game_names):
+        kept = set(game_names)
+        old_names = [name] + list(itertools.takewhile(lambda game_name: game_name in self.entries,
+                                                      ('%s#%d' % (name,k) for k in itertools.count())))
+        for game_name in old_names:
+            entry = self.entries.get(game_name)
+            if game_name not in kept and entry is not None and entry['sha1'] is not None:
+                self.record(self.entry(game_name,size,mtime,None,0,entry['dataset'],0,0))
+
+    # the (start, count) sample ranges of the current entries written to dataset
+    def live_ranges(self,dataset):
+        return sorted((entry['start'],entry['count']) for entry in self.entries.values()
+                      if entry['dataset'] == dataset and entry['count'] and entry['error'] is None
+                      and entry['converter_version'] == CONVERTER_VERSION
+                      and entry['features_version'] == FEATURES_VERSION)
+
+# append the samples of a keyed game (see convert_game) whose positions the index has
+# not seen, labelled with move counts, and only count the moves of the others
+def append_unique(writer,positions,samples):
+    for (state,action,(key,symmetry)) in samples:
+        if positions.add(key,symmetry,int(np.argmax(action)),len(writer)):
+            writer.append(state,action.astype(np.uint32))
+
+# replace the labels of the samples whose positions were seen again with their move
+# counts, batch_size samples at a time
+def store_move_counts(path,positions,batch_size=1024):
+    dataset = Dataset(path,"r+")
+    shape = tuple(dataset.metadata['action_shape'])
+    changes = positions.changed_counts()
+    while True:
+        batch = list(itertools.islice(changes,batch_size))
+        if not batch:
+            break
+        dataset.write_actions([sample for (sample,counts) in batch],
+                              np.array([counts.reshape(shape) for (sample,counts) in batch]))
+    dataset.close()
+    positions.mark_written()
+    positions.commit()
+
+# convert the (index, name, SGF data) games handed out on tasks, putting (index, name,
+# samples, error) on results, until a None task; runs in each worker process of a
+# parallel conversion
+def convert_worker(target_format,tasks,results,keyed=False):
+    converter = game_converter(target_format)
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        (index,name,data) = task
+        try:
+            results.put((index,name,list(converter.convert_sgf(data,keyed)),None))
+        except Exception as e:
+            results.put((index,name,None,repr(e)))
+
+# convert the games under infolder (see sgf_games) into a dataset in outfolder, and
+# index its samples in outfolder/index.npy (see AlphaGo.dataset.SampleIndex). Only the
+# games that are new, changed, or were converted by another version are converted
+# (see conversion_manifest), so that a run picks up where an interrupted one stopped.
+# Returns the number of samples indexed
+def convert_corpus(converter,infolder,outfolder,format="hdf5",workers=1,ordered=False,max_pending=None,
+                   packed=True,dedup=False,chunk_size=1024):
+    target_format = converter.target_format
+    if dedup and target_format == "value":
+        raise ValueError("value samples are labelled with outcomes, not moves, and cannot be deduplicated")
+    if not os.path.exists(outfolder):
+        os.makedirs(outfolder)
+    dataset = "samples.h5" if format == "hdf5" else "samples"
+    path = os.path.join(outfolder,dataset)
+    if os.path.exists(path) and read_metadata(path).get('deduplicated',False) != dedup:
+        raise ValueError("%s was %sconverted with --dedup" % (path,"not " if dedup else ""))
+    if os.path.exists(path) and read_metadata(path).get('target_format',target_format) != target_format:
+        raise ValueError("%s holds %s samples" % (path,read_metadata(path)['target_format']))
+
+    metadata = {'target_format':target_format,'source':os.path.abspath(infolder),
+                'converter_version':CONVERTER_VERSION,'features_version':FEATURES_VERSION,
+                'deduplicated':dedup}
+    manifest = conversion_manifest(os.path.join(outfolder,"manifest.jsonl"))
+    positions = None
+    # record games once their samples are on disk; the position index is committed
+    # first, at the end of a game, so that it holds every game the manifest holds. The
+    # games it holds and the manifest does not, after an interrupted run, are rolled
+    # back when it is opened (see PositionIndex)
+    def record(entries):
+        if entries and positions is not None:
+            positions.commit()
+        for entry in entries:
+            manifest.record(entry)
+    try:
+        with DatasetWriter(path,format,mode="a",metadata=metadata,packed=packed,chunk_size=chunk_size) as writer:
+            if dedup:
+                recorded = set((entry['file'],entry['start']) for entry in manifest.entries.values()
+                               if entry['dataset'] == dataset)
+                positions = PositionIndex(os.path.join(outfolder,"positions.db"),count=writer.metadata['count'],
+                                          recorded=recorded)
+            # games whose samples are not all on disk yet
+            pending = []
+            # only games that are new, changed, or converted by another version
+            details = {}
+            games = converter.convert_games(sgf_games(infolder,manifest,details),
+                                            workers,ordered,max_pending,keyed=dedup)
+            for (name,samples,error) in games:
+                (start,flushed) = (len(writer),writer.metadata['count'])
+                if positions is None:
+                    writer.extend(samples)
+                else:
+                    positions.start_game(name,start)
+                    append_unique(writer,positions,samples)
+                # the games before this one are on disk once the writer has flushed
+                # past them
+                if writer.metadata['count'] != flushed:
+                    on_disk = 0
+                    while on_disk < len(pending) and pending[on_disk]['start'] + pending[on_disk]['count'] <= writer.metadata['count']:
+                        on_disk += 1
+                    record(pending[:on_disk])
+                    del pending[:on_disk]
+                (size,mtime,digest,in_file) = details.pop(name)
+                pending.append(manifest.entry(name,size,mtime,digest,in_file,dataset,start,len(writer) - start,error))
+            writer.flush()
+            record(pending)
+        if positions is not None:
+            store_move_counts(path,positions)
+            print("%d distinct positions" % len(positions))
+            positions.close()
+            positions = None
+    finally:
+        manifest.close()
+        if positions is not None:
+            # an interrupted run keeps what was committed at the end of a game
+            positions.close(commit=False)
+
+    index = SampleIndex.build([path],os.path.join(outfolder,"index.npy"),[manifest.live_ranges(dataset)])
+    count = len(index)
+    index.close()
+    print("%d samples indexed" % count)
+    return count
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Prepare a folder of Go game files for training our neural network model.')
-    parser.add_argument("infolder", help="Relative path to folder containing games")
+    parser.add_argument("infolder", help="Relative path to folder containing games, or to a tar or zip archive or .sgf collection of games. Archives in the folder are read as well")
     parser.add_argument("outfolder", help="Relative path to target folder. Will be created if it does not exist.")
-    parser.add_argument("-t","--target_format", help="One of: 'deep', 'shallow', or 'value'. Defaults to 'deep'")
+    parser.add_argument("-t","--target_format", help="One of: 'deep' (48 planes), 'shallow' (20 planes without lookahead), or 'value' (deep and the color to move, labelled with the game outcome). Defaults to 'deep'")
+    parser.add_argument("-w","--workers", type=int, default=1, help="Worker processes converting games. Defaults to 1")
+    parser.add_argument("--ordered", action="store_true", help="Keep the games in file name order when converting in parallel")
+    parser.add_argument("--max_pending", type=int, default=None, help="Converted games held in memory at most. Defaults to 4 per worker")
+    parser.add_argument("-f","--format", default="hdf5", help="Dataset format, one of: 'hdf5' (one samples.h5 file, needs h5py) or 'npy' (memory-mappable shards). Defaults to 'hdf5'")
+    parser.add_argument("--unpacked", action="store_true", help="Store feature planes as one byte per point instead of bit-packed")
+    parser.add_argument("--dedup", action="store_true", help="Keep each position (up to symmetry, with the player to move) once, labelled with the counts of the moves played from it in all games")
     args = parser.parse_args()
 
     if not args.target_format: target_format = "deep"
-    elif any([args.target_format == t for t in ["deep","shallow","value"]]):
+    elif args.target_format in FEATURE_SETS:
         target_format = args.target_format
     else: raise ValueError("Unrecognized target format")
 
-    converter = game_converter(target_format)
-
-    for state,action in converter.batch_convert(args.infolder):
-        # serialize and write deez guise to db
-        pass
+    convert_corpus(game_converter(target_format),args.infolder,args.outfolder,args.format,args.workers,
+                   args.ordered,args.max_pending,packed=not args.unpacked,dedup=args.dedup)
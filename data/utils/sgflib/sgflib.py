@@ -46,6 +46,10 @@ will create a 'Collection' object consisting of one or more 'GameTree''s (one
 contains an ordered dictionary of 'Property' ID/value pairs (note that values
 are lists, and can have multiple entries).
 
+For SGF files too large to read into memory at once, 'SGFStreamParser' reads a
+file object in chunks and yields one 'GameTree' at a time; 'FileCollection'
+gives random access to the games of a (seekable) file, parsing each on demand.
+
 Tree traversal methods are provided through the 'Cursor' class.
 
 The default representation (using 'str()' or 'print') of each class of SGF
@@ -291,6 +295,149 @@ class RootNodeSGFParser(SGFParser):
 		return n								# we're only interested in the root node
 
 
+class SGFStreamParser:
+	"""
+	Parser for SGF data read from a file object in chunks, one game at a time.
+	For collections too big to read whole: only the current game's data and
+	one chunk are held in memory. Iterating yields one 'GameTree' per game,
+	parsed by 'self.parserClass' once the game's closing ")" has been read. The
+	data of a game left open at the end of the file is passed on as it is.
+
+	Instance Attributes:
+	- self.file : file object -- The SGF data source, positioned at its start.
+	  Iterating only needs 'read()'; 'game()' needs 'seek()' as well.
+	- self.chunksize : integer -- Number of characters read at a time.
+	- self.parserClass : class -- Parses the data of each game ('SGFParser').
+	- self.offsets : list of (integer, integer) -- File offset & length of
+	  each game found so far, in order.
+
+	Class Attributes:
+	- re* : re.RegexObject -- Regular expression text matching patterns."""
+
+	# text matching patterns
+	reGameTreeSpecial 	= re.compile(r'[()\[]')			# outside property values
+	rePropertySpecial 	= re.compile(r'[\]\\]')			# inside property values
+
+	def __init__(self, file, chunksize=65536, parserClass=SGFParser):
+		""" Initialize the instance attributes. See the class itself for info."""
+		self.file = file
+		self.chunksize = chunksize
+		self.parserClass = parserClass
+		self.offsets = []
+
+	def __iter__(self):
+		""" Yields a 'GameTree' for each game of the file, in order."""
+		for data in self.gameData():
+			yield self.parserClass(data).parseOneGame()
+
+	def gameData(self):
+		""" Yields the SGF data (a string) of each game of the file, in order,
+			reading from the current position of 'self.file'."""
+		for (offset, data) in self._scan(0, 0):
+			yield data
+
+	def game(self, gamenum):
+		""" Returns the 'GameTree' of game number 'gamenum' (counting from 0),
+			reading 'self.file' from the offset of the game if it has been
+			found already, or scanning on from the last game found. Raises
+			'IndexError' if the file holds fewer games."""
+		if gamenum >= len(self.offsets):
+			if self.offsets:
+				offset = self.offsets[-1][0] + self.offsets[-1][1]
+			else:
+				offset = 0
+			self.file.seek(offset)
+			for found in self._scan(offset, len(self.offsets)):
+				if gamenum < len(self.offsets):
+					break
+			else:
+				raise IndexError("game %d of %d" % (gamenum, len(self.offsets)))
+		offset, length = self.offsets[gamenum]
+		self.file.seek(offset)
+		return self.parserClass(self.file.read(length)).parseOneGame()
+
+	def count(self):
+		""" Returns the number of games in the file, scanning it to the end
+			(once)."""
+		if self.offsets:
+			offset = self.offsets[-1][0] + self.offsets[-1][1]
+		else:
+			offset = 0
+		self.file.seek(offset)
+		for found in self._scan(offset, len(self.offsets)):
+			pass
+		return len(self.offsets)
+
+	def _scan(self, offset, gamenum):
+		""" Yields (offset, data) for each game, reading 'self.file' on from
+			its current position, which is at file offset 'offset'. 'gamenum' is
+			the number of the first game found. Records games not in
+			'self.offsets' yet. Only the brackets of game trees and property
+			values are matched: the games themselves are left to
+			'self.parserClass'. Text outside game trees is skipped."""
+		buffer = ""
+		index = 0							# scanning position in 'buffer'
+		start = None						# start of the current game in 'buffer'
+		depth = 0
+		invalue = 0
+		while 1:
+			if invalue:
+				match = self.rePropertySpecial.search(buffer, index)
+				if match and match.group() == "]":
+					invalue = 0
+					index = match.end()
+					continue
+				if match and match.end() < len(buffer):
+					index = match.end() + 1			# skip the escaped character
+					continue
+				if match:
+					index = match.start()			# rescan '\' with more data
+				else:
+					index = len(buffer)
+			else:
+				match = self.reGameTreeSpecial.search(buffer, index)
+				if match:
+					index = match.end()
+					if match.group() == "(":
+						if depth == 0:
+							start = match.start()
+						depth = depth + 1
+					elif match.group() == ")" and depth:
+						depth = depth - 1
+						if depth == 0:
+							data = buffer[start:index]
+							if gamenum == len(self.offsets):
+								self.offsets.append((offset + start, len(data)))
+							gamenum = gamenum + 1
+							yield (offset + start, data)
+							offset = offset + index
+							buffer = buffer[index:]
+							index = 0
+							start = None
+					elif match.group() == "[" and depth:
+						invalue = 1
+					continue
+				index = len(buffer)
+			# everything before 'index' has been scanned: drop what is not
+			# part of a game, and read the next chunk
+			chunk = self.file.read(self.chunksize)
+			if not chunk:
+				if depth:
+					data = buffer[start:]
+					if gamenum == len(self.offsets):
+						self.offsets.append((offset + start, len(data)))
+					yield (offset + start, data)
+				return
+			if start is None:
+				keep = index
+			else:
+				keep = start
+				start = 0
+			offset = offset + keep
+			buffer = buffer[keep:] + chunk
+			index = index - keep
+
+
 class Collection(List):
 	"""
 	An SGF collection: multiple 'GameTree''s. Instance atributes:
@@ -305,6 +452,48 @@ class Collection(List):
 		return Cursor(self[gamenum])
 
 
+class FileCollection(Collection):
+	"""
+	An SGF collection left in its (seekable) file: each 'GameTree' is parsed
+	when it is asked for, so memory does not grow with the number of games.
+	Indexing, iteration, 'len()' and 'cursor()' work as for 'Collection';
+	changing the collection does not. Instance attributes:
+	- self.parser : SGFStreamParser -- Finds and parses the games of the file."""
+
+	def __init__(self, file, chunksize=65536, parserClass=SGFParser):
+		""" 'file' is an open file object, positioned at its start."""
+		Collection.__init__(self)
+		self.parser = SGFStreamParser(file, chunksize, parserClass)
+
+	def __getitem__(self, gamenum):
+		""" Returns the 'GameTree' of game number 'gamenum'."""
+		if gamenum < 0:
+			gamenum = gamenum + len(self)
+		if gamenum < 0:
+			raise IndexError("game %d" % gamenum)
+		return self.parser.game(gamenum)
+
+	def __len__(self):
+		return self.parser.count()
+
+	def __iter__(self):
+		""" Yields each 'GameTree' in order. Games are read by number, so
+			other uses of the file in between (e.g. 'len()', which 'list()'
+			calls) do not disturb the iteration."""
+		gamenum = 0
+		while 1:
+			try:
+				game = self.parser.game(gamenum)
+			except IndexError:
+				return
+			yield game
+			gamenum = gamenum + 1
+
+	def __str__(self):
+		""" SGF representation. Separates game trees with a blank line."""
+		return string.join(map(str, self), "\n"*2)
+
+
 class GameTree(List):
 	"""
 	An SGF game tree: a game or variation. Instance attributes:
@@ -643,10 +832,32 @@ def selfTest2(onConsole=0):
 	print "done\n"
 	print str(col)
 
+def selfTest3(onConsole=0):
+	""" Streaming parser test: canned data read in tiny chunks"""
+	import StringIO
+	sgfdata = r"""junk (;GM[1]C[a (comment) with \] and \\];B[aa](;W[bb])(;W[cc]))
+(;SZ[9]C[(;];B[dd])
+
+ (;W[ee];B[ff])"""
+	print "\n\n********** Self-Test 3 (stream) **********\n"
+	print "Input data:\n"
+	print sgfdata
+	for chunksize in (1, 2, 3, 7, 65536):
+		parser = SGFStreamParser(StringIO.StringIO(sgfdata), chunksize)
+		games = map(str, parser)
+		print "\nchunk size %d: %d games, offsets %s" % (chunksize, len(games), parser.offsets)
+		assert games == map(str, SGFParser(sgfdata[5:]).parse())
+		col = FileCollection(StringIO.StringIO(sgfdata), chunksize)
+		assert str(col[1]) == games[1] and str(col[-1]) == games[-1]
+		assert len(col) == 3 and str(col.cursor(0).node) == str(parser.game(0)[0])
+	print "\nParsed data:\n"
+	print "\n".join(games)
+
 
 if __name__ == '__main__':
 	print __doc__								# show module's documentation string
 	selfTest1()
+	selfTest3()
 	import os
 	if os.name == 'mac':
 		selfTest2()
@@ -0,0 +1,128 @@
+from AlphaGo.go import GameState, BLACK, WHITE
+from AlphaGo import chains
+import numpy as np
+import unittest
+
+def random_game(moves, seed, size=19):
+	"""GameState after up to the given number of random legal moves, with the board after every move
+	"""
+	rng = np.random.RandomState(seed)
+	st = GameState(size)
+	boards = []
+	for turn in range(moves):
+		legal = np.transpose(np.nonzero(st.legal_moves_mask()))
+		if len(legal) == 0:
+			break
+		st.do_move(tuple(legal[rng.randint(len(legal))]))
+		boards.append(np.array(st.board))
+	return (st, boards)
+
+def flood_fill_areas(board):
+	"""reference Tromp-Taylor areas: search each empty region point by point
+	"""
+	size = len(board)
+	areas = {BLACK: np.count_nonzero(board == BLACK), WHITE: np.count_nonzero(board == WHITE)}
+	seen = set()
+	for x in range(size):
+		for y in range(size):
+			if board[x][y] != 0 or (x, y) in seen:
+				continue
+			(region, frontier, reaches) = (set([(x, y)]), [(x, y)], set())
+			while frontier:
+				(px, py) = frontier.pop()
+				for (nx, ny) in [(px + 1, py), (px - 1, py), (px, py + 1), (px, py - 1)]:
+					if 0 <= nx < size and 0 <= ny < size:
+						if board[nx][ny] == 0 and (nx, ny) not in region:
+							region.add((nx, ny))
+							frontier.append((nx, ny))
+						elif board[nx][ny] != 0:
+							reaches.add(board[nx][ny])
+			seen |= region
+			if len(reaches) == 1:
+				areas[reaches.pop()] += len(region)
+	return (areas[BLACK], areas[WHITE])
+
+class TestChainLabels(unittest.TestCase):
+
+	def test_labels(self):
+		board = np.zeros((5, 5), dtype=int)
+		board[0, 0:2] = BLACK
+		board[1, 1] = BLACK
+		board[2, 2] = BLACK
+		board[0, 2] = WHITE
+		(labels, count) = chains.label_chains(board)
+		self.assertEqual(count, 3)
+		self.assertEqual(labels[0, 0], labels[1, 1])
+		self.assertNotEqual(labels[0, 0], labels[2, 2])
+		self.assertNotEqual(labels[0, 0], labels[0, 2])
+		self.assertEqual(labels[3, 3], 0)
+
+	def test_liberties(self):
+		board = np.zeros((5, 5), dtype=int)
+		board[0, 0:2] = BLACK
+		board[1, 0] = WHITE
+		counts = chains.liberty_counts(board)
+		self.assertEqual(counts[0, 0], 2)
+		self.assertEqual(counts[1, 0], 2)
+		self.assertEqual(counts[4, 4], -1)
+
+	def test_batch_does_not_connect_boards(self):
+		board = np.zeros((2, 5, 5), dtype=int)
+		board[0, 4, 2] = BLACK
+		board[1, 0, 2] = BLACK
+		(labels, count) = chains.label_chains(board)
+		self.assertEqual(count, 2)
+		counts = chains.liberty_counts(board)
+		self.assertEqual(counts[0, 4, 2], 3)
+		self.assertEqual(counts[1, 0, 2], 3)
+
+	def test_random_games_match_gamestate(self):
+		for seed in range(3):
+			(st, boards) = random_game(250, seed)
+			self.assertTrue(np.array_equal(chains.liberty_counts(st.board), st.liberty_counts))
+
+	def test_batch_matches_single_boards(self):
+		(st, boards) = random_game(150, 0, size=9)
+		batch = np.array(boards)
+		counts = chains.liberty_counts(batch)
+		for (board, count) in zip(boards, counts):
+			self.assertTrue(np.array_equal(count, chains.liberty_counts(board)))
+
+	def test_one_hot(self):
+		(st, boards) = random_game(200, 1)
+		counts = st.liberty_counts
+		planes = chains.one_hot_liberties(counts)
+		self.assertEqual(planes.shape, (8, 19, 19))
+		# every stone is in exactly one plane, empty points in none
+		self.assertTrue(np.array_equal(planes.sum(axis=0), counts > 0))
+		for k in range(7):
+			self.assertTrue(np.array_equal(planes[k], counts == k + 1))
+		self.assertTrue(np.array_equal(planes[7], counts >= 8))
+		batch = chains.one_hot_liberties(np.array([counts, counts]))
+		self.assertEqual(batch.shape, (2, 8, 19, 19))
+		self.assertTrue(np.array_equal(batch[1], planes))
+
+class TestAreaScores(unittest.TestCase):
+
+	def test_empty_board(self):
+		self.assertEqual(chains.area_scores(np.zeros((19, 19))), (0, 0))
+
+	def test_single_stone_owns_the_board(self):
+		board = np.zeros((9, 9))
+		board[4, 4] = WHITE
+		self.assertEqual(chains.area_scores(board), (0, 81))
+
+	def test_random_games_match_flood_fill(self):
+		boards = []
+		for seed in range(4):
+			(st, game) = random_game(300, seed, size=9)
+			boards.extend(game[::20])
+		for board in boards:
+			self.assertEqual(tuple(chains.area_scores(board)), flood_fill_areas(board))
+		# batch-wise, with regions that must not leak across boards
+		(black, white) = chains.area_scores(np.array(boards))
+		self.assertEqual(list(zip(black, white)), [flood_fill_areas(board) for board in boards])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,350 @@
+from AlphaGo.dataset import DatasetWriter, Dataset, read_metadata, pack_states, unpack_states
+from AlphaGo.dataset import SampleIndex, MinibatchSampler, RandomPermutation, random_symmetries, augmented
+from AlphaGo.dataset import move_distributions, move_weights
+from AlphaGo.dataset import PositionIndex, _index_field
+from AlphaGo.go import GameState, BLACK, WHITE, SYMMETRY_TRANSFORMS, canonical_hash, transform_moves
+import numpy as np
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+	import h5py
+except ImportError:
+	h5py = None
+
+def samples(n, start=0):
+	"""n distinguishable (state, action) pairs
+	"""
+	rng = np.random.RandomState(start)
+	for i in range(start, start + n):
+		state = rng.rand(4, 5, 5) > 0.5
+		action = np.zeros((5, 5), dtype=bool)
+		action.flat[i % 25] = True
+		yield (state, action)
+
+class TestNpyDataset(unittest.TestCase):
+
+	format = "npy"
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		self.path = os.path.join(self.folder, "samples")
+
+	def tearDown(self):
+		shutil.rmtree(self.folder)
+
+	def test_write_and_read(self):
+		expected = list(samples(50))
+		with DatasetWriter(self.path, self.format, metadata={"target_format": "deep"}, chunk_size=16) as writer:
+			writer.extend(expected)
+			self.assertEqual(len(writer), 50)
+		dataset = Dataset(self.path)
+		self.assertEqual(len(dataset), 50)
+		self.assertEqual(dataset.metadata["target_format"], "deep")
+		self.assertEqual(dataset.metadata["state_shape"], [4, 5, 5])
+		indices = [49, 3, 17, 3, 32, 0]
+		(states, actions) = dataset.read(indices)
+		self.assertEqual(states.dtype, bool)
+		for (k, i) in enumerate(indices):
+			self.assertTrue(np.array_equal(states[k], expected[i][0]))
+			self.assertTrue(np.array_equal(actions[k], expected[i][1]))
+		(states, actions) = dataset.random_minibatch(8, np.random.RandomState(0))
+		self.assertEqual(states.shape, (8, 4, 5, 5))
+		self.assertEqual(dataset.read([])[0].shape, (0, 4, 5, 5))
+		self.assertRaises(IndexError, dataset.read, [50])
+		dataset.close()
+
+	def test_append_mode(self):
+		with DatasetWriter(self.path, self.format, chunk_size=16) as writer:
+			writer.extend(samples(20))
+		with DatasetWriter(self.path, self.format, mode="a", chunk_size=16) as writer:
+			writer.extend(samples(10, start=20))
+		self.assertEqual(read_metadata(self.path)["count"], 30)
+		dataset = Dataset(self.path)
+		(states, actions) = dataset.read([25])
+		self.assertTrue(np.array_equal(states[0], list(samples(10, start=20))[5][0]))
+		dataset.close()
+
+	def test_shape_mismatch(self):
+		writer = DatasetWriter(self.path, self.format, chunk_size=2)
+		writer.extend(samples(2))
+		writer.append(np.zeros((4, 5, 6), dtype=bool), np.zeros((5, 5), dtype=bool))
+		self.assertRaises(ValueError, writer.close)
+
+	def test_packed(self):
+		expected = list(samples(40))
+		with DatasetWriter(self.path, self.format, chunk_size=16, packed=True) as writer:
+			writer.extend(expected)
+		dataset = Dataset(self.path)
+		self.assertTrue(dataset.metadata["packed"])
+		(states, actions) = dataset.read([39, 2, 2])
+		self.assertEqual(states.dtype, np.float32)
+		self.assertEqual(states.shape, (3, 4, 5, 5))
+		self.assertTrue(np.array_equal(states[0], expected[39][0]))
+		self.assertTrue(np.array_equal(states[2], expected[2][0]))
+		(packed, actions) = dataset.read([39], unpack=False)
+		self.assertEqual(packed.shape, (1, 13))
+		self.assertEqual(dataset.read([], unpack=True)[0].shape, (0, 4, 5, 5))
+		dataset.close()
+		# a packed dataset is only continued packed
+		self.assertRaises(ValueError, DatasetWriter, self.path, self.format, "a")
+
+	def test_write_actions(self):
+		with DatasetWriter(self.path, self.format, chunk_size=16) as writer:
+			writer.extend(samples(40))
+		self.assertRaises(ValueError, Dataset, self.path, "w")
+		dataset = Dataset(self.path, "r+")
+		dataset.write_actions([33, 5], np.zeros((2, 5, 5), dtype=bool))
+		dataset.close()
+		dataset = Dataset(self.path)
+		(states, actions) = dataset.read([5, 6, 33])
+		self.assertEqual(list(actions.reshape(3, -1).sum(axis=1)), [0, 1, 0])
+		dataset.close()
+
+
+class TestPacking(unittest.TestCase):
+
+	def test_round_trip(self):
+		rng = np.random.RandomState(0)
+		for shape in [(48, 19, 19), (3, 5, 5)]:
+			states = rng.rand(6, *shape) > 0.5
+			packed = pack_states(states)
+			self.assertEqual(packed.dtype, np.uint8)
+			self.assertEqual(packed.shape, (6, (int(np.prod(shape)) + 7) // 8))
+			unpacked = unpack_states(packed, shape)
+			self.assertEqual(unpacked.dtype, np.float32)
+			self.assertTrue(np.array_equal(unpacked, states))
+
+	def test_unpack_into(self):
+		states = np.random.RandomState(1).rand(4, 48, 19, 19) > 0.5
+		out = np.ones((4, 48, 19, 19), dtype=np.float32)
+		self.assertTrue(unpack_states(pack_states(states), (48, 19, 19), out=out) is out)
+		self.assertTrue(np.array_equal(out, states))
+
+	def test_only_booleans(self):
+		self.assertRaises(ValueError, pack_states, np.zeros((2, 3)))
+
+
+class TestSampling(unittest.TestCase):
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		self.expected = list(samples(70))
+		# 40 samples in shards of 16, 16 and 8, then 30 more in another dataset
+		self.paths = [os.path.join(self.folder, "a"), os.path.join(self.folder, "b")]
+		for (path, chunk) in zip(self.paths, [self.expected[:40], self.expected[40:]]):
+			with DatasetWriter(path, "npy", chunk_size=16, packed=True) as writer:
+				writer.extend(chunk)
+		self.index = SampleIndex.build(self.paths, os.path.join(self.folder, "index.npy"))
+
+	def tearDown(self):
+		self.index.close()
+		shutil.rmtree(self.folder)
+
+	def test_index(self):
+		self.assertEqual(len(self.index), 70)
+		self.assertEqual(len(self.index.shards), 5)
+		self.assertEqual(self.index.records.itemsize, 12)
+		self.assertEqual(tuple(self.index.records[41]), (3, 1))
+		ids = [69, 0, 17, 16, 17, 41]
+		(states, actions) = self.index.read(ids)
+		for (k, i) in enumerate(ids):
+			self.assertTrue(np.array_equal(states[k], self.expected[i][0]))
+			self.assertTrue(np.array_equal(actions[k], self.expected[i][1]))
+		# reopened from disk
+		index = SampleIndex(os.path.join(self.folder, "index.npy"))
+		self.assertTrue(np.array_equal(index.read([33])[0][0], self.expected[33][0]))
+		index.close()
+
+	def test_ranges(self):
+		index = SampleIndex.build(self.paths, os.path.join(self.folder, "live.npy"), [[(10, 20)], [(0, 5), (25, 5)]])
+		self.assertEqual(len(index), 30)
+		(states, actions) = index.read([0, 19, 20, 29])
+		for (k, i) in enumerate([10, 29, 40, 69]):
+			self.assertTrue(np.array_equal(states[k], self.expected[i][0]))
+		index.close()
+		self.assertRaises(IndexError, SampleIndex.build, self.paths, os.path.join(self.folder, "bad.npy"), [[(30, 20)], []])
+
+	def test_large_offsets(self):
+		# a single-file dataset of more than 2**32 samples is one shard
+		self.assertEqual(list(_index_field(np.array([0, 2 ** 32 + 5]), "offset")), [0, 2 ** 32 + 5])
+		self.assertRaises(ValueError, _index_field, np.array([2 ** 32]), "shard")
+		self.assertRaises(ValueError, _index_field, np.array([-1]), "offset")
+
+	def test_permutation(self):
+		for n in [1, 2, 5, 64, 1000, 1025]:
+			for key in [0, 1]:
+				values = RandomPermutation(n, key)(np.arange(n))
+				self.assertEqual(sorted(values.tolist()), list(range(n)))
+		self.assertNotEqual(RandomPermutation(100, 0)(np.arange(100)).tolist(), RandomPermutation(100, 1)(np.arange(100)).tolist())
+		# no table: huge ranges cost nothing up front
+		values = RandomPermutation(5 * 10 ** 9, 3)(np.arange(1000))
+		self.assertEqual(len(set(values.tolist())), 1000)
+		self.assertTrue(values.max() < 5 * 10 ** 9)
+
+	def test_epochs_without_replacement(self):
+		sampler = MinibatchSampler(self.index, 16, seed=2)
+		# 5 batches of 16 cover the 70 samples once, then 10 of the next epoch
+		ids = np.concatenate([sampler.next_ids() for _ in range(5)])
+		self.assertEqual(sorted(ids[:70].tolist()), list(range(70)))
+		self.assertEqual(len(set(ids[70:].tolist())), 10)
+		self.assertEqual((sampler.epoch, sampler.position), (1, 10))
+		(states, actions) = sampler.next_batch()
+		self.assertEqual(states.shape, (16, 4, 5, 5))
+		self.assertEqual(states.dtype, np.float32)
+		# the same seed gives the same batches
+		again = MinibatchSampler(self.index, 16, seed=2)
+		self.assertEqual(again.next_ids().tolist(), ids[:16].tolist())
+
+	def test_with_replacement(self):
+		sampler = MinibatchSampler(self.index, 100, replacement=True)
+		ids = sampler.next_ids()
+		self.assertEqual(len(ids), 100)
+		self.assertTrue(ids.min() >= 0 and ids.max() < 70)
+
+
+class TestAugmentation(unittest.TestCase):
+
+	def setUp(self):
+		rng = np.random.RandomState(0)
+		self.states = (rng.rand(32, 3, 7, 7) < 0.3).astype(np.float32)
+		self.moves = rng.randint(49, size=32)
+		self.one_hot = np.zeros((32, 7, 7), dtype=bool)
+		self.one_hot.reshape(32, 49)[np.arange(32), self.moves] = True
+
+	def test_states_and_labels_move_together(self):
+		(states, one_hot, symmetries) = random_symmetries(self.states, self.one_hot, np.random.RandomState(1))
+		self.assertEqual(sorted(set(symmetries.tolist())), list(range(8)))
+		for i in range(32):
+			transform = SYMMETRY_TRANSFORMS[symmetries[i]]
+			for plane in range(3):
+				self.assertTrue(np.array_equal(states[i, plane], transform(self.states[i, plane])))
+			self.assertTrue(np.array_equal(one_hot[i], transform(self.one_hot[i])))
+		# the same draws applied to the other label encodings
+		(_, flat, _) = random_symmetries(self.states, self.one_hot.reshape(32, 49), np.random.RandomState(1))
+		(_, moves, _) = random_symmetries(self.states, self.moves, np.random.RandomState(1))
+		self.assertTrue(np.array_equal(flat, one_hot.reshape(32, 49)))
+		self.assertEqual(moves.tolist(), np.argmax(flat, axis=1).tolist())
+
+	def test_augmented_stream(self):
+		outcomes = np.arange(32)
+		batches = [(self.states, outcomes)] * 3
+		for (states, labels) in augmented(batches, np.random.RandomState(2), transform_actions=False):
+			self.assertEqual(states.shape, self.states.shape)
+			# outcomes do not move with the board
+			self.assertTrue(labels is outcomes)
+			# a symmetry keeps the stones of every plane
+			self.assertTrue(np.array_equal(states.sum(axis=(2, 3)), self.states.sum(axis=(2, 3))))
+
+	def test_move_distributions(self):
+		counts = np.zeros((3, 5, 5), dtype=np.uint32)
+		counts[0, 1, 1] = 1
+		counts[1, 2, 3] = 3
+		counts[1, 0, 4] = 1
+		distributions = move_distributions(counts)
+		self.assertEqual(distributions.dtype, np.float32)
+		self.assertTrue(np.allclose(distributions.sum(axis=(1, 2)), [1, 1, 0]))
+		self.assertEqual((distributions[1, 2, 3], distributions[1, 0, 4]), (0.75, 0.25))
+		self.assertTrue(np.array_equal(move_distributions(counts[:1].astype(bool)), counts[:1]))
+
+	def test_move_weights(self):
+		counts = np.zeros((3, 5, 5), dtype=np.uint32)
+		counts[0, 1, 1] = 1
+		counts[1, 2, 3] = 3
+		counts[1, 0, 4] = 1
+		weights = move_weights(counts)
+		self.assertEqual(weights.dtype, np.float32)
+		self.assertEqual(list(weights), [1, 4, 0])
+		self.assertEqual(list(move_weights(counts[:1].astype(bool))), [1])
+		# weighted distributions add up to the counts
+		self.assertTrue(np.allclose(move_distributions(counts) * weights.reshape(3, 1, 1), counts))
+
+class TestPositionIndex(unittest.TestCase):
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		self.path = os.path.join(self.folder, "positions.db")
+		self.state = GameState()
+		for move in [(3,3),(15,16),(16,3),(2,14)]:
+			self.state.do_move(move)
+
+	def tearDown(self):
+		shutil.rmtree(self.folder)
+
+	def test_repeats_are_counted(self):
+		index = PositionIndex(self.path)
+		symmetries = self.state.symmetries()
+		# the same move, seen from three orientations of the position
+		move = 10 * 19 + 4
+		for (sample, k) in enumerate([0, 5, 6]):
+			(key, symmetry) = canonical_hash(symmetries[k].board, BLACK)
+			self.assertEqual(index.add(key, symmetry, int(transform_moves(move, k)), sample), sample == 0)
+		(key, symmetry) = canonical_hash(self.state.board, BLACK)
+		index.add(key, symmetry, 0, 3)
+		# another position
+		self.assertTrue(index.add(canonical_hash(self.state.board, WHITE)[0], 0, 7, 3))
+		self.assertEqual(len(index), 2)
+		changed = list(index.changed_counts())
+		self.assertEqual([sample for (sample, counts) in changed], [0])
+		counts = changed[0][1]
+		self.assertEqual(counts.sum(), 4)
+		# in the orientation of sample 0
+		self.assertEqual(counts[move], 3)
+		self.assertEqual(counts[0], 1)
+		index.mark_written()
+		self.assertEqual(list(index.changed_counts()), [])
+		index.close()
+
+	def test_forgets_samples_not_on_disk(self):
+		index = PositionIndex(self.path)
+		self.assertTrue(index.add(1, 0, 0, 0))
+		self.assertTrue(index.add(2, 0, 0, 1))
+		index.close()
+		index = PositionIndex(self.path, count=1)
+		self.assertEqual(len(index), 1)
+		self.assertFalse(index.add(1, 0, 0, 5))
+		self.assertTrue(index.add(2, 0, 0, 1))
+		# hashes past 2 ** 63 fit as well
+		self.assertTrue(index.add(2 ** 64 - 1, 0, 0, 2))
+		self.assertFalse(index.add(2 ** 64 - 1, 0, 0, 3))
+		index.close()
+
+	def test_rolls_back_games_not_recorded(self):
+		index = PositionIndex(self.path)
+		index.start_game("a", 0)
+		self.assertTrue(index.add(1, 0, 5, 0))
+		self.assertTrue(index.add(2, 0, 6, 1))
+		index.start_game("b", 2)
+		self.assertFalse(index.add(1, 0, 5, 2))
+		self.assertTrue(index.add(3, 0, 7, 2))
+		index.commit()
+		index.start_game("c", 3)
+		self.assertTrue(index.add(4, 0, 7, 3))
+		# not committed
+		index.close(commit=False)
+		# only game a made it: b's repeat and new position are undone
+		index = PositionIndex(self.path, recorded=set([("a", 0), ("b", 5)]))
+		self.assertEqual(len(index), 2)
+		self.assertEqual(list(index.changed_counts()), [])
+		self.assertTrue(index.add(3, 0, 7, 2))
+		self.assertFalse(index.add(1, 0, 5, 3))
+		self.assertEqual([(sample, counts[5]) for (sample, counts) in index.changed_counts()], [(0, 2)])
+		index.close()
+		# the journal was cleared once the index was opened
+		index = PositionIndex(self.path, recorded=set())
+		self.assertEqual(len(index), 3)
+		index.close()
+
+@unittest.skipIf(h5py is None, "h5py is not installed")
+class TestHDF5Dataset(TestNpyDataset):
+
+	format = "hdf5"
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		self.path = os.path.join(self.folder, "samples.h5")
+
+if __name__ == '__main__':
+	unittest.main()
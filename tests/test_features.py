@@ -0,0 +1,122 @@
+from AlphaGo.go import GameState, BLACK, WHITE, EMPTY, PASS_MOVE
+from AlphaGo import features as F
+from AlphaGo.features import FeatureEncoder, feature_planes
+from AlphaGo.lookahead import MoveOutcomes
+from AlphaGo.ladders import LadderReader
+from AlphaGo import chains
+import numpy as np
+import unittest
+
+def reference_features(st, moves):
+	"""the 48 planes of st built from scratch, given the moves played so far (None for passes)
+	"""
+	planes = np.zeros((48, st.size, st.size), dtype=bool)
+	board = st.board
+	planes[0] = board == st.current_player
+	planes[1] = board == -st.current_player
+	planes[2] = board == EMPTY
+	planes[F.ONES] = True
+	ages = planes[F.TURNS_SINCE]
+	ages[0] = True
+	for (turn, move) in enumerate(moves):
+		if move is not None:
+			ages[:, move[0], move[1]] = False
+			ages[min(len(moves) - turn, 7), move[0], move[1]] = True
+	planes[F.LIBERTIES] = chains.one_hot_liberties(st.liberty_counts)
+	outcomes = MoveOutcomes(st)
+	planes[F.CAPTURE_SIZE] = outcomes.capture_size_planes()
+	planes[F.SELF_ATARI_SIZE] = outcomes.self_atari_planes()
+	planes[F.LIBERTIES_AFTER] = outcomes.liberty_planes()
+	planes[F.LADDER_CAPTURE] = LadderReader().ladder_captures(st)
+	planes[F.LADDER_ESCAPE] = LadderReader().ladder_escapes(st)
+	planes[F.SENSIBLENESS] = st.sensible_moves_mask()
+	return planes
+
+class TestFeatureEncoder(unittest.TestCase):
+
+	def assertPlanesEqual(self, actual, expected, message=""):
+		for k in range(48):
+			self.assertTrue(np.array_equal(actual[k], expected[k]), "plane %d %s" % (k, message))
+
+	def test_random_game_matches_reference(self):
+		rng = np.random.RandomState(0)
+		st = GameState(size=9, enforce_superko=False)
+		encoder = FeatureEncoder(st)
+		moves = []
+		self.assertPlanesEqual(encoder.features, reference_features(st, moves))
+		for turn in range(120):
+			legal = np.argwhere(st.sensible_moves_mask())
+			move = tuple(legal[rng.randint(len(legal))]) if len(legal) and rng.rand() > 0.05 else PASS_MOVE
+			st.do_move(move)
+			moves.append(move)
+			encoder.update()
+			self.assertPlanesEqual(encoder.features, reference_features(st, moves), "turn %d" % turn)
+
+	def test_read_only_view(self):
+		st = GameState()
+		encoder = FeatureEncoder(st)
+		view = encoder.features
+		self.assertEqual(view.shape, (48, 19, 19))
+		with self.assertRaises(ValueError):
+			view[0, 0, 0] = True
+		st.do_move((3, 3))
+		encoder.update()
+		# the same view follows the game
+		self.assertTrue(view[1, 3, 3])
+
+	def test_undo_rebuilds(self):
+		st = GameState()
+		encoder = FeatureEncoder(st)
+		for move in [(3, 3), (15, 15), (3, 15)]:
+			st.do_move(move)
+			encoder.update()
+		st.undo()
+		encoder.update()
+		expected = reference_features(st, [])
+		# ages of the remaining stones are not known after an undo
+		expected[F.TURNS_SINCE] = False
+		expected[F.TURNS_SINCE.start] = st.board == EMPTY
+		expected[F.TURNS_SINCE.stop - 1] = st.board != EMPTY
+		self.assertPlanesEqual(encoder.features, expected)
+
+class TestFeatureSets(unittest.TestCase):
+
+	def replay(self, feature_set, turns=80):
+		"""(encoder, reference planes) after each move of a random 9x9 game
+		"""
+		rng = np.random.RandomState(1)
+		st = GameState(size=9, enforce_superko=False)
+		encoder = FeatureEncoder(st, feature_set=feature_set)
+		moves = []
+		for turn in range(turns):
+			legal = np.argwhere(st.sensible_moves_mask())
+			move = tuple(legal[rng.randint(len(legal))]) if len(legal) and rng.rand() > 0.05 else PASS_MOVE
+			st.do_move(move)
+			moves.append(move)
+			encoder.update()
+			yield (encoder, reference_features(st, moves), st)
+
+	def test_shallow(self):
+		for (encoder, expected, st) in self.replay('shallow'):
+			self.assertEqual(encoder.features.shape, (20, 9, 9))
+			self.assertTrue(np.array_equal(encoder.features, expected[:20]))
+		# nothing looked ahead or read
+		self.assertIsNone(encoder.outcomes)
+		self.assertIsNone(encoder.ladders)
+
+	def test_value_adds_color(self):
+		for (encoder, expected, st) in self.replay('value', 30):
+			self.assertEqual(encoder.features.shape, (49, 9, 9))
+			self.assertTrue(np.array_equal(encoder.features[:48], expected))
+			self.assertEqual(encoder.features[F.COLOR].all(), st.current_player == BLACK)
+			self.assertEqual(encoder.features[F.COLOR].any(), st.current_player == BLACK)
+
+	def test_listed_groups(self):
+		self.assertEqual(feature_planes(['sensibleness', 'board']), [46, 0, 1, 2])
+		self.assertEqual(feature_planes('deep'), list(range(48)))
+		for (encoder, expected, st) in self.replay(['sensibleness', 'board'], 20):
+			self.assertTrue(np.array_equal(encoder.features, expected[[46, 0, 1, 2]]))
+		self.assertIsNone(encoder.outcomes)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,332 @@
+from AlphaGo.go import GameState
+from AlphaGo.dataset import SampleIndex
+import numpy as np
+import os
+import shutil
+import sys
+import tarfile
+import tempfile
+import unittest
+import zipfile
+
+# the converter is run with data/utils on the path, and needs python 2 (as sgflib)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'utils'))
+try:
+	import game_converter
+except (ImportError, SyntaxError):
+	game_converter = None
+
+SGF_LETTERS = "abcdefghijklmnopqrs"
+
+def random_game(seed, moves=12):
+	"""SGF text of a game of random legal moves, won by black for even seeds
+	"""
+	rng = np.random.RandomState(seed)
+	st = GameState(enforce_superko=False)
+	nodes = []
+	for k in range(moves):
+		legal = np.argwhere(st.legal_moves_mask())
+		(x, y) = legal[rng.randint(len(legal))]
+		nodes.append(";%s[%s%s]" % ("BW"[k % 2], SGF_LETTERS[x], SGF_LETTERS[y]))
+		st.do_move((x, y))
+	return "(;GM[1]FF[4]SZ[19]KM[6.5]RE[%s+R]\n%s)\n" % ("BW"[seed % 2], "".join(nodes))
+
+def write_games(folder, games):
+	"""write {file name: SGF text} into folder
+	"""
+	if not os.path.exists(folder):
+		os.makedirs(folder)
+	for (name, data) in games.items():
+		with open(os.path.join(folder, name), 'w') as f:
+			f.write(data)
+
+def sample_bytes(samples):
+	return [np.asarray(state).tobytes() + np.asarray(action).tobytes() for (state, action) in samples]
+
+def indexed_samples(outfolder):
+	"""the samples of the index of a converted folder, in a canonical order
+	"""
+	index = SampleIndex(os.path.join(outfolder, "index.npy"))
+	(states, actions) = index.read(np.arange(len(index)))
+	index.close()
+	return sorted(sample_bytes(zip(states, actions)))
+
+if game_converter is not None:
+	class InterruptedConverter(game_converter.game_converter):
+		"""a converter stopped by ^C while converting game number interrupt_at
+		"""
+
+		def __init__(self, target_format, interrupt_at):
+			game_converter.game_converter.__init__(self, target_format)
+			self.interrupt_at = interrupt_at
+			self.calls = 0
+
+		def convert_sgf(self, data, keyed=False):
+			self.calls += 1
+			if self.calls > self.interrupt_at:
+				raise KeyboardInterrupt()
+			return game_converter.game_converter.convert_sgf(self, data, keyed)
+
+@unittest.skipIf(game_converter is None, "the game converter needs python 2")
+class TestConvertSgf(unittest.TestCase):
+
+	def test_move_labels(self):
+		samples = game_converter.game_converter("shallow").convert_sgf("(;SZ[19];B[pd];W[dp])")
+		self.assertEqual(len(samples), 2)
+		self.assertEqual(samples[0][1].shape, (19, 19))
+		self.assertTrue(samples[0][1][15][3] and samples[1][1][3][15])
+		self.assertEqual(samples[0][1].sum() + samples[1][1].sum(), 2)
+
+	def test_value_labels_are_outcomes(self):
+		converter = game_converter.game_converter("value")
+		for (result, first) in [("B+R", 1), ("W+0.5", -1)]:
+			samples = converter.convert_sgf("(;SZ[19]RE[%s];B[pd];W[dp];B[];W[dd])" % result)
+			self.assertEqual([list(action) for (state, action) in samples], [[first], [-first], [-first]])
+			# the color plane: black to move, white, then white again after black's pass
+			self.assertEqual([state[48].all() for (state, action) in samples], [True, False, False])
+		for result in ["", "RE[0]", "RE[Void]"]:
+			self.assertRaises(ValueError, converter.convert_sgf, "(;SZ[19]%s;B[pd])" % result)
+
+	def test_handicap_stones(self):
+		samples = game_converter.game_converter("shallow").convert_sgf("(;SZ[19]HA[2]AB[dd][pp]AW[jj];W[dp];B[pd])")
+		self.assertEqual(len(samples), 2)
+		self.assertTrue(samples[0][1][3][15] and samples[1][1][15][3])
+		# the stones are on the board of the first sample, where white is to move:
+		# the board planes are the stones of the player to move, then the opponent's
+		(state, action) = samples[0]
+		self.assertEqual((state[0].sum(), state[0][9][9]), (1, 1))
+		self.assertEqual((state[1].sum(), state[1][3][3], state[1][15][15]), (2, 1, 1))
+		# setup stones with black to move, as given by PL or the first move
+		for data in ["(;SZ[19]AB[dd]AW[pp]PL[B];B[pd];W[dp])", "(;SZ[19]AB[dd]AW[pp];B[pd];W[dp])"]:
+			samples = game_converter.game_converter("shallow").convert_sgf(data)
+			self.assertTrue(samples[0][1][15][3] and samples[1][1][3][15])
+			self.assertEqual((samples[0][0][0][3][3], samples[0][0][1][15][15]), (1, 1))
+		self.assertRaises(ValueError, game_converter.game_converter("shallow").convert_sgf, "(;SZ[19]AB[dd]PL[W];B[pd])")
+
+@unittest.skipIf(game_converter is None, "the game converter needs python 2")
+class TestSgfGames(unittest.TestCase):
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		self.games = [random_game(k, 4) for k in range(8)]
+		members = os.path.join(self.folder, "members")
+		write_games(members, {"x.sgf": self.games[3], "notes.txt": "not a game", "y.sgf": self.games[4]})
+		write_games(os.path.join(members, "dir"), {"z.sgf": self.games[5]})
+		self.corpus = os.path.join(self.folder, "corpus")
+		write_games(self.corpus, {"a.sgf": self.games[0], "empty.sgf": "no game here\n",
+			"coll.sgf": "header text\n" + self.games[1] + "\n" + self.games[2] + "(;C[a comment with \\] and )];B[aa])"})
+		write_games(os.path.join(self.corpus, "sub"), {"b.sgf": self.games[6]})
+		for (name, mode) in [("games.tar", "w"), ("games.tar.gz", "w:gz")]:
+			archive = tarfile.open(os.path.join(self.corpus, name), mode)
+			for member in ["x.sgf", "notes.txt", "y.sgf", "dir/z.sgf"]:
+				archive.add(os.path.join(members, member), member)
+			archive.close()
+		archive = zipfile.ZipFile(os.path.join(self.corpus, "games.zip"), "w")
+		for member in ["y.sgf", "dir/z.sgf", "notes.txt"]:
+			archive.write(os.path.join(members, member), member)
+		archive.close()
+
+	def tearDown(self):
+		shutil.rmtree(self.folder)
+
+	def test_folders_archives_and_collections(self):
+		# the text of each game tree, without what is around it
+		games = [game.strip() for game in self.games]
+		members = [("x.sgf", games[3]), ("y.sgf", games[4]), ("dir/z.sgf", games[5])]
+		expected = [("a.sgf", games[0]), ("coll.sgf#0", games[1]), ("coll.sgf#1", games[2]),
+			("coll.sgf#2", "(;C[a comment with \\] and )];B[aa])"), ("empty.sgf", "")]
+		expected += [("games.tar/" + name, data) for (name, data) in members]
+		expected += [("games.tar.gz/" + name, data) for (name, data) in members]
+		expected += [("games.zip/" + name, data) for (name, data) in members[1:]]
+		expected += [("sub/b.sgf", games[6])]
+		games = list(game_converter.sgf_games(self.corpus))
+		self.assertEqual([name for (name, data) in games], [name for (name, data) in expected])
+		self.assertEqual(games, expected)
+		# an archive or collection by itself
+		self.assertEqual(list(game_converter.sgf_games(os.path.join(self.corpus, "games.tar.gz"))),
+			[(name, data) for (name, data) in members])
+		self.assertEqual([name for (name, data) in game_converter.sgf_games(os.path.join(self.corpus, "coll.sgf"))],
+			["coll.sgf#0", "coll.sgf#1", "coll.sgf#2"])
+
+	def test_file_details(self):
+		files = dict((name, (size, mtime)) for (name, size, mtime, open_file) in game_converter.sgf_files(self.corpus))
+		self.assertEqual(files["games.zip/dir/z.sgf"][0], len(self.games[5]))
+		self.assertEqual(files["games.tar/y.sgf"][0], len(self.games[4]))
+		self.assertEqual(files["a.sgf"], (len(self.games[0]), os.stat(os.path.join(self.corpus, "a.sgf")).st_mtime))
+		# the number of games in a file is given with its last game
+		manifest = game_converter.conversion_manifest(os.path.join(self.folder, "manifest.jsonl"))
+		details = {}
+		for game in game_converter.sgf_games(self.corpus, manifest, details):
+			pass
+		manifest.close()
+		self.assertEqual([details[name][3] for name in ["coll.sgf#0", "coll.sgf#1", "coll.sgf#2", "a.sgf", "empty.sgf"]],
+			[None, None, 3, 1, 1])
+
+	def test_games_are_converted(self):
+		converter = game_converter.game_converter("shallow")
+		results = list(converter.convert_games(game_converter.sgf_games(self.corpus)))
+		self.assertEqual([error is None for (name, samples, error) in results].count(False), 1)
+		self.assertEqual(converter.games_converted, 13)
+
+@unittest.skipIf(game_converter is None, "the game converter needs python 2")
+class TestBatchConvert(unittest.TestCase):
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		self.games = dict(("game%02d.sgf" % k, random_game(k, 6 + k % 5)) for k in range(8))
+		write_games(self.folder, self.games)
+
+	def tearDown(self):
+		shutil.rmtree(self.folder)
+
+	def test_workers_match_sequential(self):
+		converter = game_converter.game_converter("shallow")
+		sequential = sample_bytes(converter.batch_convert(self.folder))
+		self.assertEqual(len(sequential), sum(6 + k % 5 for k in range(8)))
+		ordered = sample_bytes(converter.batch_convert(self.folder, workers=3, ordered=True))
+		self.assertEqual(ordered, sequential)
+		unordered = sample_bytes(converter.batch_convert(self.folder, workers=3, max_pending=2))
+		self.assertEqual(sorted(unordered), sorted(sequential))
+		self.assertEqual(converter.samples_converted, len(sequential))
+
+	def test_max_pending(self):
+		pulled = []
+		def games():
+			for name in sorted(self.games):
+				pulled.append(name)
+				yield (name, self.games[name])
+		converter = game_converter.game_converter("shallow")
+		converted = converter.convert_games(games(), workers=2, max_pending=3)
+		next(converted)
+		# no game is read ahead of what the consumer holds and max_pending allow
+		self.assertTrue(len(pulled) <= 3)
+		self.assertEqual(len(list(converted)) + 1, len(self.games))
+		self.assertEqual(len(pulled), len(self.games))
+
+	def test_errors_are_passed_on(self):
+		games = [("a", self.games["game00.sgf"]), ("bad", "(;SZ[9];B[aa])"), ("none", "no game"),
+			("b", self.games["game01.sgf"])]
+		for workers in [1, 3]:
+			converter = game_converter.game_converter("shallow")
+			results = list(converter.convert_games(iter(games), workers=workers, ordered=True))
+			self.assertEqual([name for (name, samples, error) in results], ["a", "bad", "none", "b"])
+			self.assertEqual([error is None for (name, samples, error) in results], [True, False, False, True])
+			self.assertEqual([len(samples) for (name, samples, error) in results], [6, 0, 0, 7])
+			self.assertTrue("board size" in results[1][2])
+			self.assertEqual((converter.games_converted, converter.games_failed), (2, 2))
+
+@unittest.skipIf(game_converter is None, "the game converter needs python 2")
+class TestConvertCorpus(unittest.TestCase):
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		self.games = os.path.join(self.folder, "games")
+		write_games(self.games, dict(("game%02d.sgf" % k, random_game(k, 5 + k % 4)) for k in range(8)))
+		self.total = sum(5 + k % 4 for k in range(8))
+
+	def tearDown(self):
+		shutil.rmtree(self.folder)
+
+	def convert(self, outfolder, converter=None, **kwargs):
+		converter = converter or game_converter.game_converter("shallow")
+		kwargs.setdefault("chunk_size", 4)
+		count = game_converter.convert_corpus(converter, self.games, os.path.join(self.folder, outfolder),
+			"npy", **kwargs)
+		return (count, converter.games_converted)
+
+	def test_rerun_skips_recorded_games(self):
+		self.assertEqual(self.convert("out"), (self.total, 8))
+		self.assertEqual(self.convert("out"), (self.total, 0))
+		# a changed game is converted again, and its old samples are left out
+		with open(os.path.join(self.games, "game03.sgf"), "a") as f:
+			f.write("\n")
+		with open(os.path.join(self.games, "game05.sgf"), "w") as f:
+			f.write(random_game(100, 3))
+		self.assertEqual(self.convert("out"), (self.total - 5 - 1 + 3, 1))
+		self.assertEqual(self.convert("out"), (self.total - 5 - 1 + 3, 0))
+
+	def test_manifest_line_cut_short(self):
+		self.assertEqual(self.convert("out"), (self.total, 8))
+		path = os.path.join(self.folder, "out", "manifest.jsonl")
+		with open(path) as f:
+			data = f.read()
+		with open(path, "w") as f:
+			f.write(data[:-10])
+		# the game of the cut line is converted again, and recorded on a line of its own
+		self.assertEqual(self.convert("out"), (self.total, 1))
+		self.assertEqual(self.convert("out"), (self.total, 0))
+		with open(path) as f:
+			lines = f.read().splitlines()
+		self.assertEqual(len(lines), 9)
+		self.assertEqual(lines[-2], data.splitlines()[-1][:-9])
+
+	def test_games_added_to_a_file(self):
+		self.assertEqual(self.convert("out"), (self.total, 8))
+		# game01.sgf becomes game01.sgf#0 and #1, and is not indexed under its old name
+		with open(os.path.join(self.games, "game01.sgf"), "a") as f:
+			f.write(random_game(100, 4))
+		self.assertEqual(self.convert("out"), (self.total + 4, 2))
+		self.assertEqual(self.convert("out"), (self.total + 4, 0))
+		# and back
+		write_games(self.games, {"game01.sgf": random_game(1, 6)})
+		self.assertEqual(self.convert("out"), (self.total, 1))
+		self.assertEqual(self.convert("out"), (self.total, 0))
+
+	def test_games_dropped_from_a_file(self):
+		games = [random_game(100 + k, 3 + k) for k in range(3)]
+		write_games(self.games, {"game01.sgf": "".join(games)})
+		total = self.total - 6 + 3 + 4 + 5
+		self.assertEqual(self.convert("out"), (total, 10))
+		# the games left keep their names and samples; the dropped one leaves the index
+		write_games(self.games, {"game01.sgf": "".join(games[:2])})
+		self.assertEqual(self.convert("out"), (total - 5, 0))
+		self.assertEqual(self.convert("out"), (total - 5, 0))
+		# and the file need not be read again
+		stat = os.stat(os.path.join(self.games, "game01.sgf"))
+		manifest = game_converter.conversion_manifest(os.path.join(self.folder, "out", "manifest.jsonl"))
+		manifest.close()
+		self.assertTrue(manifest.file_up_to_date("game01.sgf", stat.st_size, stat.st_mtime))
+
+	def test_interrupted_run_resumes(self):
+		self.convert("fresh")
+		for interrupt_at in [0, 3, 7]:
+			outfolder = "out%d" % interrupt_at
+			self.assertRaises(KeyboardInterrupt, self.convert, outfolder,
+				InterruptedConverter("shallow", interrupt_at))
+			# the games not recorded, some of whose samples are on disk, are redone
+			(count, converted) = self.convert(outfolder)
+			self.assertEqual(count, self.total)
+			self.assertTrue(converted >= 8 - interrupt_at)
+			self.assertEqual(indexed_samples(os.path.join(self.folder, outfolder)),
+				indexed_samples(os.path.join(self.folder, "fresh")))
+			self.assertEqual(self.convert(outfolder), (self.total, 0))
+
+	def test_interrupted_deduplicated_run_resumes(self):
+		# every game twice, so that positions repeat across games
+		write_games(self.games, dict(("game%02d.sgf" % (k + 8), random_game(k, 5 + k % 4)) for k in range(8)))
+		(count, converted) = self.convert("fresh", dedup=True)
+		self.assertEqual(converted, 16)
+		self.assertTrue(count < 2 * self.total)
+		for interrupt_at in [0, 5, 11, 15]:
+			outfolder = "out%d" % interrupt_at
+			self.assertRaises(KeyboardInterrupt, self.convert, outfolder,
+				InterruptedConverter("shallow", interrupt_at), dedup=True)
+			self.assertEqual(self.convert(outfolder, dedup=True)[0], count)
+			# the same positions, with the same move counts
+			self.assertEqual(indexed_samples(os.path.join(self.folder, outfolder)),
+				indexed_samples(os.path.join(self.folder, "fresh")))
+			self.assertEqual(self.convert(outfolder, dedup=True), (count, 0))
+
+	def test_new_features_version_converts_again(self):
+		self.convert("out")
+		version = game_converter.FEATURES_VERSION
+		game_converter.FEATURES_VERSION = version + 1
+		try:
+			self.assertEqual(self.convert("out"), (self.total, 8))
+			self.assertEqual(self.convert("out"), (self.total, 0))
+		finally:
+			game_converter.FEATURES_VERSION = version
+		self.assertEqual(self.convert("out"), (self.total, 8))
+
+if __name__ == '__main__':
+	unittest.main()
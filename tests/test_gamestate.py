@@ -1,11 +1,15 @@
-from AlphaGo.go import GameState
+from AlphaGo.go import GameState, zobrist_keys, WHITE, BLACK, EMPTY, PASS_MOVE, PATTERN_NEIGHBORS
+from AlphaGo.go import SYMMETRY_TRANSFORMS, symmetry_tables, transform_flat, transform_planes, transform_moves
+from AlphaGo.go import canonical_hash, ZOBRIST_WHITE_TO_MOVE
 import numpy as np
 import unittest
 
 class TestSymmetries(unittest.TestCase):
 
+	backend = "numpy"
+
 	def setUp(self):
-		self.s = GameState()
+		self.s = GameState(backend=self.backend)
 		self.s.do_move((4,5))
 		self.s.do_move((5,5))
 		self.s.do_move((5,6))
@@ -25,7 +29,7 @@ class TestSymmetries(unittest.TestCase):
 
 	def test_sym_boards(self):
 		# construct by hand the 8 boards we expect to see
-		expectations = [GameState() for i in range(8)]
+		expectations = [GameState(backend=self.backend) for i in range(8)]
 
 		descriptions = ["noop", "rot90", "rot180", "rot270", "mirror LR", "mirror UD", "mirror \\", "mirror /"]
 
@@ -70,4 +74,445 @@ class TestSymmetries(unittest.TestCase):
 		expectations[7].do_move((12,13))
 
 		for i in range(8):
-			self.assertTrue(np.array_equal(expectations[i].board, self.syms[i].board), descriptions[i])
\ No newline at end of file
+			self.assertTrue(np.array_equal(expectations[i].board, self.syms[i].board), descriptions[i])
+
+class TestSymmetryTables(unittest.TestCase):
+
+	def setUp(self):
+		rng = np.random.RandomState(0)
+		self.planes = rng.randint(0, 5, size=(4, 3, 19, 19))
+
+	def test_tables_match_transforms(self):
+		for (k, transform) in enumerate(SYMMETRY_TRANSFORMS):
+			board = self.planes[0][0]
+			self.assertTrue(np.array_equal(transform_planes(board, k), transform(board)))
+
+	def test_batch(self):
+		for k in range(8):
+			batch = transform_planes(self.planes, k)
+			self.assertEqual(batch.shape, self.planes.shape)
+			for (sample, expected) in zip(batch, self.planes):
+				for (plane, original) in zip(sample, expected):
+					self.assertTrue(np.array_equal(plane, SYMMETRY_TRANSFORMS[k](original)))
+
+	def test_one_symmetry_per_sample(self):
+		ks = np.array([1, 4, 7, 0])
+		batch = transform_planes(self.planes, ks)
+		for (k, sample, original) in zip(ks, batch, self.planes):
+			self.assertTrue(np.array_equal(sample, transform_planes(original, k)))
+
+	def test_inverse(self):
+		for k in range(8):
+			transformed = transform_planes(self.planes, k)
+			self.assertTrue(np.array_equal(transform_planes(transformed, k, inverse=True), self.planes))
+		(forward, inverse) = symmetry_tables(19)
+		self.assertFalse(forward.flags.writeable)
+
+	def test_moves_follow_boards(self):
+		moves = np.arange(361)
+		for k in range(8):
+			board = np.zeros(361)
+			board[37] = 1
+			transformed = transform_flat(board, k)
+			self.assertEqual(transform_moves(37, k), np.argmax(transformed))
+			self.assertTrue(np.array_equal(transform_moves(transform_moves(moves, k), k, inverse=True), moves))
+
+	def test_policy_maps_back(self):
+		# a policy computed on a transformed board maps back onto the original points
+		rng = np.random.RandomState(1)
+		probs = rng.rand(5, 361)
+		for k in range(8):
+			on_transformed = transform_flat(probs, k)
+			self.assertTrue(np.array_equal(transform_flat(on_transformed, k, inverse=True), probs))
+			self.assertTrue(np.array_equal(on_transformed[:, transform_moves(37, k)], probs[:, 37]))
+
+	def test_ko_moves_with_board(self):
+		st = GameState()
+		for move in [(0,1),(0,2),(1,0),(1,3),(2,1),(2,2),(10,10),(1,1),(1,2)]:
+			st.do_move(move)
+		for (k, other) in enumerate(st.symmetries()):
+			marker = np.zeros((19, 19), dtype=bool)
+			marker[st.ko] = True
+			self.assertTrue(SYMMETRY_TRANSFORMS[k](marker)[other.ko])
+
+class TestCanonicalHash(unittest.TestCase):
+
+	def setUp(self):
+		self.s = GameState()
+		for move in [(3,3),(15,16),(16,3),(2,14),(9,10)]:
+			self.s.do_move(move)
+
+	def test_symmetries_hash_alike(self):
+		(key, k) = canonical_hash(self.s.board, self.s.current_player)
+		for other in self.s.symmetries():
+			self.assertEqual(canonical_hash(other.board, other.current_player)[0], key)
+		# the hash is the Zobrist hash of the board in the canonical orientation
+		self.assertEqual(key ^ ZOBRIST_WHITE_TO_MOVE, self.s.symmetries()[k].hash)
+		canonical = transform_planes(np.array(self.s.board), k)
+		self.assertEqual(canonical_hash(canonical, self.s.current_player), (key, 0))
+
+	def test_player_to_move(self):
+		(key, k) = canonical_hash(self.s.board, BLACK)
+		self.assertNotEqual(canonical_hash(self.s.board, WHITE)[0], key)
+
+	def test_different_positions(self):
+		other = self.s.copy()
+		other.do_move((10,10))
+		other.do_move(PASS_MOVE)
+		self.assertNotEqual(canonical_hash(other.board, other.current_player)[0], canonical_hash(self.s.board, self.s.current_player)[0])
+
+	def test_moves_map_to_canonical_orientation(self):
+		# the same move from two orientations of the position lands on one point
+		(key, k) = canonical_hash(self.s.board, self.s.current_player)
+		move = 4 * 19 + 4
+		for (j, other) in enumerate(self.s.symmetries()):
+			(other_key, other_k) = canonical_hash(other.board, other.current_player)
+			self.assertEqual(transform_moves(transform_moves(move, j), other_k), transform_moves(move, k))
+
+	def test_empty_board(self):
+		self.assertEqual(canonical_hash(np.zeros((19, 19)), BLACK), (0, 0))
+
+class TestPass(unittest.TestCase):
+
+	backend = "numpy"
+
+	def test_pass(self):
+		st = GameState(backend=self.backend)
+		self.assertTrue(st.is_legal(PASS_MOVE))
+		st.do_move((3,3))
+		st.do_move(PASS_MOVE)
+		self.assertEqual(st.current_player, BLACK)
+		self.assertEqual(st.turns_played, 2)
+		self.assertFalse(st.is_end_of_game)
+		# a stone in between starts the count again
+		st.do_move((4,4))
+		st.do_move(PASS_MOVE)
+		self.assertFalse(st.is_end_of_game)
+		st.do_move(PASS_MOVE)
+		self.assertTrue(st.is_end_of_game)
+		self.assertTrue(st.copy().is_end_of_game)
+		st.undo()
+		self.assertFalse(st.is_end_of_game)
+		self.assertEqual(st.passes, 1)
+
+	def test_pass_clears_ko(self):
+		st = GameState(backend=self.backend)
+		for move in [(0,1),(0,2),(1,0),(1,3),(2,1),(2,2),(10,10),(1,1),(1,2)]:
+			st.do_move(move)
+		self.assertEqual(st.ko, (1,1))
+		st.do_move(PASS_MOVE)
+		self.assertEqual(st.ko, None)
+		st.undo()
+		self.assertEqual(st.ko, (1,1))
+
+	def test_score(self):
+		st = GameState(5, backend=self.backend)
+		# black wall on column 1, white wall on column 3; column 2 touches both
+		for y in range(5):
+			st.do_move((1, y))
+			st.do_move((3, y))
+		self.assertEqual(st.score(), 0)
+		st.do_move((2, 0))
+		# black: 6 stones + 5 points of column 0; white: 5 stones + 5 points of column 4
+		self.assertEqual(st.score(), 1)
+		self.assertEqual(st.score(komi=1.5), -0.5)
+		self.assertEqual(st.get_winner(), BLACK)
+		self.assertEqual(st.get_winner(komi=1.5), WHITE)
+		self.assertEqual(st.get_winner(komi=1), EMPTY)
+
+
+class TestLegality(unittest.TestCase):
+
+	backend = "numpy"
+
+	def setUp(self):
+		# . B W .
+		# B W . W
+		# . B W .
+		self.s = GameState(backend=self.backend)
+		for move in [(0,1), (0,2), (1,0), (1,3), (2,1), (2,2), (10,10), (1,1)]:
+			self.s.do_move(move)
+
+	def test_occupied_and_off_board(self):
+		self.assertFalse(self.s.is_legal((0,1)))
+		self.assertFalse(self.s.is_legal((-1,0)))
+		self.assertFalse(self.s.is_legal((0,19)))
+
+	def test_suicide(self):
+		st = GameState(backend=self.backend)
+		st.do_move((0,1))
+		st.do_move((10,10))
+		st.do_move((1,0))
+		# white in the corner would have no liberties
+		self.assertTrue(st.is_suicide((0,0)))
+		self.assertFalse(st.is_legal((0,0)))
+
+	def test_capture_is_not_suicide(self):
+		# black at (1,2) has no empty neighbor but captures white (1,1)
+		self.assertFalse(self.s.is_suicide((1,2)))
+		self.assertTrue(self.s.is_legal((1,2)))
+
+	def test_simple_ko(self):
+		self.s.do_move((1,2))
+		self.assertEqual(self.s.board[1][1], 0)
+		self.assertEqual(self.s.ko, (1,1))
+		self.assertFalse(self.s.is_legal((1,1)))
+		# the ko is lifted once another move is played
+		self.s.do_move((15,15))
+		self.assertEqual(self.s.ko, None)
+		self.s.do_move((15,16))
+		self.assertTrue(self.s.is_legal((1,1)))
+
+	def test_positional_superko(self):
+		self.s.do_move((1,2))
+		# without the simple ko bookkeeping, superko still catches the repetition
+		self.s.ko = None
+		self.assertTrue(self.s.is_positional_superko((1,1)))
+		self.assertFalse(self.s.is_legal((1,1)))
+		self.s.enforce_superko = False
+		self.assertTrue(self.s.is_legal((1,1)))
+
+
+class TestZobristHash(unittest.TestCase):
+
+	backend = "numpy"
+
+	def test_empty_board(self):
+		self.assertEqual(GameState(backend=self.backend).hash, 0)
+
+	def test_move_order_independent(self):
+		a = GameState(backend=self.backend)
+		b = GameState(backend=self.backend)
+		for move in [(3,3), (15,15), (3,15), (15,3)]:
+			a.do_move(move)
+		for move in [(3,15), (15,3), (3,3), (15,15)]:
+			b.do_move(move)
+		self.assertEqual(a.hash, b.hash)
+		self.assertNotEqual(a.hash, GameState(backend=self.backend).hash)
+
+	def test_capture_restores_hash(self):
+		st = GameState(backend=self.backend)
+		st.do_move((0,1))
+		st.do_move((0,0))
+		before_capture = st.hash
+		st.do_move((1,0))
+		# same stones as playing black (0,1), (1,0) on an empty board
+		other = GameState(backend=self.backend)
+		other.do_move((0,1))
+		other.do_move((10,10))
+		other.do_move((1,0))
+		self.assertNotEqual(st.hash, before_capture)
+		self.assertEqual(st.hash, other.hash ^ zobrist_keys(19)[WHITE][10][10])
+		self.assertTrue(st.hash in st.previous_hashes)
+
+	def test_copy_keeps_hash(self):
+		st = GameState(backend=self.backend)
+		st.do_move((3,3))
+		other = st.copy()
+		self.assertEqual(st.hash, other.hash)
+		other.do_move((4,4))
+		self.assertNotEqual(st.hash, other.hash)
+		self.assertFalse(other.hash in st.previous_hashes)
+
+
+class TestSymmetriesBitboard(TestSymmetries):
+	backend = "bitboard"
+
+
+class TestLegalityBitboard(TestLegality):
+	backend = "bitboard"
+
+
+class TestZobristHashBitboard(TestZobristHash):
+	backend = "bitboard"
+
+
+class TestUndo(unittest.TestCase):
+
+	backend = "numpy"
+
+	def snapshot(self, st):
+		return (st.board.copy(), st.liberty_counts.copy(), st.hash, st.ko, st.current_player,
+			st.turns_played, set(st.previous_hashes))
+
+	def assertSameSnapshot(self, a, b):
+		self.assertTrue(np.array_equal(a[0], b[0]))
+		self.assertTrue(np.array_equal(a[1], b[1]))
+		self.assertEqual(a[2:], b[2:])
+
+	def test_undo_random_game(self):
+		rng = np.random.RandomState(2)
+		st = GameState(backend=self.backend)
+		snapshots = []
+		for turn in range(250):
+			legal = [(x, y) for x in range(19) for y in range(19) if st.is_legal((x, y))]
+			snapshots.append(self.snapshot(st))
+			st.do_move(legal[rng.randint(len(legal))])
+		# take everything back, checking each intermediate position
+		while snapshots:
+			st.undo()
+			self.assertSameSnapshot(self.snapshot(st), snapshots.pop())
+		self.assertRaises(IndexError, st.undo)
+
+	def test_undo_capture_and_ko(self):
+		st = GameState(backend=self.backend)
+		for move in [(0,1), (0,2), (1,0), (1,3), (2,1), (2,2), (10,10), (1,1)]:
+			st.do_move(move)
+		before = self.snapshot(st)
+		st.do_move((1,2))
+		self.assertEqual(st.ko, (1,1))
+		st.undo()
+		self.assertSameSnapshot(self.snapshot(st), before)
+		self.assertEqual(st.board[1][1], -1)
+		# the move can be replayed after taking it back
+		st.do_move((1,2))
+		self.assertEqual(st.ko, (1,1))
+
+	def test_lookahead_in_place(self):
+		st = GameState(backend=self.backend)
+		for move in [(3,3), (3,4), (4,4), (4,3), (2,3), (5,3)]:
+			st.do_move(move)
+		before = self.snapshot(st)
+		for x in range(19):
+			for y in range(19):
+				if st.is_legal((x, y)):
+					st.do_move((x, y))
+					st.undo()
+		self.assertSameSnapshot(self.snapshot(st), before)
+
+	def test_undo_does_not_touch_copies(self):
+		st = GameState(backend=self.backend)
+		st.do_move((3,3))
+		other = st.copy()
+		self.assertRaises(IndexError, other.undo)
+		st.undo()
+		self.assertTrue(other.hash in other.previous_hashes)
+		self.assertEqual(other.board[3][3], 1)
+
+
+class TestPassBitboard(TestPass):
+	backend = "bitboard"
+
+
+class TestUndoBitboard(TestUndo):
+	backend = "bitboard"
+
+
+class TestMoveMasks(unittest.TestCase):
+
+	backend = "numpy"
+
+	def test_legal_mask_matches_is_legal(self):
+		rng = np.random.RandomState(3)
+		st = GameState(backend=self.backend)
+		for turn in range(200):
+			mask = st.legal_moves_mask()
+			expected = np.array([[st.is_legal((x, y)) for y in range(19)] for x in range(19)])
+			self.assertTrue(np.array_equal(mask, expected), "turn %d" % turn)
+			legal = np.argwhere(mask)
+			st.do_move(tuple(legal[rng.randint(len(legal))]))
+
+	def test_legal_mask_with_captures(self):
+		# long games on a small board: captures, suicides, ko and superko
+		rng = np.random.RandomState(4)
+		for enforce_superko in [True, False]:
+			st = GameState(size=7, enforce_superko=enforce_superko, backend=self.backend)
+			for turn in range(300):
+				mask = st.legal_moves_mask()
+				expected = np.array([[st.is_legal((x, y)) for y in range(7)] for x in range(7)])
+				self.assertTrue(np.array_equal(mask, expected), "turn %d" % turn)
+				legal = np.argwhere(mask)
+				st.do_move(tuple(legal[rng.randint(len(legal))]) if len(legal) else PASS_MOVE)
+
+	def test_ko_and_superko(self):
+		st = GameState(backend=self.backend)
+		for move in [(0,1), (0,2), (1,0), (1,3), (2,1), (2,2), (10,10), (1,1), (1,2)]:
+			st.do_move(move)
+		self.assertFalse(st.legal_moves_mask()[1][1])
+		st.ko = None
+		self.assertFalse(st.legal_moves_mask()[1][1])
+		st.enforce_superko = False
+		self.assertTrue(st.legal_moves_mask()[1][1])
+
+	def test_sensible_excludes_own_eyes(self):
+		# B B .        black eye in the corner at (0,0),
+		# B . B        true eye at (1,1)
+		# . B B
+		st = GameState(backend=self.backend)
+		for move in [(0,1), (15,15), (1,0), (15,13), (1,2), (13,15), (2,1), (13,13), (0,2), (10,10),
+				(2,2), (10,12)]:
+			st.do_move(move)
+		# black to play
+		sensible = st.sensible_moves_mask()
+		legal = st.legal_moves_mask()
+		self.assertTrue(legal[1][1])
+		self.assertFalse(sensible[1][1])
+		self.assertTrue(legal[0][0])
+		self.assertFalse(sensible[0][0])
+		# white may not fill black's eye at all
+		st.do_move((18,18))
+		self.assertFalse(st.legal_moves_mask()[1][1])
+
+	def test_false_eye_on_edge(self):
+		# black eye-shape at (0,0) with a white stone on its diagonal (1,1)
+		st = GameState(backend=self.backend)
+		for move in [(0,1), (1,1), (1,0), (10,10)]:
+			st.do_move(move)
+		self.assertTrue(st.sensible_moves_mask()[0][0])
+
+	def test_sensible_is_subset_of_legal(self):
+		st = GameState(backend=self.backend)
+		for move in [(3,3), (3,4), (4,4), (4,3), (2,3), (5,3)]:
+			st.do_move(move)
+		self.assertFalse(np.any(st.sensible_moves_mask() & ~st.legal_moves_mask()))
+
+
+class TestMoveMasksBitboard(TestMoveMasks):
+	backend = "bitboard"
+
+
+class TestPatternCodes(unittest.TestCase):
+
+	backend = "numpy"
+
+	def expected_code(self, st, x, y):
+		code = 0
+		for (k, (dx, dy)) in enumerate(PATTERN_NEIGHBORS):
+			(nx, ny) = (x + dx, y + dy)
+			if 0 <= nx < st.size and 0 <= ny < st.size:
+				code += int(st.board[nx][ny] % 3) * 4 ** k
+			else:
+				code += 3 * 4 ** k
+		return code
+
+	def assertCodesMatch(self, st):
+		expected = [[self.expected_code(st, x, y) for y in range(st.size)] for x in range(st.size)]
+		self.assertTrue(np.array_equal(st.pattern_codes, expected))
+
+	def test_empty_board(self):
+		st = GameState(size=9, backend=self.backend)
+		self.assertCodesMatch(st)
+		# a corner sees five off-board neighbors
+		self.assertEqual(st.pattern_code((0,0)), self.expected_code(st, 0, 0))
+		self.assertEqual(st.pattern_code((4,4)), 0)
+
+	def test_random_game_and_undo(self):
+		rng = np.random.RandomState(5)
+		st = GameState(size=9, backend=self.backend)
+		codes = []
+		for turn in range(150):
+			legal = np.argwhere(st.legal_moves_mask())
+			if len(legal) == 0:
+				break
+			codes.append(np.array(st.pattern_codes))
+			st.do_move(tuple(legal[rng.randint(len(legal))]))
+			self.assertCodesMatch(st)
+		copy = st.copy()
+		self.assertTrue(np.array_equal(copy.pattern_codes, st.pattern_codes))
+		for before in reversed(codes[-20:]):
+			st.undo()
+			self.assertTrue(np.array_equal(st.pattern_codes, before))
+
+
+class TestPatternCodesBitboard(TestPatternCodes):
+	backend = "bitboard"
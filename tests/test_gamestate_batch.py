@@ -0,0 +1,73 @@
+from AlphaGo.go import GameState, GameStateBatch, IllegalMove, BLACK, WHITE
+import numpy as np
+import unittest
+
+class TestGameStateBatch(unittest.TestCase):
+
+	def test_capture_and_ko(self):
+		batch = GameStateBatch(2)
+		# the same ko on board 0, board 1 passes along
+		for move in [(0,1),(0,2),(1,0),(1,3),(2,1),(2,2),(10,10),(1,1)]:
+			batch.step([move[0] * 19 + move[1], GameStateBatch.PASS])
+		captures = batch.step([1 * 19 + 2, GameStateBatch.PASS])
+		self.assertEqual(list(captures), [1, 0])
+		self.assertEqual(batch.boards[0][1][1], 0)
+		self.assertEqual(list(batch.ko), [1 * 19 + 1, -1])
+		self.assertFalse(batch.legal_moves_mask()[0][1][1])
+		self.assertFalse(np.any(batch.boards[1]))
+		self.assertEqual(list(batch.turns_played), [9, 9])
+		self.assertEqual(list(batch.current_player), [WHITE, WHITE])
+
+	def test_illegal_move_changes_nothing(self):
+		batch = GameStateBatch(2)
+		batch.step([0, 1])
+		before = batch.copy()
+		with self.assertRaises(IllegalMove):
+			batch.step([2, 1])
+		# off the board
+		for action in [19 * 19, -2]:
+			with self.assertRaises(IllegalMove):
+				batch.step([2, action])
+		self.assertTrue(np.array_equal(batch.boards, before.boards))
+		self.assertTrue(np.array_equal(batch.current_player, before.current_player))
+
+	def test_suicide_is_illegal(self):
+		batch = GameStateBatch(1, size=5)
+		for move in [(0,1), (4,4), (1,0)]:
+			batch.step([move[0] * 5 + move[1]])
+		self.assertFalse(batch.legal_moves_mask()[0][0][0])
+
+	def test_random_games_match_gamestate(self):
+		rng = np.random.RandomState(0)
+		n = 8
+		batch = GameStateBatch(n, size=9)
+		states = [GameState(9, enforce_superko=False) for i in range(n)]
+		for turn in range(60):
+			masks = batch.legal_moves_mask()
+			for (mask, st) in zip(masks, states):
+				self.assertTrue(np.array_equal(mask, st.legal_moves_mask()))
+			if not np.all(masks.reshape(n, -1).any(axis=1)):
+				break
+			actions = [rng.choice(np.flatnonzero(mask)) for mask in masks]
+			batch.step(actions)
+			for (i, st) in enumerate(states):
+				st.do_move(divmod(actions[i], 9))
+				self.assertTrue(np.array_equal(batch.boards[i], st.board))
+				self.assertEqual(batch.current_player[i], st.current_player)
+				ko = None if batch.ko[i] < 0 else divmod(batch.ko[i], 9)
+				self.assertEqual(ko, st.ko)
+		self.assertTrue(np.array_equal(batch.liberty_counts()[0], states[0].liberty_counts))
+
+	def test_passes_end_games(self):
+		batch = GameStateBatch(3, size=5)
+		batch.step([0, GameStateBatch.PASS, GameStateBatch.PASS])
+		batch.step([GameStateBatch.PASS, 1, GameStateBatch.PASS])
+		self.assertEqual(list(batch.is_end_of_game), [False, False, True])
+		batch.step([GameStateBatch.PASS, GameStateBatch.PASS, GameStateBatch.PASS])
+		self.assertEqual(list(batch.is_end_of_game), [True, False, True])
+		# a lone stone owns the whole board
+		self.assertEqual(list(batch.scores()), [25, -25, 0])
+		self.assertEqual(list(batch.scores(komi=0.5)), [24.5, -25.5, -0.5])
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,71 @@
+from AlphaGo.go import GameState
+from AlphaGo.ladders import LadderReader
+import numpy as np
+import unittest
+
+def ladder_position(breaker=(18,0)):
+	"""white (9,9) with two liberties, (10,9) and (9,10), next to black (8,9), (9,8) and
+	(10,10); black to move. Atari at (10,9) starts a ladder running toward the top
+	right, atari at (9,10) one running toward the bottom left, which white's other
+	stone breaks.
+	"""
+	st = GameState()
+	for move in [(8,9), (9,9), (9,8), breaker, (10,10), (18,2)]:
+		st.do_move(move)
+	return st
+
+class TestLadders(unittest.TestCase):
+
+	def test_capture(self):
+		reader = LadderReader()
+		captures = reader.ladder_captures(ladder_position())
+		self.assertEqual(list(zip(*np.nonzero(captures))), [(10, 9)])
+
+	def test_breaker(self):
+		reader = LadderReader()
+		# a white stone on the path of the ladder lets white escape
+		self.assertFalse(reader.ladder_captures(ladder_position((4,14))).any())
+		# one away from the path does not
+		self.assertTrue(reader.ladder_captures(ladder_position((14,4)))[10][9])
+
+	def test_escape(self):
+		for (breaker, escapes) in [((18,0), False), ((4,14), True)]:
+			st = ladder_position(breaker)
+			st.do_move((10,9))
+			self.assertEqual(LadderReader().ladder_escapes(st)[9][10], escapes)
+
+	def test_state_is_restored(self):
+		st = ladder_position()
+		board = np.array(st.board)
+		(hash, player) = (st.hash, st.current_player)
+		LadderReader().ladder_captures(st)
+		self.assertTrue(np.array_equal(st.board, board))
+		self.assertEqual((st.hash, st.current_player), (hash, player))
+
+	def test_cache(self):
+		reader = LadderReader()
+		st = ladder_position()
+		reader.ladder_captures(st)
+		(reads, nodes, hits) = (reader.reads, reader.nodes, reader.cache_hits)
+		self.assertTrue(reads > 0 and reader.seconds > 0)
+		self.assertTrue(reader.ladder_captures(st)[10][9])
+		# the second time only the atari starting each read is played
+		self.assertEqual(reader.reads - reads, reads)
+		self.assertEqual(reader.nodes - nodes, reads)
+		self.assertEqual(reader.cache_hits - hits, reads)
+
+	def test_bounded_cache(self):
+		reader = LadderReader(cache_size=10)
+		reader.ladder_captures(ladder_position())
+		self.assertEqual(len(reader._cache), 10)
+
+	def test_node_budget(self):
+		reader = LadderReader(max_nodes=10)
+		self.assertFalse(reader.ladder_captures(ladder_position()).any())
+		self.assertTrue(reader.cutoffs > 0)
+		reader = LadderReader(max_depth=4)
+		self.assertFalse(reader.ladder_captures(ladder_position()).any())
+		self.assertTrue(reader.cutoffs > 0)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -4,8 +4,10 @@ import unittest
 
 class TestLiberties(unittest.TestCase):
 
+	backend = "numpy"
+
 	def setUp(self):
-		self.s = GameState()
+		self.s = GameState(backend=self.backend)
 		self.s.do_move((4,5))
 		self.s.do_move((5,5))
 		self.s.do_move((5,6))
@@ -42,7 +44,7 @@ class TestLiberties(unittest.TestCase):
 
 	def test_neighbors_edge_cases(self):
 
-		st = GameState()
+		st = GameState(backend=self.backend)
 		st.do_move((0,0)) #  B B . . . . . 
 		st.do_move((5,5)) #  B W . . . . . 
 		st.do_move((0,1)) #  . . . . . . . 
@@ -57,4 +59,143 @@ class TestLiberties(unittest.TestCase):
 		self.assertEqual(len(st.visit_neighbor((4,4))), 0, "group size of empty space")
 
 		# visit_neighbor of a single piece
-		self.assertEqual(len(st.visit_neighbor((5,5))), 1, "group size of single piece")
\ No newline at end of file
+		self.assertEqual(len(st.visit_neighbor((5,5))), 1, "group size of single piece")
+
+def flood_fill_liberties(board):
+	"""Reference liberty counts computed from scratch by searching every chain
+	"""
+	size = len(board)
+	counts = -np.ones((size, size), dtype=int)
+	for x in range(size):
+		for y in range(size):
+			if board[x][y] == 0 or counts[x][y] != -1:
+				continue
+			group = set([(x, y)])
+			libs = set()
+			frontier = [(x, y)]
+			while frontier:
+				(gx, gy) = frontier.pop()
+				for (nx, ny) in [(gx+1, gy), (gx-1, gy), (gx, gy+1), (gx, gy-1)]:
+					if nx < 0 or ny < 0 or nx >= size or ny >= size:
+						continue
+					if board[nx][ny] == 0:
+						libs.add((nx, ny))
+					elif board[nx][ny] == board[x][y] and (nx, ny) not in group:
+						group.add((nx, ny))
+						frontier.append((nx, ny))
+			for (gx, gy) in group:
+				counts[gx][gy] = len(libs)
+	return counts
+
+
+class TestChains(unittest.TestCase):
+
+	backend = "numpy"
+
+	def test_merge(self):
+		st = GameState(backend=self.backend)
+		st.do_move((3,3)) # B
+		st.do_move((10,10)) # W
+		st.do_move((3,5)) # B
+		st.do_move((10,11)) # W
+		self.assertEqual(st.liberty_counts[3][3], 4)
+		self.assertEqual(st.liberty_counts[3][5], 4)
+		st.do_move((3,4)) # B connects the two stones
+		self.assertEqual(st.visit_neighbor((3,3)), set([(3,3), (3,4), (3,5)]))
+		for y in [3, 4, 5]:
+			self.assertEqual(st.liberty_counts[3][y], 8)
+
+	def test_capture(self):
+		st = GameState(backend=self.backend)
+		st.do_move((0,1)) # B
+		st.do_move((0,0)) # W in the corner
+		self.assertEqual(st.liberty_counts[0][0], 1)
+		st.do_move((1,0)) # B captures
+		self.assertEqual(st.board[0][0], 0)
+		self.assertEqual(st.liberty_counts[0][0], -1)
+		self.assertEqual(len(st.visit_neighbor((0,0))), 0)
+		# the capturing stones regain the liberty
+		self.assertEqual(st.liberty_counts[0][1], 3)
+		self.assertEqual(st.liberty_counts[1][0], 3)
+
+	def test_copy_is_independent(self):
+		st = GameState(backend=self.backend)
+		st.do_move((3,3))
+		st.do_move((3,4))
+		other = st.copy()
+		other.do_move((4,3))
+		other.do_move((2,3))
+		self.assertEqual(st.liberty_counts[3][3], 3)
+		self.assertEqual(other.liberty_counts[3][3], 4)
+		self.assertEqual(len(st.visit_neighbor((3,3))), 1)
+		self.assertEqual(len(other.visit_neighbor((3,3))), 2)
+
+	def test_random_game_matches_search(self):
+		rng = np.random.RandomState(0)
+		st = GameState(backend=self.backend)
+		for turn in range(200):
+			# avoid suicides: only play points that have an empty neighbor
+			board = st.board
+			candidates = [(x, y) for x in range(st.size) for y in range(st.size)
+				if board[x][y] == 0 and st.liberty_count((x, y)) > 0]
+			st.do_move(candidates[rng.randint(len(candidates))])
+			self.assertTrue(np.array_equal(st.liberty_counts, flood_fill_liberties(st.board)))
+
+
+class TestCompactState(unittest.TestCase):
+
+	def test_copy_is_a_buffer_copy(self):
+		st = GameState()
+		st.do_move((3,3))
+		st.do_move((10,10))
+		st.do_move((3,4))
+		other = st.copy()
+		self.assertIsNot(st._data, other._data)
+		self.assertEqual(st._data, other._data)
+		# the position history is shared until one side plays
+		self.assertIs(st.previous_hashes, other.previous_hashes)
+		other.do_move((3,5))
+		self.assertIsNot(st.previous_hashes, other.previous_hashes)
+		self.assertFalse(other.hash in st.previous_hashes)
+		st.do_move((4,4))
+		self.assertFalse(st.hash in other.previous_hashes)
+
+	def test_slots(self):
+		self.assertFalse(hasattr(GameState(), '__dict__'))
+		self.assertFalse(hasattr(GameState(backend="bitboard"), '__dict__'))
+
+	def test_board_is_read_only(self):
+		st = GameState()
+		st.do_move((3,3))
+		with self.assertRaises(ValueError):
+			st.board[4][4] = 1
+		# the view follows the state
+		board = st.board
+		st.do_move((4,4))
+		self.assertEqual(board[4][4], -1)
+
+
+class TestBackendsAgree(unittest.TestCase):
+
+	def test_random_game(self):
+		rng = np.random.RandomState(1)
+		a = GameState()
+		b = GameState(backend="bitboard")
+		for turn in range(150):
+			legal = [(x, y) for x in range(a.size) for y in range(a.size) if a.is_legal((x, y))]
+			self.assertEqual(legal, [(x, y) for x in range(b.size) for y in range(b.size) if b.is_legal((x, y))])
+			move = legal[rng.randint(len(legal))]
+			a.do_move(move)
+			b.do_move(move)
+			self.assertEqual(a.hash, b.hash)
+			self.assertEqual(a.ko, b.ko)
+		self.assertTrue(np.array_equal(a.board, b.board))
+		self.assertTrue(np.array_equal(a.liberty_counts, b.liberty_counts))
+
+
+class TestLibertiesBitboard(TestLiberties):
+	backend = "bitboard"
+
+
+class TestChainsBitboard(TestChains):
+	backend = "bitboard"
@@ -0,0 +1,86 @@
+from AlphaGo.go import GameState, BLACK, WHITE
+from AlphaGo.lookahead import MoveOutcomes
+import numpy as np
+import unittest
+
+def simulate(state):
+	"""reference tables for the player to move: play every legal point and take it back
+
+	Return:
+	(captures, chain sizes, liberties) as (size, size) int arrays, 0 where illegal
+	"""
+	shape = (state.size, state.size)
+	(captures, sizes, liberties) = (np.zeros(shape, dtype=int), np.zeros(shape, dtype=int), np.zeros(shape, dtype=int))
+	before = np.count_nonzero(state.board == -state.current_player)
+	for (x, y) in zip(*np.nonzero(state.legal_moves_mask())):
+		state.do_move((x, y))
+		captures[x][y] = before - np.count_nonzero(state.board == state.current_player)
+		sizes[x][y] = len(state.visit_neighbor((x, y)))
+		liberties[x][y] = state.liberty_counts[x][y]
+		state.undo()
+	return (captures, sizes, liberties)
+
+class TestMoveOutcomes(unittest.TestCase):
+
+	def check(self, state, outcomes):
+		(captures, sizes, liberties) = simulate(state)
+		planes = outcomes.capture_size_planes()
+		self.assertTrue(np.array_equal(planes.any(axis=0), liberties > 0))
+		self.assertTrue(np.array_equal(np.argmax(planes, axis=0), np.minimum(captures, 7)))
+		planes = outcomes.liberty_planes()
+		self.assertTrue(np.array_equal(planes.any(axis=0), liberties > 0))
+		self.assertTrue(np.array_equal(np.argmax(planes, axis=0)[liberties > 0], np.minimum(liberties, 8)[liberties > 0] - 1))
+		planes = outcomes.self_atari_planes()
+		self.assertTrue(np.array_equal(planes.any(axis=0), liberties == 1))
+		self.assertTrue(np.array_equal(np.argmax(planes, axis=0)[liberties == 1], np.minimum(sizes, 8)[liberties == 1] - 1))
+
+	def test_capture_and_ko(self):
+		st = GameState(enforce_superko=False)
+		outcomes = MoveOutcomes(st)
+		for move in [(0,1),(0,2),(1,0),(1,3),(2,1),(2,2),(10,10),(1,1)]:
+			st.do_move(move)
+		# black captures the white stone at (1,1) by playing (1,2)
+		self.assertEqual(outcomes.capture_size_planes()[1][1][2], 1)
+		self.check(st, outcomes)
+		st.do_move((1,2))
+		# white may not retake the ko
+		self.assertFalse(outcomes.capture_size_planes()[:, 1, 1].any())
+		self.check(st, outcomes)
+
+	def test_self_atari(self):
+		st = GameState(enforce_superko=False)
+		outcomes = MoveOutcomes(st)
+		for move in [(1,0),(2,0),(10,10),(0,1),(10,12),(2,1),(10,14),(1,2)]:
+			st.do_move(move)
+		# black at (1,1) joins (1,0) into a chain of 2 with one liberty left at (0,0)
+		self.assertTrue(outcomes.self_atari_planes()[1][1][1])
+		self.assertTrue(outcomes.liberty_planes()[0][1][1])
+
+	def test_random_games_match_simulation(self):
+		rng = np.random.RandomState(0)
+		for game in range(2):
+			st = GameState(9, enforce_superko=False)
+			outcomes = MoveOutcomes(st)
+			for turn in range(120):
+				legal = np.transpose(np.nonzero(st.legal_moves_mask()))
+				if len(legal) == 0:
+					break
+				st.do_move(tuple(legal[rng.randint(len(legal))]))
+				self.check(st, outcomes)
+
+	def test_incremental_matches_recompute(self):
+		rng = np.random.RandomState(1)
+		st = GameState(enforce_superko=False)
+		outcomes = MoveOutcomes(st)
+		for turn in range(150):
+			legal = np.transpose(np.nonzero(st.legal_moves_mask()))
+			st.do_move(tuple(legal[rng.randint(len(legal))]))
+			self.assertTrue(outcomes.update() < 361)
+		fresh = MoveOutcomes(st)
+		for color in [BLACK, WHITE]:
+			self.assertTrue(np.array_equal(outcomes.captures[color], fresh.captures[color]))
+			self.assertTrue(np.array_equal(outcomes.chain_sizes[color], fresh.chain_sizes[color]))
+			self.assertTrue(np.array_equal(outcomes.liberties[color], fresh.liberties[color]))
+
+if __name__ == '__main__':
+	unittest.main()
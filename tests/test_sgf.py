@@ -0,0 +1,91 @@
+from AlphaGo.go import GameState, BLACK, WHITE, EMPTY, PASS_MOVE
+from AlphaGo.sgf import mainline, mainline_games, parse_point, parse_points, winner
+import unittest
+
+class TestPoints(unittest.TestCase):
+
+	def test_points(self):
+		self.assertEqual(parse_point('pd'), (15, 3))
+		self.assertEqual(parse_point('aa'), (0, 0))
+		self.assertEqual(parse_point(''), PASS_MOVE)
+		self.assertEqual(parse_point('tt'), PASS_MOVE)
+		# tt is a point on bigger boards
+		self.assertEqual(parse_point('tt', 21), (19, 19))
+		for bad in ['a', 'ta', 'a1', 'abc']:
+			self.assertRaises(ValueError, parse_point, bad)
+
+	def test_rectangles(self):
+		self.assertEqual(sorted(parse_points(['ab:bc', 'dd'])), [(0, 1), (0, 2), (1, 1), (1, 2), (3, 3)])
+
+class TestMainline(unittest.TestCase):
+
+	def test_moves_and_header(self):
+		(header, moves) = mainline("(;GM[1]FF[4]SZ[19]KM[6.5]HA[0]RE[W+R]PB[a]\n;B[pd];W[dp]\n;B[];W[tt];B[qq])")
+		self.assertEqual(header, {'SZ': 19, 'KM': 6.5, 'HA': 0, 'AB': [], 'AW': [], 'PL': None, 'RE': 'W+R'})
+		self.assertEqual(moves, [(BLACK, (15, 3)), (WHITE, (3, 15)), (BLACK, PASS_MOVE), (WHITE, PASS_MOVE), (BLACK, (16, 16))])
+
+	def test_setup_stones(self):
+		(header, moves) = mainline("(;SZ[9]HA[2]AB[cc][gg]AW[aa:ab];W[ee])")
+		self.assertEqual(header['SZ'], 9)
+		self.assertEqual(header['HA'], 2)
+		self.assertEqual(header['AB'], [(2, 2), (6, 6)])
+		self.assertEqual(header['AW'], [(0, 0), (0, 1)])
+		self.assertEqual(moves, [(WHITE, (4, 4))])
+		self.assertRaises(ValueError, mainline, "(;B[aa];AB[bb])")
+
+	def test_only_the_main_line(self):
+		data = "(;SZ[19];B[aa](;W[bb](;B[cc])(;B[dd]))(;W[ee];B[ff]))"
+		(header, moves) = mainline(data)
+		self.assertEqual(moves, [(BLACK, (0, 0)), (WHITE, (1, 1)), (BLACK, (2, 2))])
+
+	def test_property_values_are_skipped(self):
+		# brackets and parentheses inside values, escaped or not
+		data = "(;C[a comment (;B[aa\\]) with \\] inside]GN[x];B[bb]C[)(];W[cc])"
+		self.assertEqual(mainline(data)[1], [(BLACK, (1, 1)), (WHITE, (2, 2))])
+
+	def test_old_property_names(self):
+		(header, moves) = mainline("(;SiZe[13]AddBlack[dd];White[ee]\n;Black[ff])")
+		self.assertEqual(header['SZ'], 13)
+		self.assertEqual(header['AB'], [(3, 3)])
+		self.assertEqual(moves, [(WHITE, (4, 4)), (BLACK, (5, 5))])
+
+	def test_winner(self):
+		self.assertEqual([winner(r) for r in ['B+R', 'W+3.5', 'b+T', 'B+']], [BLACK, WHITE, BLACK, BLACK])
+		self.assertEqual([winner(r) for r in ['0', 'Draw', 'Void', '?', '', None]], [None] * 6)
+
+	def test_malformed_numbers(self):
+		(header, moves) = mainline("(;KM[none]HA[?];B[aa])")
+		self.assertEqual((header['KM'], header['HA']), (None, 0))
+
+	def test_player_to_move(self):
+		self.assertEqual(mainline("(;AB[aa]PL[W];W[bb])")[0]['PL'], WHITE)
+		self.assertEqual(mainline("(;AB[aa]PL[b];B[bb];PL[B];W[cc])")[0]['PL'], BLACK)
+		self.assertEqual(mainline("(;PL[x];B[bb])")[0]['PL'], None)
+
+	def test_handicap_game(self):
+		(header, moves) = mainline("(;SZ[9]HA[2]AB[cc][gg]AW[ee];W[cg];B[gc])")
+		for backend in ["numpy", "bitboard"]:
+			state = GameState(size=header['SZ'], backend=backend)
+			state.place_stones(header['AB'], BLACK)
+			state.place_stones(header['AW'], WHITE)
+			self.assertEqual((state.board[2][2], state.board[6][6], state.board[4][4]), (BLACK, BLACK, WHITE))
+			self.assertEqual((state.current_player, state.turns_played), (BLACK, 0))
+			self.assertRaises(IndexError, state.undo)
+			# white moves first in a handicap game
+			state.current_player = WHITE
+			for (color, move) in moves:
+				self.assertEqual(color, state.current_player)
+				state.do_move(move)
+			self.assertEqual((state.board[2][6], state.board[6][2]), (WHITE, BLACK))
+			state.undo()
+			self.assertEqual((state.board[6][2], state.board[2][2]), (EMPTY, BLACK))
+
+	def test_collection(self):
+		data = "junk (;B[aa];W[bb])\n\n(;SZ[9]RE[B+2.5];B[cc])(;B[dd]"
+		games = list(mainline_games(data))
+		self.assertEqual([moves for (header, moves) in games], [[(BLACK, (0, 0)), (WHITE, (1, 1))], [(BLACK, (2, 2))], [(BLACK, (3, 3))]])
+		self.assertEqual(games[1][0]['RE'], 'B+2.5')
+		self.assertRaises(ValueError, mainline, "no game here")
+
+if __name__ == '__main__':
+	unittest.main()
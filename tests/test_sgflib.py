@@ -0,0 +1,81 @@
+import os
+import sys
+import unittest
+
+# sgflib is imported with data/utils on the path, and needs python 2
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'utils'))
+try:
+	from StringIO import StringIO
+	from sgflib.sgflib import SGFParser, SGFStreamParser, FileCollection, EndOfDataParseError
+except (ImportError, SyntaxError):
+	SGFParser = None
+
+# text outside games, brackets and escapes inside values, variations
+COLLECTION = r"""junk (;GM[1]C[a (comment) with \] and \\];B[aa](;W[bb])(;W[cc]))
+(;SZ[9]C[(;];B[dd])
+
+ (;W[ee];B[ff])
+"""
+TRUNCATED = "(;SZ[19];B[pd](;W[dp])(;W[dd]"
+CHUNK_SIZES = [1, 2, 3, 7, 65536]
+
+@unittest.skipIf(SGFParser is None, "sgflib needs python 2")
+class TestStreamParser(unittest.TestCase):
+
+	def test_games_match_the_parser(self):
+		expected = [str(game) for game in SGFParser(COLLECTION[5:]).parse()]
+		self.assertEqual(len(expected), 3)
+		for chunksize in CHUNK_SIZES:
+			parser = SGFStreamParser(StringIO(COLLECTION), chunksize)
+			self.assertEqual([str(game) for game in parser], expected)
+			self.assertEqual([COLLECTION[offset:offset + length] for (offset, length) in parser.offsets],
+				list(SGFStreamParser(StringIO(COLLECTION), chunksize).gameData()))
+
+	def test_random_access(self):
+		expected = [str(game) for game in SGFParser(COLLECTION[5:]).parse()]
+		for chunksize in CHUNK_SIZES:
+			parser = SGFStreamParser(StringIO(COLLECTION), chunksize)
+			# later games are scanned for, earlier ones read from their offsets
+			self.assertEqual(str(parser.game(1)), expected[1])
+			self.assertEqual(str(parser.game(0)), expected[0])
+			self.assertRaises(IndexError, parser.game, 3)
+			self.assertEqual(parser.count(), 3)
+			self.assertEqual(str(parser.game(2)), expected[2])
+
+	def test_truncated_final_game(self):
+		data = COLLECTION + TRUNCATED
+		# the parser of the whole collection stops at the unterminated game
+		self.assertRaises(EndOfDataParseError, SGFParser(data[5:]).parse)
+		expected = [str(game) for game in SGFParser(COLLECTION[5:]).parse()]
+		for chunksize in CHUNK_SIZES:
+			# its data is passed on as it is, and fails to parse as that of the parser
+			self.assertEqual(list(SGFStreamParser(StringIO(data), chunksize).gameData())[-1], TRUNCATED)
+			games = iter(SGFStreamParser(StringIO(data), chunksize))
+			self.assertEqual([str(next(games)) for game in expected], expected)
+			self.assertRaises(EndOfDataParseError, next, games)
+			self.assertEqual(SGFStreamParser(StringIO(data), chunksize).count(), 4)
+
+	def test_no_games(self):
+		for data in ["", "no game here", "junk ) ["]:
+			self.assertEqual(list(SGFStreamParser(StringIO(data), 2)), [])
+
+@unittest.skipIf(SGFParser is None, "sgflib needs python 2")
+class TestFileCollection(unittest.TestCase):
+
+	def test_collection(self):
+		collection = SGFParser(COLLECTION[5:]).parse()
+		for chunksize in CHUNK_SIZES:
+			games = FileCollection(StringIO(COLLECTION), chunksize)
+			self.assertEqual(len(games), 3)
+			self.assertEqual([str(games[k]) for k in [2, 0, -1, -3]], [str(collection[k]) for k in [2, 0, -1, -3]])
+			self.assertRaises(IndexError, games.__getitem__, 3)
+			self.assertRaises(IndexError, games.__getitem__, -4)
+			# iterating starts from the beginning of the file again, even when the
+			# collection's length is taken meanwhile (as by list)
+			self.assertEqual([str(game) for game in games], [str(game) for game in collection])
+			self.assertEqual([str(game) for game in list(games)], [str(game) for game in collection])
+			self.assertEqual(str(games), str(collection))
+			self.assertEqual(str(games.cursor(1).node), str(collection.cursor(1).node))
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,78 @@
+from AlphaGo.go import GameState, BLACK, WHITE, PASS_MOVE
+from AlphaGo.models.shallow_policy import rollout_policy, default_weights, own_eye_codes, swap_colors
+import numpy as np
+import os
+import tempfile
+import unittest
+
+class TestRolloutPolicy(unittest.TestCase):
+
+	def test_eye_codes(self):
+		# all neighbors black: an eye of black, not of white
+		black = sum(1 * 4 ** k for k in range(8))
+		self.assertTrue(own_eye_codes()[black])
+		self.assertFalse(own_eye_codes()[swap_colors(black)])
+		self.assertEqual(swap_colors(swap_colors(np.arange(4 ** 8))).tolist(), list(range(4 ** 8)))
+
+	def test_incremental_scores_match_recompute(self):
+		rng = np.random.RandomState(0)
+		policy = rollout_policy()
+		st = GameState(size=9, enforce_superko=False)
+		scores = policy.move_scores(st)
+		for turn in range(120):
+			move = scores.choose(rng)
+			st.do_move(move)
+			scores.update()
+			incremental = dict((color, scores.scores[color].copy()) for color in [BLACK, WHITE])
+			scores.recompute()
+			for color in [BLACK, WHITE]:
+				self.assertTrue(np.allclose(incremental[color], scores.scores[color]), "turn %d" % turn)
+
+	def test_prefers_captures(self):
+		weights = default_weights()
+		weights['capture'] = 20.0
+		policy = rollout_policy(weights)
+		st = GameState()
+		# white (0,1) in atari at (0,2)
+		for move in [(0,0), (0,1), (1,1), (10,10)]:
+			st.do_move(move)
+		self.assertEqual(policy.move_scores(st).choose(np.random.RandomState(0)), (0,2))
+
+	def test_never_fills_own_eye_or_suicides(self):
+		st = GameState(size=5)
+		for move in [(0,1), (4,4), (1,0), (4,3), (1,1), (3,4)]:
+			st.do_move(move)
+		probabilities = rollout_policy().move_scores(st).probabilities()
+		self.assertEqual(probabilities[0][0], 0)
+		self.assertAlmostEqual(probabilities.sum(), 1)
+		st.do_move((2,2))
+		# white may not play the suicide at (0,0)
+		self.assertEqual(rollout_policy().move_scores(st).probabilities()[0][0], 0)
+
+	def test_rollout_ends_game(self):
+		st = GameState(size=9)
+		moves = rollout_policy().rollout(st, np.random.RandomState(1))
+		self.assertTrue(st.is_end_of_game)
+		self.assertEqual(moves, st.turns_played)
+		# with no own eyes filled, both players keep some area
+		self.assertTrue(np.any(st.board == BLACK) and np.any(st.board == WHITE))
+		self.assertTrue(abs(st.score()) < 81)
+
+	def test_save_and_load(self):
+		weights = default_weights()
+		weights['pattern'][123] = 1.5
+		weights['atari'] = 0.25
+		policy = rollout_policy(weights)
+		(handle, path) = tempfile.mkstemp(suffix='.npz')
+		os.close(handle)
+		try:
+			policy.save_weights(path)
+			loaded = rollout_policy()
+			loaded.load_weights(path)
+		finally:
+			os.remove(path)
+		self.assertEqual(loaded.weights['atari'], 0.25)
+		self.assertEqual(loaded.pattern_factors[BLACK], policy.pattern_factors[BLACK])
+
+if __name__ == '__main__':
+	unittest.main()